@@ -1,82 +1,411 @@
 import os
-import uuid
-import shutil
-import requests
+import json
+import asyncio
+import time
+import hashlib
+import logging
 import tempfile
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
 from ..core.document_processor import (
     process_and_split_document,
     upsert_to_pinecone,
-    delete_index
+    delete_index,
+    delete_namespace,
+    delete_vectors,
+    document_key,
+    chunk_vector_id,
+    get_embedding_async,
+    get_embedding_cache_stats,
+    get_embedding_batcher_stats,
+    get_ocr_cache_stats,
+    get_model_lock_stats
 )
 from ..core.query_pipeline import (
-    retrieve_relevant_docs,
+    retrieve_candidates,
+    get_selection_stats,
     build_citation_table,
-    extract_answers
+    extract_answers,
+    iter_answers,
+    ExtractionOutcome
 )
-from ..core.theme_synthesis import synthesize_themes
-from ..config import UPLOAD_DIR, settings, _pc, EMBEDDING_DIM
-from pinecone import ServerlessSpec
+from ..core.theme_synthesis import synthesize_themes, stream_themes
+from ..core.jobs import Job, JobManager
+from ..core.query_cache import QueryCache
+from ..core.manifest import ManifestStore
+from ..core.readiness import readiness
+from ..core.metrics import span, render_metrics, CONTENT_TYPE
+from ..core.sessions import session_target, session_from_index
+from ..core.session_manager import SessionManager
+from ..core.scheduler import AdmissionController
+from ..config import settings, EMBEDDING_DIM
+from ..services.vector_store import _vector_store
+from ..services.gemini_service import get_gemini_usage
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def pinecone_check_index_exists(index_name):
-    """Check if a Pinecone index exists by name."""
-    return index_name in [idx.name for idx in _pc.list_indexes()]
+# Ingestion runs off the event loop on a bounded pool, so uploads cannot starve queries
+ingestion_jobs = JobManager(max_workers=settings.INGEST_WORKERS, name="ingest")
 
-@router.post("/upload/")
-async def upload_document(
-    file: UploadFile = File(...),
-    session_id: str = Form(...)
-):
+# Results of earlier (or similar) questions per session; invalidated when the session's documents change
+query_cache = QueryCache(
+    threshold=settings.QUERY_CACHE_THRESHOLD,
+    ttl=settings.QUERY_CACHE_TTL,
+    max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+    max_sessions=settings.QUERY_CACHE_MAX_SESSIONS
+)
+
+# Documents ingested per session, by content hash and vector ids
+manifests = ManifestStore(settings.MANIFEST_DIR)
+
+# Admission control: queries wait briefly for capacity, uploads are admitted or refused at once
+# (both with 429 and Retry-After when refused, see main.py); ingestion weight is counted in files
+admission = AdmissionController(
+    {
+        "query": {
+            "max_in_flight": settings.QUERY_MAX_IN_FLIGHT,
+            "max_per_session": settings.QUERY_MAX_PER_SESSION,
+            "max_queue": settings.QUERY_MAX_QUEUE,
+            "max_wait": settings.QUERY_MAX_WAIT
+        },
+        "ingest": {
+            "max_in_flight": settings.INGEST_MAX_PENDING_FILES,
+            "max_per_session": settings.INGEST_MAX_PENDING_FILES_PER_SESSION,
+            "max_queue": 0,
+            "max_wait": 0
+        }
+    },
+    enabled=settings.SCHEDULER_ENABLED,
+    max_retry_after=settings.RETRY_AFTER_MAX
+)
+
+def _delete_session_data(session_id, missing_ok=False):
     """
-    Handles document upload, processes and upserts to Pinecone.
-    Creates a session-specific Pinecone index if it does not exist.
-    """
-    print("Got the File")
-    index_name = f"wasserstoff-{session_id}"
-
-    # Create session-specific index if not present
-    if not pinecone_check_index_exists(index_name):
-        _pc.create_index(
-            name=index_name,
-            dimension=EMBEDDING_DIM,
-            metric="cosine",
-            spec=ServerlessSpec(
-                cloud="aws",
-                region="us-east-1"
-            )
-        )
+    Deletes a session's vectors (its index, or its namespace of the shared index),
+    manifest and cached answers. Returns a description of what was deleted.
+    """
+    index_name, namespace = session_target(session_id)
+    if namespace:
+        delete_namespace(index_name, namespace)
+        message = f"Namespace {namespace} of index {index_name} deleted."
+    elif missing_ok and not _vector_store.index_exists(index_name):
+        message = f"Index {index_name} does not exist."
+    else:
+        delete_index(index_name)
+        message = f"Index {index_name} deleted."
+    manifests.delete(session_id)
+    query_cache.invalidate(session_id)
+    return message
+
+def _evict_session(session_id):
+    # Sessions that only queried never created an index
+    _delete_session_data(session_id, missing_ok=True)
+
+def _discover_sessions():
+    """Sessions with data from before access tracking: manifests by modification time, bare indexes as of now."""
+    found = manifests.sessions()
+    if not settings.SHARED_INDEX_NAME:
+        now = time.time()
+        for index_name in _vector_store.list_indexes():
+            session_id = session_from_index(index_name)
+            if session_id is not None:
+                found.setdefault(session_id, now)
+    return found
+
+# Last access per session; idle sessions are evicted in the background (started with the app)
+session_manager = SessionManager(
+    _evict_session,
+    ttl=settings.SESSION_TTL,
+    max_sessions=settings.SESSION_MAX,
+    sweep_interval=settings.SESSION_SWEEP_INTERVAL,
+    db_path=settings.SESSION_DB_PATH or None,
+    discover_fn=_discover_sessions
+)
+
+def _plan_document(session_id, file_name, tmp_file_path, content_hash, size, progress=None):
+    """
+    Decides how to ingest one saved upload against the session manifest.
+    Returns {"skipped": True, "result": ...} for content the session already has;
+    otherwise extracts and splits the document and returns its chunks, the chunks
+    to upsert (new ids) and the vector ids of its previous version to delete.
+    """
+    existing = manifests.find_by_hash(session_id, content_hash)
+    if existing is not None:
+        logger.info("Skipping %s: identical to already ingested %s", file_name, existing['doc_name'])
+        return {"skipped": True, "result": {
+            "n_chunks": existing["n_chunks"], "skipped": True, "duplicate_of": existing["doc_name"],
+            "upserted": 0, "deleted": 0
+        }}
+    previous = manifests.get(session_id).get(file_name)
+    old_ids = set(previous["vector_ids"]) if previous else set()
+    # Process file and split into chunks
+    chunks = process_and_split_document(tmp_file_path, file_name, document_key(file_name), progress=progress)
+    logger.info("Processing of %s completed", file_name)
+    vector_ids = [chunk_vector_id(chunk) for chunk in chunks]
+    return {
+        "skipped": False,
+        "new_chunks": [chunk for chunk, vid in zip(chunks, vector_ids) if vid not in old_ids],
+        "stale_ids": old_ids - set(vector_ids),
+        "entry": {
+            "doc_name": file_name,
+            "content_hash": content_hash,
+            "size": size,
+            "n_chunks": len(chunks),
+            "vector_ids": vector_ids,
+            "ingested_at": time.time()
+        }
+    }
 
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    file_path = os.path.join(UPLOAD_DIR, f"{session_id}_{file.filename}")
+def _commit_document(session_id, index_name, namespace, plan):
+    """
+    After a plan's new chunks are upserted: deletes its stale vectors and records
+    the document in the session manifest. Returns the per-document result.
+    """
+    if plan["stale_ids"]:
+        delete_vectors(index_name, plan["stale_ids"], namespace=namespace)
+    manifests.put(session_id, plan["entry"])
+    return {
+        "n_chunks": plan["entry"]["n_chunks"], "skipped": False,
+        "upserted": len(plan["new_chunks"]), "deleted": len(plan["stale_ids"])
+    }
 
-    # Save uploaded file to a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
-        tmp_file.write(file.file.read())
-        tmp_file_path = tmp_file.name
-        print("File Opened")
+def _remove_temp_file(tmp_file_path):
     try:
-        # Process file and split into chunks
-        chunks = process_and_split_document(tmp_file_path, file.filename, session_id)
-        print("Processing Completed..")
-        # Upsert chunks to Pinecone index
-        upsert_to_pinecone(chunks, index_name=index_name)
-        n_chunks = len(chunks)
+        os.remove(tmp_file_path)
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        logger.warning("Could not remove temporary file: %s", e)
+
+def _ingest_uploaded_file(job, tmp_file_path, file_name, session_id, content_hash, size):
+    """
+    Background ingestion of one saved upload: ensures the session index exists,
+    then extracts, splits, embeds and upserts it. Runs on the ingestion job pool.
+    Files already ingested with identical content are skipped; a changed version of
+    a document only upserts its new chunks and deletes the ones that disappeared.
+    """
+    index_name, namespace = session_target(session_id)
+    try:
+        with session_manager.in_use(session_id), manifests.document_lock(session_id, file_name):
+            # Create the session-specific (or shared) index if not present
+            _vector_store.ensure_index(index_name, EMBEDDING_DIM)
+            plan = _plan_document(session_id, file_name, tmp_file_path, content_hash, size, progress=job.update)
+            if plan["skipped"]:
+                return plan["result"]
+            # Upsert only new or changed chunks to the session index, then drop stale ones
+            stats = upsert_to_pinecone(
+                plan["new_chunks"], index_name=index_name, progress=job.update, namespace=namespace
+            )
+            result = _commit_document(session_id, index_name, namespace, plan)
+            if result["upserted"] or result["deleted"]:
+                # The session's document set changed; earlier answers may be stale
+                query_cache.invalidate(session_id)
+            return {**result, "chunks_per_sec": stats["chunks_per_sec"]}
     finally:
         # Always attempt to clean up temporary file
+        _remove_temp_file(tmp_file_path)
+
+def _ingest_uploaded_batch(job, uploads, session_id):
+    """
+    Background ingestion of several saved uploads [(tmp_file_path, file_name, content_hash, size)].
+    Documents are extracted and split concurrently, then the new chunks of all of them
+    go through one embedding/upsert pass, so batches are shared across documents.
+    A failing document does not fail the others; results are per file, in upload order.
+    """
+    index_name, namespace = session_target(session_id)
+    results = [None] * len(uploads)
+    locks = ExitStack()
+    session_manager.acquire(session_id)
+    try:
+        # Locks in a fixed order, so concurrent batches sharing documents can't deadlock
+        for name in sorted({u[1] for u in uploads}):
+            locks.enter_context(manifests.document_lock(session_id, name))
+        _vector_store.ensure_index(index_name, EMBEDDING_DIM)
+        to_parse, first_by_name, first_by_hash = [], {}, {}
+        for i, (tmp_file_path, file_name, content_hash, size) in enumerate(uploads):
+            if file_name in first_by_name:
+                results[i] = {"success": False, "error": f"Duplicate file name {file_name} in batch"}
+            elif content_hash in first_by_hash:
+                results[i] = {
+                    "success": True, "skipped": True, "duplicate_of": uploads[first_by_hash[content_hash]][1],
+                    "upserted": 0, "deleted": 0
+                }
+            else:
+                first_by_name[file_name] = i
+                first_by_hash[content_hash] = i
+                to_parse.append(i)
+        job.update(stage="extracting", files=len(uploads), parsed_files=0)
+        plans = {}
+        with ThreadPoolExecutor(max_workers=settings.BATCH_PARSE_WORKERS, thread_name_prefix="parse") as pool:
+            futures = {
+                pool.submit(_plan_document, session_id, uploads[i][1], uploads[i][0], uploads[i][2], uploads[i][3]): i
+                for i in to_parse
+            }
+            for n_parsed, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    plan = future.result()
+                except Exception as e:
+                    results[i] = {"success": False, "error": str(e)}
+                else:
+                    if plan["skipped"]:
+                        results[i] = {"success": True, **plan["result"]}
+                    else:
+                        plans[i] = plan
+                job.update(parsed_files=n_parsed)
+        new_chunks = [chunk for i in sorted(plans) for chunk in plans[i]["new_chunks"]]
+        job.update(chunks=len(new_chunks))
+        stats = {"chunks_per_sec": 0.0}
         try:
-            os.remove(tmp_file_path)
+            if new_chunks:
+                stats = upsert_to_pinecone(new_chunks, index_name=index_name, progress=job.update, namespace=namespace)
         except Exception as e:
-            print(f"Could not remove temporary file: {e}")
+            # Ids are content-derived, so retrying the batch later re-upserts the same vectors
+            for i in plans:
+                results[i] = {"success": False, "error": f"Upsert failed: {e}"}
+            plans = {}
+        changed = False
+        for i, plan in plans.items():
+            try:
+                result = _commit_document(session_id, index_name, namespace, plan)
+                results[i] = {"success": True, **result}
+                changed = changed or bool(result["upserted"] or result["deleted"])
+            except Exception as e:
+                results[i] = {"success": False, "error": str(e)}
+                changed = True
+        if changed:
+            query_cache.invalidate(session_id)
+        return {
+            "files": [{"file_name": upload[1], **result} for upload, result in zip(uploads, results)],
+            "n_chunks": len(new_chunks),
+            "chunks_per_sec": stats["chunks_per_sec"]
+        }
+    finally:
+        locks.close()
+        session_manager.release(session_id)
+        for upload in uploads:
+            _remove_temp_file(upload[0])
+
+async def _save_upload(file, suffix):
+    """
+    Streams an upload to a temporary file in fixed-size chunks.
+    Returns its path, SHA-256 content hash and size.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+            await run_in_threadpool(tmp_file.write, chunk)
+        return tmp_file.name, digest.hexdigest(), size
+
+@router.post("/upload/")
+async def upload_document(
+    file: UploadFile = File(...),
+    session_id: str = Form(...)
+):
+    """
+    Handles document upload: streams the file to disk and queues a background job
+    that processes and upserts it to the session-specific index.
+    Returns a job id right away; poll /jobs/{job_id} for progress.
+    """
+    logger.info("Received upload %s for session %s", file.filename, session_id)
+    session_manager.touch(session_id)
+    ticket = admission.try_acquire("ingest", session_id)
+    index_name, namespace = session_target(session_id)
+    try:
+        tmp_file_path, content_hash, size = await _save_upload(file, os.path.splitext(file.filename)[1])
+    except Exception as e:
+        ticket.release()
+        return {"success": False, "error": str(e)}
+    job = Job("ingest", session_id=session_id, file_name=file.filename, content_hash=content_hash)
+    future = ingestion_jobs.submit(
+        job, _ingest_uploaded_file, tmp_file_path, file.filename, session_id, content_hash, size
+    )
+    future.add_done_callback(lambda _: ticket.release())
     return {
         "success": True,
         "session_id": session_id,
         "index": index_name,
-        "n_chunks": n_chunks
+        "namespace": namespace,
+        "job_id": job.id,
+        "status": job.status
+    }
+
+@router.post("/upload/batch/")
+async def upload_documents_batch(
+    files: list[UploadFile] = File(...),
+    session_id: str = Form(...)
+):
+    """
+    Bulk upload: saves all files, then ingests them as one background job that
+    extracts them concurrently and shares embedding/upsert batches across documents.
+    Waits for the job and returns per-file results (the job id can also be polled).
+    """
+    if len(files) > settings.MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.MAX_BATCH_FILES} files per batch")
+    session_manager.touch(session_id)
+    ticket = admission.try_acquire("ingest", session_id, weight=len(files))
+    index_name, namespace = session_target(session_id)
+    saved = await asyncio.gather(
+        *(_save_upload(file, os.path.splitext(file.filename)[1]) for file in files),
+        return_exceptions=True
+    )
+    errors = [str(result) for result in saved if isinstance(result, Exception)]
+    if errors:
+        for result in saved:
+            if not isinstance(result, Exception):
+                _remove_temp_file(result[0])
+        ticket.release()
+        return {"success": False, "error": errors[0]}
+    uploads = [(path, file.filename, content_hash, size) for file, (path, content_hash, size) in zip(files, saved)]
+    job = Job("ingest_batch", session_id=session_id, file_names=[file.filename for file in files])
+    future = ingestion_jobs.submit(job, _ingest_uploaded_batch, uploads, session_id)
+    future.add_done_callback(lambda _: ticket.release())
+    try:
+        result = await asyncio.wrap_future(future)
+    except Exception as e:
+        return {"success": False, "job_id": job.id, "error": str(e)}
+    return {
+        "success": all(f["success"] for f in result["files"]),
+        "session_id": session_id,
+        "index": index_name,
+        "namespace": namespace,
+        "job_id": job.id,
+        **result
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Reports status, current stage and progress counters of a background job
+    (extracted pages, chunks, embedded chunks, upserted vectors).
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+@router.get("/manifest/{session_id}")
+async def get_manifest(session_id: str):
+    """
+    Lists the documents ingested in a session with their SHA-256 content hashes,
+    so clients can skip uploading files the session already has.
+    """
+    session_manager.touch(session_id)
+    manifest = await run_in_threadpool(manifests.get, session_id)
+    return {
+        "session_id": session_id,
+        "documents": [
+            {key: value for key, value in entry.items() if key != "vector_ids"}
+            for entry in manifest.values()
+        ]
     }
 
 def deduplicate_answers(per_doc_answers):
@@ -98,25 +427,178 @@ async def query_docs(
     session_id: str = Form(...)
 ):
     """
-    Handles querying: retrieves relevant docs, builds citation table, 
+    Handles querying: retrieves and selects relevant docs, builds citation table, 
     extracts answers, deduplicates them, and synthesizes themes.
     """
-    index_name = f"wasserstoff-{session_id}"
-    matches = retrieve_relevant_docs(user_query, index_name=index_name)
-    table = build_citation_table(matches)
-    per_doc_answers = extract_answers(user_query, table)
-    per_doc_answers = deduplicate_answers(per_doc_answers)
-    themes = synthesize_themes(user_query, per_doc_answers)
-    return {"answers": per_doc_answers, "themes": themes}
+    session_manager.touch(session_id)
+    index_name, namespace = session_target(session_id)
+    async with admission.admit("query", session_id):
+        with span("embed_query"):
+            query_embedding = await get_embedding_async(user_query)
+        cached = query_cache.get(session_id, query_embedding)
+        if cached is not None:
+            return {"answers": cached["answers"], "themes": cached["themes"]}
+        generation = query_cache.generation(session_id)
+        matches = await run_in_threadpool(
+            retrieve_candidates, user_query, index_name=index_name, embedding=query_embedding, namespace=namespace
+        )
+        table = build_citation_table(matches)
+        outcome = ExtractionOutcome()
+        per_doc_answers = await extract_answers(user_query, table, outcome=outcome)
+        per_doc_answers = deduplicate_answers(per_doc_answers)
+        try:
+            themes = await synthesize_themes(user_query, per_doc_answers)
+        except Exception as e:
+            # The answers are still returned; the failed result is not cached
+            logger.warning("Theme synthesis failed: %s", e)
+            return {"answers": per_doc_answers, "themes": f"Theme synthesis failed: {e}"}
+        _cache_query_result(session_id, query_embedding, generation, table, per_doc_answers, themes, outcome)
+        return {"answers": per_doc_answers, "themes": themes}
+
+def _cache_query_result(session_id, query_embedding, generation, table, per_doc_answers, themes, outcome):
+    """
+    Caches a finished query result, unless an extraction call failed or timed out
+    (e.g. while Gemini rate-limits): the same question asked later may get a complete answer.
+    """
+    if not outcome.complete:
+        return
+    query_cache.put(
+        session_id,
+        query_embedding,
+        {"citations": table, "answers": per_doc_answers, "themes": themes},
+        generation
+    )
+
+def _sse(event, data):
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/query/stream/")
+async def query_docs_stream(
+    user_query: str = Form(...),
+    session_id: str = Form(...)
+):
+    """
+    Streaming variant of /query/ using server-sent events:
+    `citations` (the citation table, right after retrieval), one `answer` per
+    document answer as it completes, `theme` text deltas of the synthesis,
+    and a final `done` event with the same payload /query/ returns, or an `error`
+    event (with a `detail` message) if the query or theme synthesis fails midway.
+    """
+    session_manager.touch(session_id)
+    index_name, namespace = session_target(session_id)
+    # Admitted before the response starts, so a refusal is a plain 429
+    ticket = await admission.acquire("query", session_id)
+
+    async def events():
+        try:
+            async for event in query_events():
+                yield event
+        except Exception as e:
+            # The 200 status is already sent: report the failure in-band instead of cutting the stream
+            logger.exception("Streaming query failed")
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            ticket.release()
+
+    async def query_events():
+        with span("embed_query"):
+            query_embedding = await get_embedding_async(user_query)
+        cached = query_cache.get(session_id, query_embedding)
+        if cached is not None:
+            # Replay the cached result in the same event sequence
+            yield _sse("citations", cached["citations"])
+            for answer in cached["answers"]:
+                yield _sse("answer", answer)
+            yield _sse("theme", {"delta": cached["themes"]})
+            yield _sse("done", {"answers": cached["answers"], "themes": cached["themes"]})
+            return
+        generation = query_cache.generation(session_id)
+        matches = await run_in_threadpool(
+            retrieve_candidates, user_query, index_name=index_name, embedding=query_embedding,
+            namespace=namespace
+        )
+        table = build_citation_table(matches)
+        yield _sse("citations", table)
+        answers = []
+        outcome = ExtractionOutcome()
+        async for position, answer in iter_answers(user_query, table, outcome=outcome):
+            answers.append((position, answer))
+            yield _sse("answer", answer)
+        # Final answer list in retrieval order, as /query/ returns it
+        per_doc_answers = deduplicate_answers([answer for _, answer in sorted(answers, key=lambda a: a[0])])
+        themes = []
+        try:
+            async for delta in stream_themes(user_query, per_doc_answers):
+                themes.append(delta)
+                yield _sse("theme", {"delta": delta})
+        except Exception as e:
+            # Deltas already sent stay partial: report the failure separately and cache nothing
+            logger.warning("Theme synthesis failed: %s", e)
+            yield _sse("error", {"detail": f"Theme synthesis failed: {e}"})
+            return
+        themes = "".join(themes)
+        _cache_query_result(session_id, query_embedding, generation, table, per_doc_answers, themes, outcome)
+        yield _sse("done", {"answers": per_doc_answers, "themes": themes})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also frees the admission if the client left before the stream started
+        background=BackgroundTask(ticket.release)
+    )
 
 @router.delete("/delete/")
 async def delete_session(session_id: str = Form(...)):
     """
-    Deletes the Pinecone index for the session.
+    Deletes the vector store index for the session, or in shared-index mode
+    purges the session's namespace, along with its manifest and cached answers.
     """
-    index_name = f"wasserstoff-{session_id}"
     try:
-        delete_index(index_name)
-        return {"success": True, "message": f"Index {index_name} deleted."}
+        message = _delete_session_data(session_id)
+        session_manager.forget(session_id)
+        return {"success": True, "message": message}
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+@router.get("/stats/")
+async def get_stats():
+    """
+    Returns cache counters used to size the service's caches, LLM token usage,
+    session tracking and admission/queue state.
+    """
+    return {
+        "embedding_cache": get_embedding_cache_stats(),
+        "embedding_batcher": get_embedding_batcher_stats(),
+        "ocr_cache": get_ocr_cache_stats(),
+        "scheduler": {**admission.stats(), **get_model_lock_stats()},
+        "query_cache": query_cache.stats(),
+        "selection": get_selection_stats(),
+        "llm_usage": get_gemini_usage(),
+        "sessions": session_manager.stats()
+    }
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, ingestion/LLM/answer counters,
+    request counts and latency per route, and the /stats/ counters as gauges.
+    """
+    return Response(render_metrics(await get_stats()), media_type=CONTENT_TYPE)
+
+@router.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: 200 once the embedding model is loaded and the vector store
+    is reachable, 503 while loading or if either is broken.
+    """
+    ready, details = await run_in_threadpool(readiness)
+    return JSONResponse(details, status_code=200 if ready else 503)
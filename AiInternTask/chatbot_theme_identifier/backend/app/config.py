@@ -1,7 +1,7 @@
 import os
+import time
+import threading
 from dotenv import load_dotenv
-from fastembed import TextEmbedding
-from pinecone import Pinecone
 
 # Load environment variables from .env file two directories up
 load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '.env')))
@@ -11,19 +11,205 @@ class Settings:
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+    # Startup: preload the model in the background at startup, and how often /readyz re-checks the backend (s)
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+    READY_CHECK_INTERVAL = float(os.getenv("READY_CHECK_INTERVAL", "10"))
+
+    # Vector store backend: "pinecone", or "local" for the in-process store under LOCAL_VECTOR_DIR
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    PINECONE_CLOUD = os.getenv("PINECONE_CLOUD", "aws")
+    PINECONE_REGION = os.getenv("PINECONE_REGION", "us-east-1")
+    LOCAL_VECTOR_DIR = os.getenv(
+        "LOCAL_VECTOR_DIR",
+        os.path.join(os.path.dirname(__file__), '..', 'vector_store')
+    )
+    # Shared-index mode: all sessions live as namespaces of this pre-provisioned index ("" = index per session)
+    SHARED_INDEX_NAME = os.getenv("SHARED_INDEX_NAME", "")
+    # Seconds an index seen in list_indexes is assumed to still exist
+    INDEX_CACHE_TTL = float(os.getenv("INDEX_CACHE_TTL", "300"))
+    # Local namespaces at least this large are searched through an IVF index probing LOCAL_ANN_NPROBE lists
+    LOCAL_ANN_THRESHOLD = int(os.getenv("LOCAL_ANN_THRESHOLD", "20000"))
+    LOCAL_ANN_NPROBE = int(os.getenv("LOCAL_ANN_NPROBE", "16"))
+    # Local scan storage for new namespaces: "float32", or a compact "float16"/"int8" copy whose best
+    # LOCAL_RESCORE_FACTOR * top_k candidates are rescored against the float32 vectors
+    LOCAL_VECTOR_DTYPE = os.getenv("LOCAL_VECTOR_DTYPE", "float32").lower()
+    LOCAL_RESCORE_FACTOR = max(1, int(os.getenv("LOCAL_RESCORE_FACTOR", "4")))
+
+    # Gemini client: endpoint, connection pool, retries and client-side quotas (0 disables a limit)
+    GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+    GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+    GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+    GEMINI_RPM = int(os.getenv("GEMINI_RPM", "1000"))
+    GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+
+    # Ingestion batching: texts per ONNX embedding run, and limits per Pinecone upsert request
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+    # Query embedding micro-batches: requests from concurrent handlers are coalesced into runs of
+    # up to EMBED_MICROBATCH_SIZE texts, waiting at most EMBED_MICROBATCH_WAIT_MS for a batch to fill
+    EMBED_MICROBATCH_SIZE = int(os.getenv("EMBED_MICROBATCH_SIZE", "32"))
+    EMBED_MICROBATCH_WAIT_MS = float(os.getenv("EMBED_MICROBATCH_WAIT_MS", "2"))
+    UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+    UPSERT_MAX_BYTES = int(os.getenv("UPSERT_MAX_BYTES", str(1536 * 1024)))
+
+    # Background ingestion: jobs processed at once (the rest queue), and upload streaming chunk size
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    # Bulk uploads: max files per /upload/batch/ request, and documents of a batch extracted at once
+    MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "100"))
+    BATCH_PARSE_WORKERS = int(os.getenv("BATCH_PARSE_WORKERS", "4"))
+
+    # PDF extraction: worker processes, pages per task, and the page count below which extraction stays serial
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+    PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+    # OCR: images (and scanned PDF pages) are downscaled to OCR_TARGET_DPI and at most OCR_MAX_PIXELS,
+    # optionally binarized, then OCRed by at most OCR_WORKERS concurrent tesseract processes
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+    OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+    OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", "9000000"))
+    OCR_BINARIZE = os.getenv("OCR_BINARIZE", "false").lower() == "true"
+    # OCR cache by image content: in-memory LRU capacity (texts) and SQLite file for the disk tier ("" disables it)
+    OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "1000"))
+    OCR_CACHE_PATH = os.getenv(
+        "OCR_CACHE_PATH",
+        os.path.join(os.path.dirname(__file__), '..', 'cache', 'ocr.sqlite3')
+    )
+
+    # Chunking: target tokens per chunk, tokens repeated from the previous chunk, and the smallest final chunk kept on its own
+    CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "256"))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "48"))
+
+    # Post-retrieval selection: candidates fetched, then score floor, margin below the best score,
+    # near-duplicate cosine threshold and MMR relevance weight, keeping at most SELECT_MAX_K.
+    # The floor is an absolute cosine score that depends on the model and corpus: 0 disables it
+    # (the default) until it is calibrated, since too high a floor drops every match
+    SELECTION_ENABLED = os.getenv("SELECTION_ENABLED", "true").lower() == "true"
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+    SELECT_MAX_K = int(os.getenv("SELECT_MAX_K", "10"))
+    SELECT_MIN_SCORE = float(os.getenv("SELECT_MIN_SCORE", "0"))
+    SELECT_SCORE_MARGIN = float(os.getenv("SELECT_SCORE_MARGIN", "0.2"))
+    SELECT_DUPLICATE_THRESHOLD = float(os.getenv("SELECT_DUPLICATE_THRESHOLD", "0.95"))
+    SELECT_MMR_LAMBDA = float(os.getenv("SELECT_MMR_LAMBDA", "0.7"))
+
+    # Answer extraction: max concurrent LLM calls per query, and per-call timeout in seconds
+    EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "5"))
+    EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "20"))
+    # "per_chunk" (one LLM call per retrieved chunk) or "packed" (chunks grouped into calls of up to PACKED_TOKEN_BUDGET tokens)
+    EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "per_chunk").lower()
+    PACKED_TOKEN_BUDGET = int(os.getenv("PACKED_TOKEN_BUDGET", "6000"))
+
+    # Theme synthesis: answer sets larger than THEME_DIRECT_MAX_ANSWERS are merged (cosine >= THEME_MERGE_THRESHOLD),
+    # clustered into groups of THEME_CLUSTER_SIZE and summarized in parallel before the final themes prompt.
+    # A query yields at most one answer per selected chunk, so this only happens once SELECT_MAX_K is
+    # raised above THEME_DIRECT_MAX_ANSWERS; the default SELECT_MAX_K always takes the direct prompt
+    THEME_DIRECT_MAX_ANSWERS = int(os.getenv("THEME_DIRECT_MAX_ANSWERS", "12"))
+    THEME_MERGE_THRESHOLD = float(os.getenv("THEME_MERGE_THRESHOLD", "0.92"))
+    THEME_CLUSTER_SIZE = max(2, int(os.getenv("THEME_CLUSTER_SIZE", "8")))
+    THEME_MAP_CONCURRENCY = int(os.getenv("THEME_MAP_CONCURRENCY", "10"))
+    THEME_MAP_TIMEOUT = float(os.getenv("THEME_MAP_TIMEOUT", "30"))
+
+    # Semantic query cache: min cosine similarity for a hit, entry TTL (s), entries per session (0 disables)
+    QUERY_CACHE_THRESHOLD = float(os.getenv("QUERY_CACHE_THRESHOLD", "0.95"))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "64"))
+    QUERY_CACHE_MAX_SESSIONS = int(os.getenv("QUERY_CACHE_MAX_SESSIONS", "1000"))
+
+    # Logging level, and per-request trace logging of stage timings: for every request (TRACE_REQUESTS)
+    # or those sent with an "X-Trace: 1" header, logged when they took at least TRACE_MIN_SECONDS
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() == "true"
+    TRACE_MIN_SECONDS = float(os.getenv("TRACE_MIN_SECONDS", "0"))
+
+    # Admission control: queries in flight at once, globally and per session; more wait (at most QUERY_MAX_QUEUE
+    # of them, for up to QUERY_MAX_WAIT seconds) or get 429 with a Retry-After of at most RETRY_AFTER_MAX seconds
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    QUERY_MAX_IN_FLIGHT = int(os.getenv("QUERY_MAX_IN_FLIGHT", "32"))
+    QUERY_MAX_PER_SESSION = int(os.getenv("QUERY_MAX_PER_SESSION", "4"))
+    QUERY_MAX_QUEUE = int(os.getenv("QUERY_MAX_QUEUE", "64"))
+    QUERY_MAX_WAIT = float(os.getenv("QUERY_MAX_WAIT", "10"))
+    # Uploaded files queued or being ingested, globally and per session; uploads beyond get 429 right away
+    INGEST_MAX_PENDING_FILES = int(os.getenv("INGEST_MAX_PENDING_FILES", "300"))
+    INGEST_MAX_PENDING_FILES_PER_SESSION = int(os.getenv("INGEST_MAX_PENDING_FILES_PER_SESSION", "100"))
+    RETRY_AFTER_MAX = int(os.getenv("RETRY_AFTER_MAX", "60"))
+
+    # Session lifecycle: sessions idle for SESSION_TTL seconds are evicted (vectors, manifest, cached answers),
+    # as are the least recently used beyond SESSION_MAX (0 disables either), checked every SESSION_SWEEP_INTERVAL
+    # seconds; access times persist in SESSION_DB_PATH ("" keeps them in memory only). Every process serving
+    # the same sessions (workers, replicas sharing the vector store) must use the same SESSION_DB_PATH;
+    # with "" run a single process, or one may evict sessions another is serving
+    SESSION_TTL = float(os.getenv("SESSION_TTL", "86400"))
+    SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+    SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+    SESSION_DB_PATH = os.getenv(
+        "SESSION_DB_PATH",
+        os.path.join(os.path.dirname(__file__), '..', 'cache', 'sessions.sqlite3')
+    )
+
+    # Per-session manifests of ingested documents (content hashes and vector ids)
+    MANIFEST_DIR = os.getenv(
+        "MANIFEST_DIR",
+        os.path.join(os.path.dirname(__file__), '..', 'manifests')
+    )
+
+    # Embedding cache: in-memory LRU capacity (vectors) and SQLite file for the disk tier ("" disables it)
+    EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "20000"))
+    # dtype of the in-memory tier: "float16" halves its size (vectors are returned as float32)
+    EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32").lower()
+    EMBED_CACHE_PATH = os.getenv(
+        "EMBED_CACHE_PATH",
+        os.path.join(os.path.dirname(__file__), '..', 'cache', 'embeddings.sqlite3')
+    )
+
 settings = Settings()
 
-# Load embedding model globally (efficient memory use)
-_embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
 EMBEDDING_DIM = 384
 
-# Initialize Pinecone client globally
-_pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-
 # Directory to store uploaded documents
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
 
-# Ensure required keys are set; raise error early if missing
-for key in ["GEMINI_API_KEY",  "PINECONE_API_KEY"]:
-    if not getattr(settings, key, None):
-        raise ValueError(f"{key} is not set in your .env file.")
+# Seconds spent initializing each heavy resource, for tracking startup regressions
+startup_timings = {}
+
+# Heavy resources (embedding model, Pinecone client) are created on first use,
+# so importing the app stays cheap; the startup warm-up preloads them.
+_embedder = None
+_pc = None
+_init_lock = threading.Lock()
+
+def get_embedder():
+    """Returns the shared embedding model, downloading and loading it on first use."""
+    global _embedder
+    with _init_lock:
+        if _embedder is None:
+            start = time.perf_counter()
+            from fastembed import TextEmbedding
+            startup_timings["import_fastembed_s"] = round(time.perf_counter() - start, 3)
+            start = time.perf_counter()
+            _embedder = TextEmbedding(model_name=EMBEDDING_MODEL)
+            startup_timings["load_embedding_model_s"] = round(time.perf_counter() - start, 3)
+        return _embedder
+
+def get_pinecone():
+    """Returns the shared Pinecone client, creating it on first use."""
+    global _pc
+    with _init_lock:
+        if _pc is None:
+            start = time.perf_counter()
+            from pinecone import Pinecone
+            _pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+            startup_timings["pinecone_client_s"] = round(time.perf_counter() - start, 3)
+        return _pc
+
+def check_required_settings():
+    """Ensure required keys are set; raise error early (at startup) if missing."""
+    required_keys = ["GEMINI_API_KEY"]
+    if settings.VECTOR_BACKEND == "pinecone":
+        required_keys.append("PINECONE_API_KEY")
+    for key in required_keys:
+        if not getattr(settings, key, None):
+            raise ValueError(f"{key} is not set in your .env file.")
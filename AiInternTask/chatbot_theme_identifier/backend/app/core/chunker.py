@@ -0,0 +1,115 @@
+import re
+
+# Words and punctuation marks; roughly one WordPiece token each (rare words that the
+# tokenizer splits further are undercounted, so keep budgets below the model's 512 limit)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+def count_tokens(text):
+    """Approximate token count of a text for the embedding model."""
+    return len(_TOKEN_RE.findall(text))
+
+def _split_oversized(text, max_tokens):
+    """Splits a paragraph longer than max_tokens at sentence, then word, boundaries."""
+    pieces, current, current_tokens = [], [], 0
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        words = sentence.split()
+        while words:
+            sentence_tokens = count_tokens(" ".join(words))
+            if current and current_tokens + sentence_tokens > max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            if sentence_tokens <= max_tokens:
+                current.extend(words)
+                current_tokens += sentence_tokens
+                break
+            # A single sentence over budget: cut it into word runs
+            cut = max(1, len(words) * max_tokens // sentence_tokens)
+            # Words with punctuation or digits count as several tokens
+            while cut > 1 and count_tokens(" ".join(words[:cut])) > max_tokens:
+                cut -= 1
+            pieces.append(" ".join(words[:cut]))
+            words = words[cut:]
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def _paragraph_units(pages, max_tokens):
+    """Paragraphs of each page as (page, para, text, tokens), oversized ones split."""
+    units = []
+    for item in pages:
+        for i, para in enumerate(_PARAGRAPH_SPLIT_RE.split(item["text"])):
+            para = para.strip()
+            if not para:
+                continue
+            tokens = count_tokens(para)
+            if tokens <= max_tokens:
+                units.append((item["page"], i + 1, para, tokens))
+            else:
+                for piece in _split_oversized(para, max_tokens):
+                    units.append((item["page"], i + 1, piece, count_tokens(piece)))
+    return units
+
+def _overlap_tail(units, overlap_tokens):
+    """Trailing units (the oldest one possibly cut to its last words) totalling <= overlap_tokens."""
+    tail, total = [], 0
+    for page, para, text, tokens in reversed(units):
+        if total + tokens <= overlap_tokens:
+            tail.insert(0, (page, para, text, tokens))
+            total += tokens
+            continue
+        words = text.split()[-(overlap_tokens - total):] if overlap_tokens > total else []
+        # Words with punctuation count as several tokens
+        while words and count_tokens(" ".join(words)) > overlap_tokens - total:
+            words = words[1:]
+        if words:
+            piece = " ".join(words)
+            tail.insert(0, (page, para, piece, count_tokens(piece)))
+        break
+    return tail
+
+def _make_chunk(units):
+    return {
+        "page": units[0][0],
+        "para": units[0][1],
+        "page_end": units[-1][0],
+        "para_end": units[-1][1],
+        "text": "\n\n".join(unit[2] for unit in units),
+        "n_tokens": sum(unit[3] for unit in units)
+    }
+
+def chunk_pages(pages, target_tokens=256, overlap_tokens=32, min_tokens=48):
+    """
+    Splits extracted pages ([{"page", "text"}]) into chunks of about `target_tokens`.
+    Paragraphs (blank-line separated) are packed together, across pages, until the
+    budget is reached; paragraphs over budget are split at sentence boundaries.
+    Each chunk after the first starts with up to `overlap_tokens` from the end of the
+    previous one (less where a paragraph leaves no room), and a final chunk under
+    `min_tokens` is merged into its predecessor.
+    Chunks carry their provenance range: page/para (start) and page_end/para_end.
+    """
+    units = _paragraph_units(pages, target_tokens)
+    chunks, current, current_tokens, n_overlap = [], [], 0, 0
+    for unit in units:
+        # Only close a chunk once it holds new content beyond the overlap from its predecessor
+        if len(current) > n_overlap and current_tokens + unit[3] > target_tokens:
+            chunks.append(current)
+            # Carry over only as much overlap as leaves room for this unit
+            current = _overlap_tail(current, min(overlap_tokens, target_tokens - unit[3]))
+            current_tokens, n_overlap = sum(u[3] for u in current), len(current)
+        current.append(unit)
+        current_tokens += unit[3]
+    new_units = current[n_overlap:]
+    if new_units:
+        if chunks and sum(u[3] for u in new_units) < min_tokens:
+            # Merge the small remainder into the previous chunk (without its overlap copy)
+            chunks[-1] = chunks[-1] + new_units
+        else:
+            chunks.append(current)
+    result = []
+    for i, chunk_units in enumerate(chunks):
+        chunk = _make_chunk(chunk_units)
+        chunk["chunk"] = i + 1
+        result.append(chunk)
+    return result
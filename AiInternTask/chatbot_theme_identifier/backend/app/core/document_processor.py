@@ -1,11 +1,53 @@
 import os
+import json
+import time
+import hashlib
 import uuid
+import logging
 import requests
-from PyPDF2 import PdfReader
-import pytesseract
-from PIL import Image
-from ..config import settings, _embedder, _pc
-from docx import Document
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from ..config import settings, get_embedder, EMBEDDING_MODEL, EMBEDDING_DIM
+from ..services.vector_store import _vector_store
+from .embedding_cache import EmbeddingCache
+from .embedding_batcher import EmbeddingBatcher
+from .pdf_extraction import extract_pdf_pages
+from .ocr import detect_image_type, ocr_image_bytes, ocr_image_file
+from .ocr_cache import OcrCache, file_sha256
+from .docx_extraction import extract_docx_pages
+from .chunker import chunk_pages
+from .metrics import span, INGESTED_CHUNKS, UPSERTED_VECTORS, EMBEDDED_TEXTS
+from .scheduler import PriorityLock, INTERACTIVE, BULK
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed cache shared by ingestion and query embedding
+_embedding_cache = EmbeddingCache(
+    EMBEDDING_MODEL,
+    max_items=settings.EMBED_CACHE_SIZE,
+    db_path=settings.EMBED_CACHE_PATH or None,
+    memory_dtype=settings.EMBED_CACHE_DTYPE
+)
+
+# One model run at a time; query embeddings go ahead of queued ingestion batches
+_model_lock = PriorityLock("embedder", prioritize=settings.SCHEDULER_ENABLED)
+
+# OCR results by image content and OCR options
+_ocr_cache = OcrCache(max_items=settings.OCR_CACHE_SIZE, db_path=settings.OCR_CACHE_PATH or None)
+
+if settings.OCR_WORKERS > 1:
+    # Tesseract's own OpenMP threads would oversubscribe the CPUs next to parallel workers
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# Bounds concurrent tesseract runs across ingestion jobs and batch parse workers
+_ocr_pool = ThreadPoolExecutor(max_workers=settings.OCR_WORKERS, thread_name_prefix="ocr")
+
+def _ocr_options():
+    return {
+        "target_dpi": settings.OCR_TARGET_DPI,
+        "max_pixels": settings.OCR_MAX_PIXELS,
+        "binarize": settings.OCR_BINARIZE
+    }
 
 def extract_text_from_txt(txt_path):
     """Extract full text from a .txt file."""
@@ -14,154 +56,280 @@ def extract_text_from_txt(txt_path):
 
 def extract_text_from_docx(docx_path):
     """
-    Extracts text from a .docx file, handling manual page breaks.
+    Extracts text from a .docx file page by page (explicit and rendered page breaks),
+    including tables, headers and footers.
     Returns a list of dicts: {"page": <page_number>, "text": <page_text>}
     """
-    doc = Document(docx_path)
-    text = []
-    current_page_text = []
-    page_number = 1
-
-    for para in doc.paragraphs:
-        # Detect manual page break in paragraph runs
-        has_page_break = any('pageBreak' in run._element.xml for run in para.runs)
-        if has_page_break and current_page_text:
-            # Save current page, increment, and start a new one
-            text.append({"page": page_number, "text": "\n".join(current_page_text)})
-            page_number += 1
-            current_page_text = []
-        if para.text.strip():
-            current_page_text.append(para.text.strip())
-    if current_page_text:
-        text.append({"page": page_number, "text": "\n".join(current_page_text)})
-    return text
+    return extract_docx_pages(docx_path)
 
 def extract_text_from_pdf(file_path):
-    """Extracts text from each page of a PDF."""
-    reader = PdfReader(file_path)
-    text = []
-    for i, page in enumerate(reader.pages):
-        page_text = page.extract_text()
-        if page_text:
-            text.append({"page": i + 1, "text": page_text})
+    """
+    Extracts text from each page of a PDF, page-parallel across a process pool.
+    Scanned pages without a text layer are OCRed instead of dropped.
+    """
+    return extract_pdf_pages(
+        file_path,
+        max_workers=settings.PDF_WORKERS,
+        pages_per_task=settings.PDF_PAGES_PER_TASK,
+        min_parallel_pages=settings.PDF_PARALLEL_MIN_PAGES,
+        submit_ocr=_submit_pdf_image_ocr
+    )
+
+def _submit_pdf_image_ocr(data, dpi):
+    """
+    OCR of an image embedded in a scanned PDF page, through the OCR cache (by image
+    content) and on the bounded OCR pool. Returns a Future of its text.
+    """
+    options = {**_ocr_options(), "dpi": round(dpi) if dpi else None}
+    key = _ocr_cache.key(hashlib.sha256(data).hexdigest(), options)
+    text = _ocr_cache.get(key)
+    if text is not None:
+        future = Future()
+        future.set_result(text)
+        return future
+    return _ocr_pool.submit(_ocr_image_bytes_cached, key, data, options)
+
+def _ocr_image_bytes_cached(key, data, options):
+    with span("ocr"):
+        text = ocr_image_bytes(data, **options)
+    _ocr_cache.put(key, text)
     return text
 
 def extract_text_from_image(image_path):
-    """Extracts text from an image using OCR (pytesseract)."""
-    image = Image.open(image_path)
-    text = pytesseract.image_to_string(image)
+    """
+    Extracts text from an image using OCR (pytesseract) on the bounded OCR pool,
+    after downscaling it for OCR. Results are cached by image content.
+    """
+    options = _ocr_options()
+    key = _ocr_cache.key(file_sha256(image_path), options)
+    text = _ocr_cache.get(key)
+    if text is None:
+        with span("ocr"):
+            text = _ocr_pool.submit(ocr_image_file, image_path, **options).result()
+        _ocr_cache.put(key, text)
     return text
 
-def process_and_split_document(file_path, doc_name, doc_id):
+def get_ocr_cache_stats():
+    """Hit/miss counters of the OCR cache."""
+    return _ocr_cache.stats()
+
+def shutdown_ocr_pool():
+    """Stops the OCR workers (call on application shutdown)."""
+    _ocr_pool.shutdown(wait=False, cancel_futures=True)
+
+def _extract_pages(file_path):
+    """Extracts the text of a document (PDF, image, txt, docx) as a list of {"page", "text"}."""
+    ext = os.path.splitext(file_path)[-1].lower()
+    if ext == ".pdf":
+        with span("extract_pdf"):
+            return extract_text_from_pdf(file_path)
+    if ext == ".docx":
+        with span("extract_docx"):
+            return extract_text_from_docx(file_path)
+    if ext == ".txt":
+        with span("extract_txt"):
+            return [{"page": 1, "text": extract_text_from_txt(file_path)}]
+    # OCR for image files, whatever their extension; anything else is rejected without decoding it
+    if detect_image_type(file_path) is None:
+        raise ValueError(f"Unsupported file type or unable to process {file_path}")
+    with span("extract_image"):
+        return [{"page": 1, "text": extract_text_from_image(file_path)}]
+
+def process_and_split_document(file_path, doc_name, doc_id, progress=None):
     """
-    Process a document (PDF, image, txt, docx), extract and split into paragraphs.
+    Process a document (PDF, image, txt, docx), extract and split it into token-budgeted chunks.
     Returns a list of dicts for vectorization/upsert.
+    `progress`, if given, is called with the stage and extracted page/chunk counts.
     """
-    data = []
-    ext = os.path.splitext(file_path)[-1].lower()
-
-    if ext == ".pdf":
-        text_pages = extract_text_from_pdf(file_path)
-        for item in text_pages:
-            page = item["page"]
-            for i, para in enumerate(item["text"].split('\n\n')):
-                para = para.strip()
-                if para:
-                    data.append({
-                        "id": doc_id,
-                        "doc_name": doc_name,
-                        "page": page,
-                        "para": i + 1,
-                        "text": para
-                    })
-    elif ext in [".jpg", ".jpeg", ".png"]:
-        # OCR for image files
-        text = extract_text_from_image(file_path)
-        for i, para in enumerate(text.split('\n\n')):
-            para = para.strip()
-            if para:
-                data.append({
-                    "id": doc_id,
-                    "doc_name": doc_name,
-                    "page": 1,
-                    "para": i + 1,
-                    "text": para
-                })
-    elif ext == ".txt":
-        text = extract_text_from_txt(file_path)
-        for i, para in enumerate(text.split('\n\n')):
-            para = para.strip()
-            if para:
-                data.append({
-                    "id": doc_id,
-                    "doc_name": doc_name,
-                    "page": 1,
-                    "para": i + 1,
-                    "text": para
-                })
-    elif ext == ".docx":
-        text = extract_text_from_docx(file_path)
-        # For .docx, output from extract_text_from_docx is a list of dicts
-        for item in text:
-            page = item["page"]
-            for i, para in enumerate(item["text"].split('\n\n')):
-                para = para.strip()
-                if para:
-                    data.append({
-                        "id": doc_id,
-                        "doc_name": doc_name,
-                        "page": page,
-                        "para": i + 1,
-                        "text": para
-                    })
-    else:
-        # Fallback: try OCR for any other file type
-        try:
-            text = extract_text_from_image(file_path)
-            for i, para in enumerate(text.split('\n\n')):
-                para = para.strip()
-                if para:
-                    data.append({
-                        "id": doc_id,
-                        "doc_name": doc_name,
-                        "page": 1,
-                        "para": i + 1,
-                        "text": para
-                    })
-        except Exception:
-            raise ValueError(f"Unsupported file type or unable to process {file_path}")
+    if progress:
+        progress(stage="extracting")
+    pages = _extract_pages(file_path)
+    if progress:
+        progress(stage="chunking", extracted_pages=len(pages))
+    with span("chunk"):
+        data = chunk_pages(
+            pages,
+            target_tokens=settings.CHUNK_TARGET_TOKENS,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+            min_tokens=settings.CHUNK_MIN_TOKENS
+        )
+    INGESTED_CHUNKS.inc(len(data))
+    for chunk in data:
+        chunk["id"] = doc_id
+        chunk["doc_name"] = doc_name
+    if progress:
+        progress(chunks=len(data))
     return data
 
+def get_embeddings(texts, batch_size=None, priority=INTERACTIVE):
+    """
+    Generate embedding vectors for a list of texts in batched ONNX runs, as one
+    contiguous float32 array with a row per text (converted to lists only where
+    a client needs them). Cached vectors are reused; only distinct cache misses
+    are sent to the model, one run at a time: waiting INTERACTIVE runs go before BULK ones.
+    """
+    texts = list(texts)
+    batch_size = batch_size or settings.EMBED_BATCH_SIZE
+    cached = _embedding_cache.get_many(texts)
+    missing = list(dict.fromkeys(t for t, emb in zip(texts, cached) if emb is None))
+    computed = {}
+    if missing:
+        with _model_lock.hold(priority), span("embed_batch"):
+            computed = dict(zip(missing, get_embedder().embed(missing, batch_size=batch_size)))
+        EMBEDDED_TEXTS.inc(len(missing))
+        _embedding_cache.put_many(missing, [computed[t] for t in missing])
+    embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for i, (text, emb) in enumerate(zip(texts, cached)):
+        embeddings[i] = computed[text] if emb is None else emb
+    return embeddings
+
+def get_embedding_cache_stats():
+    """Counters of the embedding cache (hits per tier, misses, evictions)."""
+    return _embedding_cache.stats()
+
+# Single-text (query) embeddings from concurrent requests share model runs on one worker thread
+_embedding_batcher = EmbeddingBatcher(
+    get_embeddings,
+    max_batch_size=settings.EMBED_MICROBATCH_SIZE,
+    max_wait=settings.EMBED_MICROBATCH_WAIT_MS / 1000
+)
+
 def get_embedding(text):
-    """Generate embedding vector for given text."""
-    emb = list(_embedder.embed([text]))[0]
-    if hasattr(emb, "tolist"):
-        emb = emb.tolist()
-    return emb
-
-def upsert_to_pinecone(split_data, index_name):
-    """
-    Upserts a list of text chunks (with metadata) into Pinecone index.
-    """
-    index = _pc.Index(index_name)
-    vectors = []
-    for chunk in split_data:
-        text = chunk["text"]
-        embedding = get_embedding(text)
-        unique_id = f"{chunk['id']}_{chunk['page']}_{chunk['para']}"
-        meta = {
+    """Generate embedding vector for given text, in a micro-batch shared with concurrent callers."""
+    return _embedding_batcher.embed([text])[0]
+
+async def get_embedding_async(text):
+    """Awaitable get_embedding: the model runs on the batcher's worker thread, off the event loop."""
+    return (await _embedding_batcher.embed_async([text]))[0]
+
+def get_embedding_batcher_stats():
+    """Micro-batching counters: requests, batches, mean batch size and queueing delay."""
+    return _embedding_batcher.stats()
+
+def get_model_lock_stats():
+    """Embedding runs waiting for the model, by priority."""
+    return _model_lock.stats()
+
+def document_key(doc_name):
+    """Stable id of a document within a session; prefixes the ids of all its vectors."""
+    return hashlib.sha1(doc_name.encode("utf-8")).hexdigest()[:16]
+
+def chunk_vector_id(chunk):
+    """
+    Vector id of a chunk: its document's key plus a hash of its text and provenance,
+    so unchanged chunks keep their id across re-ingestions of a document.
+    """
+    content = json.dumps(
+        [chunk["text"], chunk.get("page"), chunk.get("para"), chunk.get("page_end"), chunk.get("para_end")]
+    )
+    return f"{chunk['id']}-{hashlib.sha1(content.encode('utf-8')).hexdigest()[:24]}"
+
+def _build_vector(chunk, embedding):
+    """
+    Builds the Pinecone vector record (id, values, metadata) for one chunk.
+    `embedding` stays a NumPy row (a view into its batch's array) until the vector store serializes it.
+    """
+    return {
+        "id": chunk_vector_id(chunk),
+        "values": embedding,
+        "metadata": {
             "doc_name": chunk.get("doc_name"),
             "page": chunk.get("page"),
             "para": chunk.get("para"),
-            "text": text
+            "page_end": chunk.get("page_end", chunk.get("page")),
+            "para_end": chunk.get("para_end", chunk.get("para")),
+            "text": chunk["text"]
         }
-        vectors.append({
-            "id": unique_id,
-            "values": embedding,
-            "metadata": meta
-        })
-    index.upsert(vectors=vectors)
+    }
+
+def _estimate_vector_bytes(vector):
+    """Rough serialized size of a vector record, used to keep upsert requests under the payload limit."""
+    # ~12 bytes per float in the JSON/protobuf payload, plus id and metadata
+    return len(vector["id"]) + 12 * len(vector["values"]) + len(json.dumps(vector["metadata"]))
+
+def _iter_upsert_batches(vectors, max_count, max_bytes):
+    """Yields slices of vectors bounded both by count and by estimated payload size."""
+    batch, batch_bytes = [], 0
+    for vector in vectors:
+        size = _estimate_vector_bytes(vector)
+        if batch and (len(batch) >= max_count or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+def _upsert_vectors(index_name, namespace, vectors, max_count, max_bytes, on_upserted=None):
+    """Sends vectors to the index in size-limited requests. Returns the number upserted."""
+    for batch in _iter_upsert_batches(vectors, max_count, max_bytes):
+        with span("upsert_batch"):
+            _vector_store.upsert(index_name, batch, namespace=namespace)
+        UPSERTED_VECTORS.inc(len(batch))
+        if on_upserted:
+            on_upserted(len(batch))
+    return len(vectors)
+
+def upsert_to_pinecone(split_data, index_name, embed_batch_size=None, upsert_batch_size=None,
+                       progress=None, namespace=None):
+    """
+    Upserts a list of text chunks (with metadata) into the vector store index (and namespace).
+    Chunks are embedded in batches; the upload of one batch runs in the background
+    while the next batch is being embedded. Returns ingestion stats incl. chunks/sec.
+    `progress`, if given, is called with running embedded/upserted counts.
+    """
+    embed_batch_size = embed_batch_size or settings.EMBED_BATCH_SIZE
+    upsert_batch_size = upsert_batch_size or settings.UPSERT_BATCH_SIZE
+    start = time.perf_counter()
+    n_vectors = 0
+    pending = None
+    upserted = 0
+    if progress:
+        progress(stage="embedding")
+
+    def on_upserted(n):
+        # Only the single uploader thread calls this
+        nonlocal upserted
+        upserted += n
+        if progress:
+            progress(upserted_vectors=upserted)
+
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        for offset in range(0, len(split_data), embed_batch_size):
+            batch = split_data[offset:offset + embed_batch_size]
+            embeddings = get_embeddings(
+                [chunk["text"] for chunk in batch], batch_size=embed_batch_size, priority=BULK
+            )
+            vectors = [_build_vector(chunk, emb) for chunk, emb in zip(batch, embeddings)]
+            if progress:
+                progress(embedded_chunks=offset + len(batch))
+            # Wait for the previous upload before queuing the next one, so at most
+            # one batch is in flight and upload errors surface immediately
+            if pending is not None:
+                n_vectors += pending.result()
+            pending = uploader.submit(
+                _upsert_vectors, index_name, namespace, vectors, upsert_batch_size, settings.UPSERT_MAX_BYTES,
+                on_upserted
+            )
+        if pending is not None:
+            n_vectors += pending.result()
+    elapsed = time.perf_counter() - start
+    chunks_per_sec = len(split_data) / elapsed if elapsed > 0 else 0.0
+    logger.info("Upserted %d vectors to %s in %.2fs (%.1f chunks/sec)", n_vectors, index_name, elapsed, chunks_per_sec)
+    return {
+        "n_vectors": n_vectors,
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(chunks_per_sec, 1)
+    }
+
+def delete_vectors(index_name, ids, namespace=None):
+    """Deletes vectors by id from the index (and namespace)."""
+    _vector_store.delete(index_name, ids, namespace=namespace)
 
 def delete_index(index_name):
-    """Deletes the Pinecone index with the specified name."""
-    _pc.delete_index(index_name)
+    """Deletes the vector store index with the specified name."""
+    _vector_store.delete_index(index_name)
+
+def delete_namespace(index_name, namespace):
+    """Deletes all vectors of one namespace of a shared index."""
+    _vector_store.delete_namespace(index_name, namespace)
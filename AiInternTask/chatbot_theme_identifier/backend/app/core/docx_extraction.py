@@ -0,0 +1,135 @@
+"""
+Streaming DOCX text extraction.
+
+Reads word/document.xml with an incremental parser instead of loading the whole
+document object model, detecting page breaks from the markup itself: explicit
+breaks (<w:br w:type="page"/>, pageBreakBefore) and the breaks Word recorded at
+its last layout (<w:lastRenderedPageBreak/>). Table rows are extracted with their
+cells joined by " | ", and header/footer text is added once, to the first page.
+"""
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_HEADER_FOOTER_RE = re.compile(r"word/(header|footer)\d*\.xml$")
+_FALSE_VALUES = ("0", "false", "off")
+
+class _PageBuilder:
+    """Collects paragraphs into pages; breaks with nothing written since the previous one are ignored."""
+
+    def __init__(self):
+        self.pages = []
+        self.paragraphs = []
+
+    def add(self, text):
+        text = text.strip()
+        if text:
+            self.paragraphs.append(text)
+
+    def page_break(self):
+        if self.paragraphs:
+            self.pages.append({"page": len(self.pages) + 1, "text": "\n\n".join(self.paragraphs)})
+            self.paragraphs = []
+
+    def finish(self):
+        self.page_break()
+        return self.pages
+
+def _is_on(elem):
+    return elem.get(f"{_W}val", "true").lower() not in _FALSE_VALUES
+
+def _iter_paragraph_texts(stream, builder=None):
+    """
+    Parses a WordprocessingML part incrementally, yielding the text of each
+    top-level paragraph and table row. Page breaks are reported to `builder`
+    (inside a table they take effect after the current row).
+    """
+    parts = []          # text runs of the current paragraph
+    cells = []          # one list of cell texts per open table row (nested tables stack)
+    cell_parts = []     # paragraph texts of each open cell
+    pending_break = False
+
+    def flush_paragraph():
+        text = "".join(parts)
+        parts.clear()
+        return text
+
+    def page_break():
+        nonlocal pending_break
+        if cells:
+            pending_break = True
+        elif builder is not None:
+            yield flush_paragraph()
+            builder.page_break()
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == f"{_W}tr":
+                cells.append([])
+            elif tag == f"{_W}tc":
+                cell_parts.append([])
+            continue
+        if tag == f"{_W}t":
+            parts.append(elem.text or "")
+        elif tag == f"{_W}tab":
+            parts.append("\t")
+        elif tag == f"{_W}cr":
+            parts.append("\n")
+        elif tag == f"{_W}noBreakHyphen":
+            parts.append("-")
+        elif tag == f"{_W}br":
+            if elem.get(f"{_W}type") == "page":
+                yield from page_break()
+            else:
+                parts.append("\n")
+        elif tag == f"{_W}lastRenderedPageBreak":
+            yield from page_break()
+        elif tag == f"{_W}pageBreakBefore" and _is_on(elem):
+            yield from page_break()
+        elif tag == f"{_W}p":
+            text = flush_paragraph()
+            if cell_parts:
+                cell_parts[-1].append(text.strip())
+            else:
+                yield text
+                elem.clear()
+        elif tag == f"{_W}tc":
+            cell_text = " ".join(t for t in cell_parts.pop() if t)
+            if cells:
+                cells[-1].append(cell_text)
+        elif tag == f"{_W}tr":
+            row = " | ".join(c for c in cells.pop() if c)
+            if cell_parts:
+                # Nested table: the row becomes part of the enclosing cell
+                cell_parts[-1].append(row)
+            else:
+                yield row
+                if pending_break and builder is not None:
+                    pending_break = False
+                    builder.page_break()
+        elif tag == f"{_W}tbl" and not cells:
+            elem.clear()
+
+def extract_docx_pages(file_path, include_headers=True):
+    """
+    Extracts text from a .docx file page by page.
+    Returns a list of dicts: {"page": <page_number>, "text": <page_text>}, with
+    paragraphs and table rows separated by blank lines.
+    """
+    builder = _PageBuilder()
+    with zipfile.ZipFile(file_path) as archive:
+        if include_headers:
+            seen = set()
+            for name in sorted(n for n in archive.namelist() if _HEADER_FOOTER_RE.match(n)):
+                with archive.open(name) as stream:
+                    for text in _iter_paragraph_texts(stream):
+                        # Headers/footers repeat on every page: index each distinct line once
+                        if text.strip() and text.strip() not in seen:
+                            seen.add(text.strip())
+                            builder.add(text)
+        with archive.open("word/document.xml") as stream:
+            for text in _iter_paragraph_texts(stream, builder):
+                builder.add(text)
+    return builder.finish()
@@ -0,0 +1,116 @@
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class EmbeddingBatcher:
+    """
+    Coalesces embedding requests from concurrent callers into micro-batches run by
+    one worker thread. A batch closes when it holds `max_batch_size` texts or
+    `max_wait` seconds after its first request arrived, whichever comes first;
+    requests queued while a batch is being embedded form the next one, so batches
+    grow with load. `embed_fn(texts)` must return one vector per text.
+    """
+
+    def __init__(self, embed_fn, max_batch_size=32, max_wait=0.005, name="embedding-batcher"):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        self.queue_wait = 0.0
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, texts):
+        """Queues texts for embedding; returns a Future resolving to their vectors."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((list(texts), future, time.perf_counter()))
+        return future
+
+    def embed(self, texts):
+        """Blocking: vectors for texts, computed in a shared micro-batch."""
+        return self.submit(texts).result()
+
+    async def embed_async(self, texts):
+        """Awaitable: vectors for texts, without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _collect(self, first):
+        """The first request plus whatever arrives before the batch is full or its deadline passes."""
+        batch, size = [first], len(first[0])
+        deadline = first[2] + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Requests whose callers gave up (cancelled futures) are dropped
+            batch = [item for item in self._collect(first) if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            texts = [text for request_texts, _, _ in batch for text in request_texts]
+            try:
+                vectors = self.embed_fn(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for request_texts, future, _ in batch:
+                future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.texts += len(texts)
+                self.largest_batch = max(self.largest_batch, len(texts))
+                self.queue_wait += sum(started - queued for _, _, queued in batch)
+
+    def close(self):
+        """Stops the worker once the queued requests are done."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self):
+        """Requests, batches and texts embedded, mean batch size and mean queueing delay."""
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "mean_queue_wait_ms": round(1000 * self.queue_wait / self.requests, 3) if self.requests else 0.0
+            }
@@ -0,0 +1,129 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of a text share a cache key."""
+    return " ".join(text.split())
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embedding vectors.
+    Keys are a SHA-256 of the model name and the normalized text. Vectors live in a
+    bounded in-memory LRU tier, backed by an optional SQLite tier that survives restarts.
+    The memory tier holds `memory_dtype` vectors (e.g. float16 to halve it); the disk
+    tier and lookups are always float32.
+    """
+
+    def __init__(self, model_name, max_items=20000, db_path=None, memory_dtype="float32"):
+        self.model_name = model_name
+        self.max_items = max_items
+        self.db_path = db_path
+        self.memory_dtype = np.dtype(memory_dtype)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def key(self, text):
+        """Cache key for a text under this cache's model."""
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _remember(self, key, vector):
+        """Insert into the memory tier, evicting least recently used entries over capacity."""
+        self._memory[key] = vector.astype(self.memory_dtype, copy=False)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _db_get(self, keys):
+        found = {}
+        for i in range(0, len(keys), _SQL_BATCH):
+            part = keys[i:i + _SQL_BATCH]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                part
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def get_many(self, texts):
+        """
+        Look up vectors for texts.
+        Returns a list aligned with texts holding a float32 array, or None on a miss.
+        """
+        keys = [self.key(t) for t in texts]
+        results = [None] * len(keys)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector.astype(np.float32, copy=False)
+                    self.hits_memory += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+            if missing and self._db is not None:
+                for key, vector in self._db_get(list(missing)).items():
+                    for i in missing.pop(key):
+                        results[i] = vector
+                        self.hits_disk += 1
+                    self._remember(key, vector)
+            self.misses += sum(len(positions) for positions in missing.values())
+        return results
+
+    def put_many(self, texts, vectors):
+        """Store vectors for texts in both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+            if self._db is not None and rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+                )
+                self._db.commit()
+
+    def stats(self):
+        """Hit/miss/eviction counters and tier sizes, for sizing the cache."""
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            disk_items = None
+            if self._db is not None:
+                disk_items = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "model": self.model_name,
+                "memory_items": len(self._memory),
+                "memory_max_items": self.max_items,
+                "disk_items": disk_items,
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0
+            }
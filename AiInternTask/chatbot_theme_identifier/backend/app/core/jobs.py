@@ -0,0 +1,97 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class Job:
+    """
+    A background job with a current stage and per-stage progress counters.
+    Updated from worker threads; read by the job-status API.
+    """
+
+    def __init__(self, kind, **info):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.info = info
+        self.status = "queued"      # queued -> running -> done | failed
+        self.stage = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, stage=None, **counters):
+        """Record the current stage and/or progress counters (absolute values)."""
+        with self._lock:
+            if stage:
+                self.stage = stage
+            self.progress.update(counters)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                **self.info,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps the most recent `max_jobs` for status queries.
+    The pool size caps how many jobs run at once; the rest wait in the queue.
+    """
+
+    def __init__(self, max_workers, max_jobs=1000, name="job"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = OrderedDict()
+        self._max_jobs = max_jobs
+        self._lock = threading.Lock()
+
+    def submit(self, job, fn, *args, **kwargs):
+        """
+        Queue fn(job, *args, **kwargs). Its return value becomes job.result; an exception fails the job.
+        Returns a concurrent.futures.Future of the result.
+        """
+        with self._lock:
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs beyond the retention limit
+            while len(self._jobs) > self._max_jobs:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status not in ("done", "failed"):
+                    break
+                self._jobs.popitem(last=False)
+        return self._executor.submit(self._run, job, fn, *args, **kwargs)
+
+    @staticmethod
+    def _run(job, fn, *args, **kwargs):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "done"
+            job.update(stage="done")
+            return job.result
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            job.update(stage="failed")
+            raise
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        """Returns the job with this id, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
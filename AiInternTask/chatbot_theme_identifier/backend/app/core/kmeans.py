@@ -0,0 +1,23 @@
+import numpy as np
+
+def normalize_rows(matrix):
+    """Rows scaled to unit length (zero rows are left as they are)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def spherical_kmeans(data, n_clusters, n_iter=10, seed=0):
+    """Spherical k-means on unit vectors; returns unit-norm float32 centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = data[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:
+                # Re-seed empty clusters with a random point
+                centroids[c] = data[rng.integers(len(data))]
+        centroids = normalize_rows(centroids)
+    return centroids.astype(np.float32)
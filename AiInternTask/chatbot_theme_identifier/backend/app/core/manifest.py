@@ -0,0 +1,97 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+class _DocumentLock:
+    """A document's lock and the number of ingestions holding or waiting for it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+class ManifestStore:
+    """
+    Per-session manifests of ingested documents, one JSON file per session under `root_dir`:
+    {doc_name: {"doc_name", "content_hash", "size", "n_chunks", "vector_ids", "ingested_at"}}.
+    Used to skip re-ingesting identical files and to diff a changed document's vectors.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._document_locks = {}
+
+    def _path(self, session_id):
+        # Session ids are client-supplied; never let them escape root_dir
+        return os.path.join(self.root_dir, quote(session_id, safe="") + ".json")
+
+    @contextmanager
+    def document_lock(self, session_id, doc_name):
+        """
+        Context manager serializing ingestions of the same document of a session.
+        The lock is dropped once no ingestion holds or waits for it.
+        """
+        key = (session_id, doc_name)
+        with self._lock:
+            entry = self._document_locks.setdefault(key, _DocumentLock())
+            entry.users += 1
+        try:
+            with entry.lock:
+                yield
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if not entry.users:
+                    del self._document_locks[key]
+
+    def get(self, session_id):
+        """The session's manifest ({} if nothing was ingested)."""
+        with self._lock:
+            try:
+                with open(self._path(session_id)) as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                return {}
+
+    def sessions(self):
+        """{session_id: time its manifest last changed} for every session with a manifest."""
+        try:
+            names = os.listdir(self.root_dir)
+        except FileNotFoundError:
+            return {}
+        return {
+            unquote(name[:-len(".json")]): os.path.getmtime(os.path.join(self.root_dir, name))
+            for name in names if name.endswith(".json")
+        }
+
+    def find_by_hash(self, session_id, content_hash):
+        """The manifest entry of a document with this content, or None."""
+        for entry in self.get(session_id).values():
+            if entry["content_hash"] == content_hash:
+                return entry
+        return None
+
+    def put(self, session_id, entry):
+        """Adds or replaces the entry of one document (keyed by its name)."""
+        with self._lock:
+            path = self._path(session_id)
+            try:
+                with open(path) as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                manifest = {}
+            manifest[entry["doc_name"]] = entry
+            os.makedirs(self.root_dir, exist_ok=True)
+            # Write-then-rename, so a crash never leaves a truncated manifest
+            with open(path + ".tmp", "w") as f:
+                json.dump(manifest, f)
+            os.replace(path + ".tmp", path)
+
+    def delete(self, session_id):
+        with self._lock:
+            try:
+                os.remove(self._path(session_id))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,224 @@
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency histogram buckets (seconds), from an embedding batch to a whole query
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, optionally split by labels; thread-safe."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values = {(): 0}
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (e.g. seconds), optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        samples = []
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                samples.append((f"{self.name}_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds", "Wall time of pipeline stages (extraction per format, chunking, embedding, "
+    "upsert, vector query, LLM calls, synthesis)", ["stage"]
+)
+STAGE_ERRORS = Counter("stage_errors_total", "Pipeline stages that raised", ["stage"])
+INGESTED_CHUNKS = Counter("ingested_chunks_total", "Chunks produced from ingested documents")
+UPSERTED_VECTORS = Counter("upserted_vectors_total", "Vectors written to the vector store")
+EMBEDDED_TEXTS = Counter("embedded_texts_total", "Texts run through the embedding model (cache misses)")
+LLM_CALLS = Counter("llm_calls_total", "Completed Gemini calls")
+LLM_RETRIES = Counter("llm_retries_total", "Gemini requests retried after a 429/5xx or connection error")
+LLM_TOKENS = Counter("llm_tokens_total", "Gemini tokens reported by the server", ["kind"])
+ANSWERS_FILTERED = Counter(
+    "answers_filtered_total", "Extracted answers dropped: failed/timed-out calls or vague answers", ["reason"]
+)
+SESSIONS_EVICTED = Counter("sessions_evicted_total", "Idle sessions evicted with their vectors and data", ["reason"])
+SESSION_EVICTION_ERRORS = Counter("session_eviction_errors_total", "Session evictions that failed (retried next sweep)")
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests refused with 429 by admission control", ["kind", "reason"]
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "queue_wait_seconds", "Time work waited for admission (query, ingest) or for the embedding model "
+    "(embedder_interactive, embedder_bulk)", ["queue"]
+)
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests served", ["method", "route", "status"])
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request wall time incl. streamed bodies", ["route"])
+
+# Stage timings of the current request when it is being traced, else None
+_trace = contextvars.ContextVar("trace", default=None)
+
+@contextmanager
+def span(stage):
+    """
+    Times a block as one pipeline stage: records it in the stage histogram, counts
+    it as an error if it raises, and adds it to the request trace if one is active.
+    Works around sync code and awaits alike.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        # Cancellation and early generator exit are not failures
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((stage, start, elapsed))
+
+def format_trace(trace, total):
+    """One line per traced request: per stage, call count, summed and longest time."""
+    stages = {}
+    for stage, _, elapsed in trace:
+        count, summed, longest = stages.get(stage, (0, 0.0, 0.0))
+        stages[stage] = (count + 1, summed + elapsed, max(longest, elapsed))
+    parts = [
+        f"{stage} n={count} sum={summed:.3f}s max={longest:.3f}s"
+        for stage, (count, summed, longest) in sorted(stages.items(), key=lambda s: -s[1][1])
+    ]
+    return f"total={total:.3f}s " + "; ".join(parts)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and their latency per route (streamed bodies
+    included). Requests are traced when TRACE_REQUESTS is on or they carry an
+    "X-Trace: 1" header; their stage breakdown is logged if they took at least
+    TRACE_MIN_SECONDS.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        traced = settings.TRACE_REQUESTS or headers.get(b"x-trace", b"") in (b"1", b"true")
+        token = _trace.set([] if traced else None)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            total = time.perf_counter() - start
+            route = scope.get("route")
+            # Route templates (/jobs/{job_id}) keep label cardinality bounded
+            route = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status)
+            HTTP_SECONDS.observe(total, route=route)
+            trace = _trace.get()
+            _trace.reset(token)
+            if trace is not None and total >= settings.TRACE_MIN_SECONDS:
+                request_id = headers.get(b"x-request-id", b"").decode() or uuid.uuid4().hex[:12]
+                logger.info("trace %s %s %s status=%s %s", request_id, scope["method"], route, status,
+                            format_trace(trace, total))
+
+def _gauge_samples(stats):
+    """Numeric leaves of nested /stats/ groups as gauges named <group>_<key>."""
+    families = []
+    for group, values in stats.items():
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                families.append((f"{group}_{key}", value))
+    return families
+
+def render_metrics(stats=None):
+    """
+    All metrics in the Prometheus text format; `stats` (the /stats/ groups)
+    are added as gauges.
+    """
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+    for name, value in _gauge_samples(stats or {}):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,110 @@
+"""
+OCR of images: format detection from leading bytes, preprocessing to a target
+resolution before tesseract, and text recognition.
+
+Kept free of app config, like pdf_extraction, so PDF worker processes can import it.
+"""
+import io
+import math
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+# Leading bytes of the image formats Pillow decodes and tesseract can read
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"BM", "bmp"),
+)
+
+# EXIF orientation tag, and the transposition that makes each orientation upright
+_ORIENTATION = 0x0112
+_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+def detect_image_type(file_path):
+    """
+    The image format of a file from its first bytes ("png", "jpeg", "gif", "tiff",
+    "bmp", "webp"), or None if it is not an image, without decoding it.
+    """
+    with open(file_path, "rb") as f:
+        header = f.read(16)
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    for signature, name in _SIGNATURES:
+        if header.startswith(signature):
+            return name
+    return None
+
+def _otsu_threshold(gray):
+    """Gray level separating text from background (Otsu's method) for an 8-bit image."""
+    hist = np.array(gray.histogram(), dtype=np.float64)
+    weight = np.cumsum(hist)
+    mass = np.cumsum(hist * np.arange(256))
+    total, total_mass = weight[-1], mass[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_low = mass / weight
+        mean_high = (total_mass - mass) / (total - weight)
+        between = weight * (total - weight) * (mean_low - mean_high) ** 2
+    return int(np.nanargmax(between))
+
+def prepare_image(image, target_dpi=300, max_pixels=9_000_000, binarize=False, dpi=None):
+    """
+    Grayscale copy of an image sized for OCR: downscaled to `target_dpi` when its
+    resolution (`dpi`, else the one recorded in the file) is higher, then to at most
+    `max_pixels`; never upscaled. JPEGs are decoded at reduced size directly.
+    With `binarize`, it is thresholded to black and white (Otsu).
+    """
+    width, height = image.size
+    scale = 1.0
+    source_dpi = dpi or (image.info.get("dpi") or (0, 0))[0]
+    if target_dpi and source_dpi and source_dpi > target_dpi:
+        scale = target_dpi / source_dpi
+    if max_pixels and width * height * scale * scale > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+    # Phone photos are often stored sideways with an EXIF orientation
+    orientation = image.getexif().get(_ORIENTATION, 1)
+    if scale < 1.0:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        # Lets the JPEG decoder skip detail that would be resized away
+        image.draft("L", size)
+        image = image.convert("L")
+        if image.size != size:
+            # Area averaging keeps strokes legible and is several times faster than Lanczos
+            image = image.resize(size, Image.BOX)
+    else:
+        image = image.convert("L")
+    if orientation in _TRANSPOSE:
+        image = image.transpose(_TRANSPOSE[orientation])
+    if binarize:
+        threshold = _otsu_threshold(image)
+        image = image.point(lambda p: 255 if p > threshold else 0, mode="1")
+    return image
+
+def ocr_image(image, target_dpi=300, max_pixels=9_000_000, binarize=False, dpi=None):
+    """Recognized text of a PIL image, after prepare_image."""
+    return pytesseract.image_to_string(
+        prepare_image(image, target_dpi=target_dpi, max_pixels=max_pixels, binarize=binarize, dpi=dpi)
+    )
+
+def ocr_image_bytes(data, **options):
+    """Recognized text of an encoded image (e.g. one embedded in a PDF page); options as for ocr_image."""
+    with Image.open(io.BytesIO(data)) as image:
+        return ocr_image(image, **options)
+
+def ocr_image_file(image_path, **options):
+    """Recognized text of an image file (its first frame); options as for ocr_image."""
+    with Image.open(image_path) as image:
+        return ocr_image(image, **options)
@@ -0,0 +1,90 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+def file_sha256(file_path, block_size=1 << 20):
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class OcrCache:
+    """
+    Content-addressed cache of OCR output.
+    Keys are a SHA-256 of the image bytes' digest and the OCR options, so changing
+    the preprocessing settings never serves text recognized under the old ones.
+    Texts live in a bounded in-memory LRU tier, backed by an optional SQLite tier
+    that survives restarts.
+    """
+
+    def __init__(self, max_items=1000, db_path=None):
+        self.max_items = max_items
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS ocr (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+            self._db.commit()
+
+    @staticmethod
+    def key(content_hash, options):
+        """Cache key for an image (by content digest) OCRed with the given options."""
+        payload = content_hash + "\0" + repr(sorted(options.items()))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """The cached text, or None on a miss."""
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return text
+            if self._db is not None:
+                row = self._db.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self.hits_disk += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        with self._lock:
+            self._remember(key, text)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO ocr (key, text) VALUES (?, ?)", (key, text))
+                self._db.commit()
+
+    def stats(self):
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            disk_items = None
+            if self._db is not None:
+                disk_items = self._db.execute("SELECT COUNT(*) FROM ocr").fetchone()[0]
+            return {
+                "memory_items": len(self._memory),
+                "disk_items": disk_items,
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,129 @@
+"""
+Page-parallel PDF text extraction.
+
+Kept free of app config and model imports so that process-pool workers start fast:
+workers are spawned (not forked) and only import PyPDF2, Pillow, pytesseract and the OCR helpers.
+Scanned pages are OCRed by the caller (see ocr_pages), not in the workers.
+"""
+import io
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+from PIL import Image
+
+from .ocr import ocr_image_bytes
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+def _get_pool(max_workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = max_workers
+        return _pool
+
+def shutdown_pool():
+    """Stops the worker processes (call on application shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def count_pages(file_path):
+    return len(PdfReader(file_path).pages)
+
+def extract_page_range(file_path, start, stop):
+    """
+    Extracts the text layer of pages [start, stop).
+    Returns ({page_number: text}, [indexes of pages with no text]).
+    """
+    reader = PdfReader(file_path)
+    texts, empty = {}, []
+    for i in range(start, stop):
+        page_text = reader.pages[i].extract_text()
+        if page_text and page_text.strip():
+            texts[i + 1] = page_text
+        else:
+            empty.append(i)
+    return texts, empty
+
+def _ocr_inline(data, dpi):
+    future = Future()
+    try:
+        future.set_result(ocr_image_bytes(data, dpi=dpi))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def ocr_pages(file_path, indexes, submit_ocr=None):
+    """
+    OCRs pages without a text layer (typically scans) from their embedded images.
+    `submit_ocr(image_bytes, dpi)` returns a Future of one image's text; the DPI is
+    derived from the image width and the page width (see ocr.prepare_image).
+    By default images are OCRed in the calling thread.
+    Returns {page_number: text}; unreadable images are skipped.
+    """
+    submit_ocr = submit_ocr or _ocr_inline
+    reader = PdfReader(file_path)
+    futures = {}
+    for i in indexes:
+        page = reader.pages[i]
+        page_inches = float(page.mediabox.width) / 72
+        futures[i + 1] = []
+        for image in page.images:
+            try:
+                data = image.data
+                with Image.open(io.BytesIO(data)) as pil_image:
+                    dpi = pil_image.width / page_inches if page_inches else None
+            except Exception:
+                # Unsupported image encodings are skipped rather than failing the document
+                continue
+            futures[i + 1].append(submit_ocr(data, dpi))
+    texts = {}
+    for page_number, page_futures in futures.items():
+        page_texts = []
+        for future in page_futures:
+            try:
+                page_texts.append(future.result())
+            except Exception:
+                continue
+        texts[page_number] = "\n".join(t for t in page_texts if t.strip())
+    return texts
+
+def extract_pdf_pages(file_path, max_workers=1, pages_per_task=8, min_parallel_pages=16, ocr_fallback=True,
+                      submit_ocr=None):
+    """
+    Extracts text from each page of a PDF, in page order.
+    Documents with at least `min_parallel_pages` pages are split into ranges of
+    `pages_per_task` pages extracted across a process pool. Pages with no text layer
+    are OCRed when `ocr_fallback` is set, each image through `submit_ocr` (see ocr_pages).
+    Returns a list of dicts: {"page": <page_number>, "text": <page_text>}.
+    """
+    n_pages = count_pages(file_path)
+    if max_workers <= 1 or n_pages < min_parallel_pages:
+        texts, empty = extract_page_range(file_path, 0, n_pages)
+    else:
+        pool = _get_pool(max_workers)
+        futures = [
+            pool.submit(extract_page_range, file_path, start, min(start + pages_per_task, n_pages))
+            for start in range(0, n_pages, pages_per_task)
+        ]
+        texts, empty = {}, []
+        for future in futures:
+            range_texts, range_empty = future.result()
+            texts.update(range_texts)
+            empty.extend(range_empty)
+    if ocr_fallback and empty:
+        texts.update(ocr_pages(file_path, empty, submit_ocr))
+    return [{"page": page, "text": texts[page]} for page in sorted(texts) if texts[page].strip()]
@@ -0,0 +1,120 @@
+import time
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class _SessionEntries:
+    """Cached results of one session: unit query embeddings and their results."""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.embeddings = []
+        self.results = []
+        self.created = []
+
+    def drop(self, i):
+        del self.embeddings[i], self.results[i], self.created[i]
+
+class QueryCache:
+    """
+    Session-scoped cache of query results.
+    A lookup hits when a cached query of the same session has an embedding with
+    cosine similarity >= `threshold` to the new query. Entries expire after `ttl`
+    seconds; each session keeps at most `max_entries` (oldest evicted first) and at
+    most `max_sessions` sessions are kept (least recently used evicted).
+    Invalidating a session (e.g. after new documents are upserted) bumps its
+    generation, so results computed against the old document set are never stored.
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600, max_entries=64, max_sessions=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        # Generations are unique across sessions, so a session evicted and re-created
+        # mid-query can't match a generation read before the eviction
+        self._generations = itertools.count()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _session(self, session_id):
+        entries = self._sessions.get(session_id)
+        if entries is None:
+            entries = self._sessions[session_id] = _SessionEntries(next(self._generations))
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self.evictions += len(evicted.results)
+        self._sessions.move_to_end(session_id)
+        return entries
+
+    @staticmethod
+    def _unit(embedding):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return embedding / (np.linalg.norm(embedding) or 1.0)
+
+    def generation(self, session_id):
+        """Current generation of a session; pass it back to put()."""
+        with self._lock:
+            return self._session(session_id).generation
+
+    def get(self, session_id, embedding):
+        """Returns the cached result of the most similar earlier query, or None."""
+        with self._lock:
+            entries = self._session(session_id)
+            now = time.time()
+            for i in reversed(range(len(entries.created))):
+                if now - entries.created[i] > self.ttl:
+                    entries.drop(i)
+                    self.expirations += 1
+            if entries.embeddings:
+                scores = np.stack(entries.embeddings) @ self._unit(embedding)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    return entries.results[best]
+            self.misses += 1
+            return None
+
+    def put(self, session_id, embedding, result, generation):
+        """Caches a result, unless the session was invalidated since `generation` was read."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            entries = self._session(session_id)
+            if entries.generation != generation:
+                return
+            entries.embeddings.append(self._unit(embedding))
+            entries.results.append(result)
+            entries.created.append(time.time())
+            while len(entries.results) > self.max_entries:
+                entries.drop(0)
+                self.evictions += 1
+
+    def invalidate(self, session_id):
+        """Drops a session's cached results, e.g. after its document set changed."""
+        with self._lock:
+            entries = self._session(session_id)
+            entries.generation = next(self._generations)
+            self.invalidations += len(entries.results)
+            entries.embeddings, entries.results, entries.created = [], [], []
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "entries": sum(len(e.results) for e in self._sessions.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
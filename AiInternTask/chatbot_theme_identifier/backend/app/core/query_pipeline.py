@@ -1,27 +1,70 @@
-from ..config import settings, _embedder, _pc
-from ..services.gemini_service import gemini_chat
+import json
+import asyncio
+import logging
+from ..config import settings
+from ..services.vector_store import _vector_store
+from ..services.gemini_service import gemini_chat_async, estimate_tokens
 from .document_processor import get_embedding
+from .selection import select_matches, SelectionStats
+from .metrics import span, ANSWERS_FILTERED
 
-def pinecone_query(embedding, index_name, top_k=10):
+logger = logging.getLogger(__name__)
+
+def pinecone_query(embedding, index_name, top_k=10, namespace=None, include_values=False):
     """
-    Query Pinecone index with given embedding, return top_k results.
+    Query the vector store index (and namespace) with given embedding, return top_k results.
     """
-    index = _pc.Index(index_name)
-    query_results = index.query(
-        vector=embedding,
-        top_k=top_k,
-        include_metadata=True
-    )
-    return query_results.get("matches", [])
+    with span("vector_query"):
+        return _vector_store.query(
+            index_name, embedding, top_k=top_k, namespace=namespace, include_values=include_values
+        )
 
-def retrieve_relevant_docs(question: str, index_name: str, top_k: int = 10):
+def retrieve_relevant_docs(question: str, index_name: str, top_k: int = 10, embedding=None, namespace=None,
+                           include_values=False):
     """
     Given a user question, embed and retrieve top_k most relevant docs.
+    Pass `embedding` if the question has already been embedded.
     """
-    embedding = get_embedding(question)
-    matches = pinecone_query(embedding, index_name=index_name, top_k=top_k)
+    if embedding is None:
+        embedding = get_embedding(question)
+    matches = pinecone_query(
+        embedding, index_name=index_name, top_k=top_k, namespace=namespace, include_values=include_values
+    )
     return matches
 
+# Counters of the selection stage, incl. extraction calls saved versus sending SELECT_MAX_K matches
+_selection_stats = SelectionStats(baseline_k=settings.SELECT_MAX_K)
+
+def retrieve_candidates(question, index_name, embedding=None, namespace=None):
+    """
+    Retrieves the matches to extract answers from: a wider candidate pool narrowed
+    by the selection stage (score floor, adaptive top_k, near-duplicate collapsing, MMR),
+    or simply the SELECT_MAX_K best matches when selection is disabled.
+    """
+    if not settings.SELECTION_ENABLED:
+        return retrieve_relevant_docs(
+            question, index_name=index_name, top_k=settings.SELECT_MAX_K, embedding=embedding, namespace=namespace
+        )
+    matches = retrieve_relevant_docs(
+        question, index_name=index_name, top_k=max(settings.RETRIEVAL_CANDIDATES, settings.SELECT_MAX_K),
+        embedding=embedding, namespace=namespace, include_values=True
+    )
+    with span("select"):
+        selected, counts = select_matches(
+            matches,
+            max_k=settings.SELECT_MAX_K,
+            min_score=settings.SELECT_MIN_SCORE,
+            score_margin=settings.SELECT_SCORE_MARGIN,
+            duplicate_threshold=settings.SELECT_DUPLICATE_THRESHOLD,
+            mmr_lambda=settings.SELECT_MMR_LAMBDA
+        )
+    _selection_stats.record(counts)
+    return selected
+
+def get_selection_stats():
+    """Totals of the selection stage: candidates, what each step dropped, LLM calls saved."""
+    return _selection_stats.stats()
+
 def build_citation_table(matches: list[dict]) -> list[dict]:
     """
     Constructs a table with metadata and scores for each matched document chunk.
@@ -33,37 +76,250 @@ def build_citation_table(matches: list[dict]) -> list[dict]:
             "doc_name": meta.get("doc_name"),
             "para": meta.get("para"),
             "page": meta.get("page"),
+            # Chunks may span several paragraphs/pages; older vectors only carry the start
+            "para_end": meta.get("para_end", meta.get("para")),
+            "page_end": meta.get("page_end", meta.get("page")),
             "text": meta.get("text"),
             "score": m.get("score", 0),
             "doc_id": m.get("id")
         })
     return table
 
-def extract_answers(user_query, top_chunks):
-    """
-    Use LLM to extract concise answers from each retrieved document chunk.
-    Skips generic or irrelevant LLM responses.
-    """
-    per_doc_answers = []
-    for chunk in top_chunks:
-        prompt = f"""Given the following context from document {chunk['doc_name']} (Page {chunk['page']}, Paragraph {chunk['para']}):
+def format_citation(chunk):
+    """Citation of a chunk's provenance range, e.g. "Page 3, Para 2-5" or "Page 3, Para 7 - Page 4, Para 2"."""
+    page, para = chunk.get("page"), chunk.get("para")
+    page_end = chunk.get("page_end") or page
+    para_end = chunk.get("para_end") or para
+    if page_end != page:
+        return f"Page {page}, Para {para} - Page {page_end}, Para {para_end}"
+    if para_end != para:
+        return f"Page {page}, Para {para}-{para_end}"
+    return f"Page {page}, Para {para}"
+
+# Phrases marking a generic or non-informative LLM answer
+VAGUE_ANSWER_MARKERS = (
+    "does not specify",
+    "doesn't provide",
+    "not provide",
+    "doesn't specify",
+    "doesn't mention",
+    "not mention",
+    "cannot answer"
+)
+
+def is_vague_answer(answer):
+    """True if the LLM answer is empty or non-informative."""
+    if not answer:
+        return True
+    answer = answer.lower()
+    return any(marker in answer for marker in VAGUE_ANSWER_MARKERS)
+
+def build_extraction_prompt(user_query, chunk):
+    """Prompt asking the LLM to answer the query from a single chunk."""
+    return f"""Given the following context from document {chunk['doc_name']} ({format_citation(chunk)}):
 -------------------
 {chunk['text']}
 -------------------
 Answer the question: "{user_query}" in a concise sentence, citing the document/page/para.
 """
+
+async def _extract_one(user_query, chunk, semaphore, timeout):
+    """
+    Runs one extraction call under the concurrency limit.
+    Returns None if the call fails or exceeds the timeout.
+    """
+    prompt = build_extraction_prompt(user_query, chunk)
+    async with semaphore:
         try:
-            answer = gemini_chat([prompt])
+            return await asyncio.wait_for(gemini_chat_async([prompt]), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Extraction timed out after %ss for %s", timeout, chunk['doc_id'])
+            return None
         except Exception as e:
-            answer = f"LLM API failed: {e}"
-            continue
-        # Skip vague or non-informative answers
-        if not answer or "does not specify" in answer.lower() or "doesn't provide" in answer.lower() or "not provide" in answer.lower() or "doesn't specify" in answer.lower() or "doesn't mention" in answer.lower() or "not mention" in answer.lower() or "cannot answer" in answer.lower():
+            logger.warning("LLM API failed for %s: %s", chunk['doc_id'], e)
+            return None
+
+def build_packed_extraction_prompt(user_query, chunks):
+    """Prompt asking the LLM to answer the query from each of several numbered chunks, as JSON."""
+    passages = "\n".join(
+        f"[{i + 1}] Document {chunk['doc_name']} ({format_citation(chunk)}):\n{chunk['text']}\n"
+        for i, chunk in enumerate(chunks)
+    )
+    return f"""You are given {len(chunks)} numbered context passages.
+-------------------
+{passages}-------------------
+For each passage, answer the question: "{user_query}" in a concise sentence using only that passage.
+Respond with a JSON array holding one object per passage: {{"chunk": <passage number>, "answer": "<answer>"}}.
+Use an empty answer for passages that do not answer the question.
+"""
+
+def pack_chunks(chunks, token_budget):
+    """
+    Groups chunk positions so that each group's passages fit in `token_budget`
+    (estimated tokens). A chunk larger than the budget gets a group of its own.
+    """
+    groups, current, current_tokens = [], [], 0
+    for position, chunk in enumerate(chunks):
+        tokens = estimate_tokens(chunk["text"])
+        if current and current_tokens + tokens > token_budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(position)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def parse_packed_answers(text, n_chunks):
+    """
+    Parses the JSON reply to a packed prompt into {chunk index: answer}.
+    Raises ValueError if the reply is not the expected JSON.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        # Strip a Markdown code fence (```json ... ```)
+        text = text.strip("`").strip()
+        if text.lower().startswith("json"):
+            text = text[4:]
+    try:
+        items = json.loads(text)
+        answers = {}
+        for item in items:
+            index = int(item["chunk"]) - 1
+            if not 0 <= index < n_chunks:
+                raise ValueError(f"chunk {index + 1} out of range")
+            answers[index] = str(item.get("answer") or "").strip()
+        return answers
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed packed answer: {e}")
+
+async def _extract_single(user_query, top_chunks, position, semaphore, timeout):
+    return [(position, await _extract_one(user_query, top_chunks[position], semaphore, timeout))]
+
+async def _extract_packed(user_query, top_chunks, positions, semaphore, timeout):
+    """
+    Answers several chunks with one LLM call. Returns [(position, answer or None)].
+    If the reply can't be parsed, the chunks fall back to one call each.
+    """
+    chunks = [top_chunks[p] for p in positions]
+    prompt = build_packed_extraction_prompt(user_query, chunks)
+    async with semaphore:
+        try:
+            reply = await asyncio.wait_for(
+                gemini_chat_async([prompt], response_mime_type="application/json"), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Packed extraction timed out after %ss for %d chunks", timeout, len(chunks))
+            return [(p, None) for p in positions]
+        except Exception as e:
+            logger.warning("LLM API failed for packed extraction of %d chunks: %s", len(chunks), e)
+            return [(p, None) for p in positions]
+    try:
+        answers = parse_packed_answers(reply, len(chunks))
+    except ValueError as e:
+        logger.warning("Could not parse packed answers (%s); falling back to per-chunk extraction", e)
+        results = await asyncio.gather(
+            *(_extract_single(user_query, top_chunks, p, semaphore, timeout) for p in positions)
+        )
+        return [answer for result in results for answer in result]
+    return [(p, answers.get(i)) for i, p in enumerate(positions)]
+
+def _extraction_calls(user_query, top_chunks, concurrency, timeout, mode):
+    """
+    Coroutines covering all chunks, each returning [(position, answer)]:
+    one per chunk ("per_chunk" mode) or one per token-budgeted group ("packed" mode).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    if mode == "packed":
+        return [
+            _extract_packed(user_query, top_chunks, positions, semaphore, timeout)
+            for positions in pack_chunks(top_chunks, settings.PACKED_TOKEN_BUDGET)
+        ]
+    return [_extract_single(user_query, top_chunks, p, semaphore, timeout) for p in range(len(top_chunks))]
+
+class ExtractionOutcome:
+    """
+    How one query's extraction went: chunks sent, and chunks whose call failed or
+    timed out (so their answers are missing rather than vague). Pass one to
+    extract_answers/iter_answers.
+    """
+
+    def __init__(self):
+        self.chunks = 0
+        self.failed = 0
+
+    @property
+    def complete(self):
+        """True if every extraction call returned."""
+        return self.failed == 0
+
+def _keep_answer(answer, outcome=None):
+    """False for failed, timed-out and vague answers, which are counted by reason."""
+    if answer is None:
+        ANSWERS_FILTERED.inc(reason="failed")
+        if outcome is not None:
+            outcome.failed += 1
+        return False
+    if is_vague_answer(answer):
+        ANSWERS_FILTERED.inc(reason="vague")
+        return False
+    return True
+
+def _answer_record(chunk, answer):
+    return {
+        "doc_id": chunk['doc_id'],
+        "doc_name": chunk['doc_name'],
+        "answer": answer,
+        "citation": format_citation(chunk)
+    }
+
+async def iter_answers(user_query, top_chunks, concurrency=None, timeout=None, mode=None, outcome=None):
+    """
+    Streaming variant of extract_answers: yields (position, answer record) as each
+    extraction call finishes, where position is the chunk's index in top_chunks.
+    Vague, failed and timed-out answers are skipped; failures are counted in `outcome`.
+    """
+    if outcome is not None:
+        outcome.chunks += len(top_chunks)
+    concurrency = concurrency or settings.EXTRACT_CONCURRENCY
+    timeout = timeout or settings.EXTRACT_TIMEOUT
+    mode = mode or settings.EXTRACTION_MODE
+    tasks = [
+        asyncio.ensure_future(call)
+        for call in _extraction_calls(user_query, top_chunks, concurrency, timeout, mode)
+    ]
+    try:
+        with span("extract_answers"):
+            for next_done in asyncio.as_completed(tasks):
+                for position, answer in await next_done:
+                    if _keep_answer(answer, outcome):
+                        yield position, _answer_record(top_chunks[position], answer)
+    finally:
+        # Cancel outstanding calls if the consumer stops early (e.g. client disconnect)
+        for task in tasks:
+            task.cancel()
+
+async def extract_answers(user_query, top_chunks, concurrency=None, timeout=None, mode=None, outcome=None):
+    """
+    Use LLM to extract concise answers from each retrieved document chunk.
+    In "per_chunk" mode each chunk gets its own call; in "packed" mode chunks are
+    grouped into as few calls as PACKED_TOKEN_BUDGET allows (EXTRACTION_MODE by default).
+    Calls run concurrently (at most `concurrency` in flight); calls slower than
+    `timeout` seconds are dropped (and counted in `outcome`, an ExtractionOutcome).
+    Output keeps chunk order. Skips generic or irrelevant LLM responses.
+    """
+    if outcome is not None:
+        outcome.chunks += len(top_chunks)
+    concurrency = concurrency or settings.EXTRACT_CONCURRENCY
+    timeout = timeout or settings.EXTRACT_TIMEOUT
+    mode = mode or settings.EXTRACTION_MODE
+    with span("extract_answers"):
+        results = await asyncio.gather(*_extraction_calls(user_query, top_chunks, concurrency, timeout, mode))
+    answers = sorted(answer for result in results for answer in result)
+    per_doc_answers = []
+    for position, answer in answers:
+        # Skip failed, timed-out, vague or non-informative answers
+        if not _keep_answer(answer, outcome):
             continue
-        per_doc_answers.append({
-            "doc_id": chunk['doc_id'],
-            "doc_name": chunk['doc_name'],
-            "answer": answer,
-            "citation": f"Page {chunk['page']}, Para {chunk['para']}"
-        })
+        per_doc_answers.append(_answer_record(top_chunks[position], answer))
     return per_doc_answers
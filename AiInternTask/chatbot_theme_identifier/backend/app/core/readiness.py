@@ -0,0 +1,67 @@
+import time
+import threading
+from .. import config
+from ..config import settings, get_embedder, startup_timings
+from ..services.vector_store import _vector_store
+
+# Embedding model state: not_loaded -> loading -> ready | error
+_model = {"state": "not_loaded", "error": None}
+# Last vector store check, refreshed at most every READY_CHECK_INTERVAL seconds
+_backend = {"ok": False, "error": None, "checked_at": 0.0}
+_lock = threading.Lock()
+
+def warm_up():
+    """
+    Preloads the embedding model, runs one dummy embedding (so ONNX sessions are
+    initialized before the first request) and checks the vector store.
+    """
+    start = time.perf_counter()
+    _model["state"] = "loading"
+    try:
+        embedder = get_embedder()
+        embed_start = time.perf_counter()
+        # Call the model directly; the embedding cache would hide a cold model
+        list(embedder.embed(["warm-up"]))
+        startup_timings["warmup_embedding_s"] = round(time.perf_counter() - embed_start, 3)
+        _model["state"] = "ready"
+    except Exception as e:
+        _model["state"] = "error"
+        _model["error"] = str(e)
+    check_vector_store(force=True)
+    startup_timings["warmup_total_s"] = round(time.perf_counter() - start, 3)
+
+def check_vector_store(force=False):
+    """Pings the vector store backend unless a recent result is available."""
+    with _lock:
+        if not force and time.time() - _backend["checked_at"] < settings.READY_CHECK_INTERVAL:
+            return dict(_backend)
+    try:
+        _vector_store.ping()
+        ok, error = True, None
+    except Exception as e:
+        ok, error = False, str(e)
+    with _lock:
+        _backend.update(ok=ok, error=error, checked_at=time.time())
+        return dict(_backend)
+
+def model_state():
+    """The embedding model state, including a model loaded lazily by a request instead of warm_up."""
+    if _model["state"] == "not_loaded" and config._embedder is not None:
+        _model["state"] = "ready"
+    return dict(_model)
+
+def readiness():
+    """
+    Returns (ready, details) for the readiness probe. Without WARMUP_ON_STARTUP the
+    model loads on first use, so only a failed load makes the instance not ready.
+    """
+    backend = check_vector_store()
+    model = model_state()
+    model_ok = model["state"] == "ready" or (not settings.WARMUP_ON_STARTUP and model["state"] == "not_loaded")
+    ready = model_ok and backend["ok"]
+    return ready, {
+        "ready": ready,
+        "model": model,
+        "vector_store": {"backend": settings.VECTOR_BACKEND, **backend},
+        "startup_timings": dict(startup_timings)
+    }
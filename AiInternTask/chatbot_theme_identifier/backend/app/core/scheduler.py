@@ -0,0 +1,225 @@
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from .metrics import ADMISSION_REJECTED, QUEUE_WAIT_SECONDS
+
+# Priorities of work sharing a PriorityLock: lower runs first
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+class Overloaded(Exception):
+    """Work refused by admission control; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, kind, reason, retry_after):
+        super().__init__(f"Too many {kind} requests in progress ({reason}); retry in {retry_after}s")
+        self.kind = kind
+        self.reason = reason
+        self.retry_after = retry_after
+
+class PriorityLock:
+    """
+    Mutex whose waiters are granted in priority order (INTERACTIVE before BULK),
+    first come first served within a priority. A holder is never preempted, so
+    interactive work waits at most for the bulk step holding the lock.
+    With `prioritize` off, all waiters are served in arrival order.
+    """
+
+    def __init__(self, name, prioritize=True):
+        self.name = name
+        self.prioritize = prioritize
+        self._cond = threading.Condition()
+        self._held = False
+        self._waiters = []
+        self._seq = itertools.count()
+        self.waiting = {priority: 0 for priority in PRIORITY_NAMES}
+
+    @contextmanager
+    def hold(self, priority=INTERACTIVE):
+        start = time.perf_counter()
+        with self._cond:
+            entry = (priority if self.prioritize else 0, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            self.waiting[priority] += 1
+            while self._held or self._waiters[0] != entry:
+                self._cond.wait()
+            heapq.heappop(self._waiters)
+            self.waiting[priority] -= 1
+            self._held = True
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, queue=f"{self.name}_{PRIORITY_NAMES[priority]}")
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._held = False
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {f"{self.name}_waiting_{PRIORITY_NAMES[p]}": n for p, n in self.waiting.items()}
+
+class _Ticket:
+    """An admitted unit of work; release() (idempotent) frees its capacity."""
+
+    def __init__(self, controller, kind, session_id, weight):
+        self.controller = controller
+        self.kind = kind
+        self.session_id = session_id
+        self.weight = weight
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        self.controller._release(self)
+
+class AdmissionController:
+    """
+    Caps work in flight per kind (e.g. "query", "ingest"), globally and per session.
+    `limits` maps each kind to:
+        max_in_flight    weight admitted at once (requests, or files for ingestion)
+        max_per_session  weight admitted at once for one session
+        max_queue        callers of acquire() allowed to wait for capacity (0: never wait)
+        max_wait         seconds a waiting caller may wait
+    Work that does not fit and cannot wait is refused with Overloaded, whose
+    retry_after estimates when capacity frees up from the recent time work of that
+    kind stayed admitted. Work heavier than a limit is still admitted when nothing
+    else of its kind (or its session) is in flight, so it can't be starved.
+    With `enabled` off everything is admitted (counts are still kept).
+    """
+
+    def __init__(self, limits, enabled=True, max_retry_after=60):
+        self.limits = limits
+        self.enabled = enabled
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._in_flight = {kind: 0 for kind in limits}
+        self._sessions = {kind: {} for kind in limits}
+        self._waiters = {kind: deque() for kind in limits}
+        # Moving average of how long a ticket stays admitted, seconds
+        self._hold_time = {kind: None for kind in limits}
+        self.admitted = {kind: 0 for kind in limits}
+        self.rejected = {kind: 0 for kind in limits}
+
+    def _fits(self, kind, session_id, weight):
+        if not self.enabled:
+            return True
+        limits = self.limits[kind]
+        in_flight = self._in_flight[kind]
+        session = self._sessions[kind].get(session_id, 0)
+        return (
+            (in_flight == 0 or in_flight + weight <= limits["max_in_flight"])
+            and (session == 0 or session + weight <= limits["max_per_session"])
+        )
+
+    def _admit(self, kind, session_id, weight):
+        self._in_flight[kind] += weight
+        sessions = self._sessions[kind]
+        sessions[session_id] = sessions.get(session_id, 0) + weight
+        self.admitted[kind] += 1
+        return _Ticket(self, kind, session_id, weight)
+
+    def _reject(self, kind, reason):
+        self.rejected[kind] += 1
+        ADMISSION_REJECTED.inc(kind=kind, reason=reason)
+        hold_time = self._hold_time[kind] or 1.0
+        backlog = (len(self._waiters[kind]) + 1) / max(1, self.limits[kind]["max_in_flight"])
+        retry_after = min(self.max_retry_after, max(1, math.ceil(hold_time * (1 + backlog))))
+        return Overloaded(kind, reason, retry_after)
+
+    def try_acquire(self, kind, session_id, weight=1):
+        """Admits work right away or raises Overloaded; for work queued elsewhere (ingestion jobs)."""
+        with self._lock:
+            if not self._waiters[kind] and self._fits(kind, session_id, weight):
+                QUEUE_WAIT_SECONDS.observe(0.0, queue=kind)
+                return self._admit(kind, session_id, weight)
+            raise self._reject(kind, "capacity")
+
+    async def acquire(self, kind, session_id, weight=1):
+        """
+        Admits work, waiting (in arrival order, up to max_wait) while its kind or its
+        session is at capacity. Raises Overloaded if the wait queue is full or the wait times out.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if not self._waiters[kind] and self._fits(kind, session_id, weight):
+                QUEUE_WAIT_SECONDS.observe(0.0, queue=kind)
+                return self._admit(kind, session_id, weight)
+            if len(self._waiters[kind]) >= self.limits[kind]["max_queue"]:
+                raise self._reject(kind, "queue_full")
+            loop = asyncio.get_running_loop()
+            waiter = (session_id, weight, loop, loop.create_future())
+            self._waiters[kind].append(waiter)
+        future = waiter[3]
+        try:
+            ticket = await asyncio.wait_for(future, self.limits[kind]["max_wait"])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if waiter in self._waiters[kind]:
+                    self._waiters[kind].remove(waiter)
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                error = self._reject(kind, "timeout") if timed_out else e
+            # Capacity granted as the wait ended goes back (a pending grant releases itself, see _resolve)
+            if future.done() and not future.cancelled():
+                future.result().release()
+            raise error
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, queue=kind)
+        return ticket
+
+    @asynccontextmanager
+    async def admit(self, kind, session_id, weight=1):
+        """`async with` form of acquire: the work stays admitted for the block."""
+        ticket = await self.acquire(kind, session_id, weight)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _release(self, ticket):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            kind = ticket.kind
+            self._in_flight[kind] -= ticket.weight
+            sessions = self._sessions[kind]
+            sessions[ticket.session_id] -= ticket.weight
+            if not sessions[ticket.session_id]:
+                del sessions[ticket.session_id]
+            held = time.monotonic() - ticket.admitted_at
+            previous = self._hold_time[kind]
+            self._hold_time[kind] = held if previous is None else 0.8 * previous + 0.2 * held
+            self._wake(kind)
+
+    def _wake(self, kind):
+        """Admits waiters that now fit, oldest first (a waiter blocked by its session doesn't block others)."""
+        for waiter in list(self._waiters[kind]):
+            session_id, weight, loop, future = waiter
+            if future.done():
+                self._waiters[kind].remove(waiter)
+            elif self._fits(kind, session_id, weight):
+                self._waiters[kind].remove(waiter)
+                loop.call_soon_threadsafe(_resolve, future, self._admit(kind, session_id, weight))
+
+    def stats(self):
+        """Weight in flight, waiters, admitted/rejected counts and mean hold time, per kind."""
+        with self._lock:
+            stats = {}
+            for kind in self.limits:
+                stats[f"{kind}_in_flight"] = self._in_flight[kind]
+                stats[f"{kind}_queued"] = len(self._waiters[kind])
+                stats[f"{kind}_admitted"] = self.admitted[kind]
+                stats[f"{kind}_rejected"] = self.rejected[kind]
+                stats[f"{kind}_hold_seconds"] = round(self._hold_time[kind] or 0.0, 3)
+            return stats
+
+def _resolve(future, ticket):
+    if future.done():
+        # The waiter gave up meanwhile
+        ticket.release()
+    else:
+        future.set_result(ticket)
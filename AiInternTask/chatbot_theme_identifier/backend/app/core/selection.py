@@ -0,0 +1,97 @@
+import re
+import threading
+
+import numpy as np
+
+def _normalize_text(text):
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+def select_matches(matches, max_k=10, min_score=0.0, score_margin=1.0, duplicate_threshold=1.0, mmr_lambda=1.0):
+    """
+    Picks the retrieved matches worth an LLM extraction call. In order:
+    - drops matches scoring below `min_score` (absolute floor; <= 0 disables it) or more than
+      `score_margin` below the best match (adaptive top_k: a flat score curve keeps
+      many matches, a clear winner few);
+    - collapses near-duplicates: a match whose vector has cosine similarity >=
+      `duplicate_threshold` to a better one (or the same text) is dropped;
+    - picks at most `max_k` of the rest by maximal marginal relevance, trading
+      relevance (weight `mmr_lambda`) against similarity to matches already picked.
+    Matches need "values" for the duplicate and MMR steps; without them only the
+    score filters, exact-text collapsing and the `max_k` cut apply.
+    Returns (selected matches, best first; counts of what each step removed).
+    """
+    counts = {"candidates": len(matches), "below_floor": 0, "below_margin": 0, "duplicates": 0, "not_selected": 0}
+    matches = sorted(matches, key=lambda m: m.get("score", 0), reverse=True)
+    if matches:
+        best = matches[0].get("score", 0)
+        kept = [m for m in matches if min_score <= 0 or m.get("score", 0) >= min_score]
+        counts["below_floor"] = len(matches) - len(kept)
+        matches = [m for m in kept if m.get("score", 0) >= best - score_margin]
+        counts["below_margin"] = len(kept) - len(matches)
+
+    # Values may be lists (Pinecone) or arrays (local store)
+    has_values = bool(matches) and all(m.get("values") is not None and len(m["values"]) for m in matches)
+    if has_values:
+        vectors = np.asarray([m["values"] for m in matches], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+    unique, seen_texts = [], set()
+    for i, match in enumerate(matches):
+        text = _normalize_text(match.get("metadata", {}).get("text"))
+        duplicate = text in seen_texts
+        if not duplicate and has_values and unique:
+            duplicate = float(np.max(vectors[unique] @ vectors[i])) >= duplicate_threshold
+        if duplicate:
+            counts["duplicates"] += 1
+        else:
+            unique.append(i)
+            seen_texts.add(text)
+
+    if has_values and mmr_lambda < 1.0:
+        relevance = np.asarray([matches[i].get("score", 0) for i in unique], dtype=np.float32)
+        similarity = vectors[unique] @ vectors[unique].T
+        remaining = list(range(len(unique)))
+        picked = []
+        while remaining and len(picked) < max_k:
+            if picked:
+                redundancy = similarity[np.ix_(remaining, picked)].max(axis=1)
+                mmr = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+            else:
+                mmr = relevance[remaining]
+            picked.append(remaining.pop(int(np.argmax(mmr))))
+        selected = [matches[unique[p]] for p in picked]
+    else:
+        selected = [matches[i] for i in unique[:max_k]]
+    counts["not_selected"] = len(unique) - len(selected)
+    counts["selected"] = len(selected)
+    return selected, counts
+
+class SelectionStats:
+    """
+    Running totals of the selection stage. `baseline_k` is the fixed number of
+    matches that would be sent to extraction without selection, used to count
+    the LLM calls saved.
+    """
+
+    def __init__(self, baseline_k=10):
+        self.baseline_k = baseline_k
+        self._totals = {
+            "queries": 0, "candidates": 0, "below_floor": 0, "below_margin": 0,
+            "duplicates": 0, "not_selected": 0, "selected": 0, "llm_calls_saved": 0
+        }
+        self._lock = threading.Lock()
+
+    def record(self, counts):
+        with self._lock:
+            self._totals["queries"] += 1
+            for key, value in counts.items():
+                self._totals[key] += value
+            self._totals["llm_calls_saved"] += min(counts["candidates"], self.baseline_k) - counts["selected"]
+
+    def stats(self):
+        with self._lock:
+            totals = dict(self._totals)
+        queries = totals["queries"]
+        totals["selected_per_query"] = round(totals["selected"] / queries, 2) if queries else 0.0
+        return totals
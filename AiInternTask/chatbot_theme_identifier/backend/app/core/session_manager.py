@@ -0,0 +1,270 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from .metrics import span, SESSIONS_EVICTED, SESSION_EVICTION_ERRORS
+
+logger = logging.getLogger(__name__)
+
+class SessionManager:
+    """
+    Tracks the last access time of each session and evicts idle ones in a background
+    sweep: sessions idle for more than `ttl` seconds, then the least recently used
+    beyond `max_sessions` (0 disables either limit). Sessions in use (see `in_use`)
+    are never evicted. `evict_fn(session_id)` deletes a session's vectors and data.
+    Access times are kept in memory and written to SQLite (`db_path`, optional), so
+    idle sessions are still evicted after a restart. Processes serving the same
+    sessions (uvicorn workers, replicas sharing the vector store) must share `db_path`:
+    the stored time of a session lags its last access by at most `write_interval`
+    seconds, stored times only move forward, and a session's time is re-read from it
+    right before eviction, so one process never evicts a session another one is
+    serving. Without `db_path`, run a single process.
+    """
+
+    def __init__(self, evict_fn, ttl=86400, max_sessions=1000, sweep_interval=300, db_path=None,
+                 discover_fn=None, write_interval=60):
+        self.evict_fn = evict_fn
+        self.discover_fn = discover_fn
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self.write_interval = write_interval
+        self._last_access = {}
+        # Access time last written to (or read from) the database, per session
+        self._persisted = {}
+        self._dirty = set()
+        self._removed = set()
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.evicted = {"ttl": 0, "capacity": 0}
+        self.errors = 0
+        self.last_sweep_at = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._last_access = self._read_shared()
+            self._persisted = dict(self._last_access)
+
+    def _read_shared(self, session_id=None):
+        """Access times in the database: all of them, or one session's (None if it has no row)."""
+        with self._db_lock:
+            if session_id is None:
+                return dict(self._db.execute("SELECT session_id, last_access FROM sessions"))
+            row = self._db.execute("SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            return row[0] if row else None
+
+    def _write_shared(self, upserts=(), deletes=()):
+        """Stores access times, never replacing a later one (another process may have written it)."""
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) ON CONFLICT(session_id) "
+                "DO UPDATE SET last_access = MAX(last_access, excluded.last_access)", upserts
+            )
+            self._db.executemany("DELETE FROM sessions WHERE session_id = ?", deletes)
+            self._db.commit()
+
+    def touch(self, session_id):
+        """Records an access to the session; written through to the database at most every write_interval."""
+        now = time.time()
+        with self._lock:
+            self._last_access[session_id] = now
+            self._removed.discard(session_id)
+            if self._db is None or now - self._persisted.get(session_id, 0) < self.write_interval:
+                self._dirty.add(session_id)
+                return
+            self._persisted[session_id] = now
+            self._dirty.discard(session_id)
+        self._write_shared(upserts=[(session_id, now)])
+
+    def forget(self, session_id):
+        """Stops tracking a session whose data was deleted explicitly."""
+        with self._lock:
+            self._last_access.pop(session_id, None)
+            self._dirty.discard(session_id)
+            self._removed.add(session_id)
+
+    def acquire(self, session_id):
+        """Marks the session as in use (e.g. during ingestion) so it is not evicted until released."""
+        with self._lock:
+            self._active[session_id] = self._active.get(session_id, 0) + 1
+
+    def release(self, session_id):
+        """Ends one use of the session; it counts as accessed now."""
+        with self._lock:
+            self._active[session_id] -= 1
+            if not self._active[session_id]:
+                del self._active[session_id]
+        self.touch(session_id)
+
+    @contextmanager
+    def in_use(self, session_id):
+        """Context manager form of acquire/release."""
+        self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release(session_id)
+
+    def _adopt(self):
+        """Starts tracking sessions with data but no recorded access (e.g. from before tracking existed)."""
+        if self.discover_fn is None:
+            return
+        try:
+            discovered = self.discover_fn()
+        except Exception as e:
+            logger.warning("Could not list existing sessions: %s", e)
+            return
+        with self._lock:
+            for session_id, last_access in discovered.items():
+                if session_id not in self._last_access:
+                    self._last_access[session_id] = last_access
+                    self._dirty.add(session_id)
+        logger.info("Tracking %d sessions", len(self._last_access))
+
+    def _candidates(self, now):
+        """Sessions to evict now, as [(session_id, reason)], least recently used first."""
+        with self._lock:
+            idle = sorted(
+                (t, sid) for sid, t in self._last_access.items() if sid not in self._active
+            )
+            n_tracked = len(self._last_access)
+        candidates = []
+        for last_access, session_id in idle:
+            if self.ttl and now - last_access > self.ttl:
+                candidates.append((session_id, "ttl"))
+            elif self.max_sessions and n_tracked - len(candidates) > self.max_sessions:
+                candidates.append((session_id, "capacity"))
+            else:
+                break
+        return candidates
+
+    def _evict(self, session_id, reason, seen_at):
+        with self._lock:
+            # Skip sessions used since they were picked
+            if session_id in self._active or self._last_access.get(session_id) != seen_at:
+                return False
+        if self._db is not None:
+            # Last check against accesses other processes recorded since the last sync
+            shared = self._read_shared(session_id)
+            if shared is not None and shared > seen_at:
+                with self._lock:
+                    if self._last_access.get(session_id) == seen_at:
+                        self._last_access[session_id] = self._persisted[session_id] = shared
+                return False
+        try:
+            with span("session_evict"):
+                self.evict_fn(session_id)
+        except Exception as e:
+            logger.warning("Could not evict session %s: %s", session_id, e)
+            SESSION_EVICTION_ERRORS.inc()
+            self.errors += 1
+            return False
+        with self._lock:
+            if self._last_access.get(session_id) == seen_at:
+                del self._last_access[session_id]
+                self._dirty.discard(session_id)
+                self._persisted.pop(session_id, None)
+        if self._db is not None:
+            # Keep the row if another process recorded an access meanwhile
+            with self._db_lock:
+                self._db.execute(
+                    "DELETE FROM sessions WHERE session_id = ? AND last_access <= ?", (session_id, seen_at)
+                )
+                self._db.commit()
+        SESSIONS_EVICTED.inc(reason=reason)
+        self.evicted[reason] += 1
+        logger.info("Evicted session %s (%s)", session_id, reason)
+        return True
+
+    def _flush(self):
+        """Writes changed access times to SQLite."""
+        if self._db is None:
+            return
+        with self._lock:
+            upserts = [(sid, self._last_access[sid]) for sid in self._dirty if sid in self._last_access]
+            deletes = [(sid,) for sid in self._removed]
+            self._dirty.clear()
+            self._removed.clear()
+            self._persisted.update(upserts)
+            for sid, in deletes:
+                self._persisted.pop(sid, None)
+        self._write_shared(upserts, deletes)
+
+    def _sync(self):
+        """Flushes local changes, then takes on the later accesses and removals other processes recorded."""
+        if self._db is None:
+            return
+        self._flush()
+        read_at = time.time()
+        shared = self._read_shared()
+        with self._lock:
+            for session_id, last_access in shared.items():
+                if last_access > self._last_access.get(session_id, float("-inf")):
+                    self._last_access[session_id] = self._persisted[session_id] = last_access
+            for session_id, last_access in list(self._last_access.items()):
+                # Written before, now gone: deleted or evicted by another process (unless accessed since)
+                if (session_id not in shared and session_id in self._persisted and session_id not in self._dirty
+                        and last_access < read_at):
+                    del self._last_access[session_id]
+                    del self._persisted[session_id]
+
+    def sweep(self):
+        """Evicts expired and over-capacity sessions once. Returns the number evicted."""
+        self._sync()
+        now = time.time()
+        evicted = 0
+        for session_id, reason in self._candidates(now):
+            with self._lock:
+                seen_at = self._last_access.get(session_id)
+            if seen_at is not None and self._evict(session_id, reason, seen_at):
+                evicted += 1
+        self.last_sweep_at = now
+        self._flush()
+        return evicted
+
+    def _run(self):
+        self._adopt()
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning("Session sweep failed: %s", e)
+            if self._stop.wait(self.sweep_interval):
+                return
+
+    def start(self):
+        """Starts the background sweep (the first one also adopts existing sessions)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the sweep and persists access times."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._flush()
+
+    def stats(self):
+        """Tracked/active sessions, evictions by reason and failures."""
+        with self._lock:
+            return {
+                "tracked": len(self._last_access),
+                "active": len(self._active),
+                "evicted_ttl": self.evicted["ttl"],
+                "evicted_capacity": self.evicted["capacity"],
+                "eviction_errors": self.errors,
+                "last_sweep_at": self.last_sweep_at
+            }
@@ -0,0 +1,20 @@
+from ..config import settings
+
+# Per-session indexes are named <INDEX_PREFIX><session_id>
+INDEX_PREFIX = "wasserstoff-"
+
+def session_target(session_id):
+    """
+    Where a session's vectors live, as (index_name, namespace).
+    By default each session has its own index; with SHARED_INDEX_NAME set, all
+    sessions share that index and each session is a namespace in it.
+    """
+    if settings.SHARED_INDEX_NAME:
+        return settings.SHARED_INDEX_NAME, session_id
+    return f"{INDEX_PREFIX}{session_id}", None
+
+def session_from_index(index_name):
+    """The session owning a per-session index, or None for other indexes."""
+    if index_name.startswith(INDEX_PREFIX):
+        return index_name[len(INDEX_PREFIX):]
+    return None
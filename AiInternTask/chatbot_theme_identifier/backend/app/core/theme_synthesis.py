@@ -1,21 +1,19 @@
-from ..services.gemini_service import gemini_chat
+import math
+import asyncio
+import logging
 
-def synthesize_themes(user_query, per_doc_answers):
-    """
-    Synthesizes key themes from multiple per-document answers using an LLM.
-    Returns a concise summary with document citations.
-    """
-    if not per_doc_answers:
-        return "Not enough context in the uploaded documents to answer this question."
+import numpy as np
+from ..config import settings
+from ..services.gemini_service import gemini_chat_async, gemini_stream_async
+from .document_processor import get_embeddings
+from .kmeans import spherical_kmeans
+from .metrics import span
 
-    formatted = "\n".join(
-        [f"Document {a['doc_name']} ({a['citation']}): {a['answer']}" for a in per_doc_answers]
-    )
-    prompt = f"""
-Given these answers from various documents for the question: "{user_query}":
-{formatted}
+logger = logging.getLogger(__name__)
+
+NO_CONTEXT_MESSAGE = "Not enough context in the uploaded documents to answer this question."
 
-Identify the main themes (1-4) present in these answers. For each theme, provide:
+THEME_FORMAT = """Identify the main themes (1-4) present in these answers. For each theme, provide:
 - A short title (e.g., "Theme 1 - Regulatory Non-Compliance")
 - A concise, consolidated summary (2-4 sentences) addressing that theme, using evidence from the supporting documents.
 - Include supporting document names or IDs and their citations.
@@ -24,18 +22,145 @@ Identify the main themes (1-4) present in these answers. For each theme, provide
 Format:
 Theme 1 - <Short Title>:
 
- <Citation Document Names>: 
- <Consolidated answer> 
+ <Citation Document Names>:
+ <Consolidated answer>
 
 Theme 2 - <Short Title>:
 
  <Citation Document Names>:
- <Consolidated answer> 
+ <Consolidated answer>
+
+If there is only one clear theme, output just one theme."""
+
+def format_answer(answer):
+    """One answer as a prompt line with its source(s): "Document <name> (<citation>): <answer>"."""
+    sources = answer.get("sources") or [(answer["doc_name"], answer["citation"])]
+    label = "Document" if len(sources) == 1 else "Documents"
+    cited = ", ".join(f"{name} ({citation})" for name, citation in sources)
+    return f"{label} {cited}: {answer['answer']}"
 
-If there is only one clear theme, output just one theme.
+def build_theme_prompt_from_lines(user_query, lines):
+    formatted = "\n".join(lines)
+    return f"""
+Given these answers from various documents for the question: "{user_query}":
+{formatted}
+
+{THEME_FORMAT}
     """
-    try:
-        response = gemini_chat([prompt])
-    except Exception as e:
-        response = f"Theme synthesis failed: {e}"
-    return response
+
+def build_theme_prompt(user_query, per_doc_answers):
+    """Prompt asking the LLM to group per-document answers into 1-4 cited themes."""
+    return build_theme_prompt_from_lines(user_query, [format_answer(a) for a in per_doc_answers])
+
+def build_cluster_prompt(user_query, lines):
+    """Map step: condense one cluster of related answers into a short cited summary."""
+    formatted = "\n".join(lines)
+    return f"""
+Given these related answers from various documents for the question: "{user_query}":
+{formatted}
+
+Summarize what they say in 2-4 sentences. Keep every document name and citation
+that supports a statement, in the form <Document name> (<citation>).
+    """
+
+def _unit_embeddings(texts):
+    vectors = np.asarray(get_embeddings(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def merge_redundant_answers(answers, vectors, threshold):
+    """
+    Merges answers whose embeddings have cosine similarity >= threshold into the
+    first of them; merged answers keep the sources (document, citation) of all.
+    Returns (merged answers, their unit vectors).
+    """
+    kept, kept_rows = [], []
+    for i, answer in enumerate(answers):
+        sources = answer.get("sources") or [(answer["doc_name"], answer["citation"])]
+        if kept_rows:
+            similarity = vectors[kept_rows] @ vectors[i]
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                kept[best]["sources"].extend(s for s in sources if s not in kept[best]["sources"])
+                continue
+        kept.append({**answer, "sources": list(sources)})
+        kept_rows.append(i)
+    return kept, vectors[kept_rows]
+
+def cluster_rows(vectors, max_size):
+    """Groups rows into clusters of related vectors, none larger than max_size."""
+    n_clusters = math.ceil(len(vectors) / max_size)
+    assign = np.argmax(vectors @ spherical_kmeans(vectors, n_clusters).T, axis=1)
+    clusters = []
+    for c in range(n_clusters):
+        rows = np.nonzero(assign == c)[0].tolist()
+        # Unbalanced clusters are cut to size, keeping prompts bounded
+        clusters.extend(rows[i:i + max_size] for i in range(0, len(rows), max_size))
+    return clusters
+
+async def _summarize_cluster(user_query, lines, semaphore):
+    """One map call; if it fails, the cluster's lines are passed on unsummarized."""
+    async with semaphore:
+        try:
+            summary = await asyncio.wait_for(
+                gemini_chat_async([build_cluster_prompt(user_query, lines)]), settings.THEME_MAP_TIMEOUT
+            )
+            return [f"Summary of {len(lines)} answers: {summary.strip()}"]
+        except Exception as e:
+            logger.warning("Cluster summary failed (%s); using its %d answers directly", e, len(lines))
+            return lines
+
+async def theme_prompt_lines(user_query, per_doc_answers):
+    """
+    Lines for the final theme prompt. Small answer sets are used as they are.
+    Larger ones are merged (near-identical answers become one line citing all their
+    sources), then reduced hierarchically: related lines are clustered, each
+    cluster is summarized by a parallel LLM call, and the summaries replace them,
+    until at most THEME_DIRECT_MAX_ANSWERS lines remain.
+    """
+    if len(per_doc_answers) <= settings.THEME_DIRECT_MAX_ANSWERS:
+        return [format_answer(a) for a in per_doc_answers]
+    vectors = await asyncio.to_thread(_unit_embeddings, [a["answer"] for a in per_doc_answers])
+    answers, vectors = merge_redundant_answers(per_doc_answers, vectors, settings.THEME_MERGE_THRESHOLD)
+    lines = [format_answer(a) for a in answers]
+    semaphore = asyncio.Semaphore(settings.THEME_MAP_CONCURRENCY)
+    while len(lines) > settings.THEME_DIRECT_MAX_ANSWERS:
+        clusters = cluster_rows(vectors, settings.THEME_CLUSTER_SIZE)
+        with span("theme_map"):
+            results = await asyncio.gather(
+                *(_summarize_cluster(user_query, [lines[r] for r in rows], semaphore) for rows in clusters)
+            )
+        reduced = [line for result in results for line in result]
+        if len(reduced) >= len(lines):
+            # Summaries failed: nothing left to reduce
+            break
+        lines = reduced
+        vectors = await asyncio.to_thread(_unit_embeddings, lines)
+    return lines
+
+async def synthesize_themes(user_query, per_doc_answers):
+    """
+    Synthesizes key themes from multiple per-document answers using an LLM.
+    Returns a concise summary with document citations; raises if the LLM call fails.
+    """
+    if not per_doc_answers:
+        return NO_CONTEXT_MESSAGE
+
+    with span("theme_synthesis"):
+        lines = await theme_prompt_lines(user_query, per_doc_answers)
+        return await gemini_chat_async([build_theme_prompt_from_lines(user_query, lines)])
+
+async def stream_themes(user_query, per_doc_answers):
+    """
+    Streaming variant of synthesize_themes: yields the theme summary in text deltas
+    as Gemini generates it. A failure is raised, possibly after some deltas, rather
+    than appended to the text.
+    """
+    if not per_doc_answers:
+        yield NO_CONTEXT_MESSAGE
+        return
+    with span("theme_synthesis"):
+        lines = await theme_prompt_lines(user_query, per_doc_answers)
+        async for delta in gemini_stream_async([build_theme_prompt_from_lines(user_query, lines)]):
+            yield delta
@@ -1,6 +1,20 @@
+import logging
+import threading
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .api import endpoints
+from .services.gemini_service import close_gemini_client
+from .core.pdf_extraction import shutdown_pool
+from .core.document_processor import shutdown_ocr_pool
+from .core.readiness import warm_up
+from .core.metrics import MetricsMiddleware
+from .core.scheduler import Overloaded
+from .config import settings, check_required_settings
+
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+# httpx logs every Gemini request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Create FastAPI application instance
 app = FastAPI()
@@ -15,3 +29,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+# Request counts/latency per route, and optional per-request stage traces
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(Overloaded)
+async def overloaded(request, error):
+    # Shed load fast: the client backs off instead of queueing behind work that would time out
+    return JSONResponse(
+        status_code=429, content={"detail": str(error)}, headers={"Retry-After": str(error.retry_after)}
+    )
+
+@app.on_event("startup")
+def startup():
+    check_required_settings()
+    # Load the model in the background; /readyz reports when it is done
+    if settings.WARMUP_ON_STARTUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    # Evict idle sessions' indexes and data in the background
+    endpoints.session_manager.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    # Release pooled Gemini connections, PDF extraction and OCR workers; persist session access times
+    close_gemini_client()
+    shutdown_pool()
+    shutdown_ocr_pool()
+    endpoints.session_manager.stop()
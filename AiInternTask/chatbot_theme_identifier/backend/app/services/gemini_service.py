@@ -1,10 +1,267 @@
-import requests
+import json
+import time
+import random
+import asyncio
+import threading
+import httpx
 from ..config import settings
+from ..core.metrics import span, LLM_CALLS, LLM_RETRIES, LLM_TOKENS
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used for quota accounting."""
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `per_minute` tokens per minute.
+    Waiters are served in FIFO order.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        """Wait until `amount` tokens are available, then take them."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def debit(self, amount):
+        """Take (or with a negative amount, return) tokens without waiting, e.g. to settle actual usage."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+class GeminiClient:
+    """
+    Async Gemini client with a persistent connection pool, retries with jittered
+    exponential backoff on 429/5xx, and client-side requests/tokens-per-minute limits.
+    """
+
+    def __init__(self, api_key, base_url, model, timeout=30.0, max_retries=4,
+                 max_connections=20, requests_per_minute=0, tokens_per_minute=0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        # A limit of 0 disables that bucket
+        self._rpm = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tpm = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._http = None
+        # Token usage reported by the server, for cost tracking
+        self.usage = {"requests": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+    def _client(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._http
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than a server-sent Retry-After."""
+        delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            return delay
+
+    @staticmethod
+    def _payload(messages, temperature, response_mime_type=None):
+        config = {"temperature": temperature}
+        if response_mime_type:
+            # e.g. "application/json" for structured output
+            config["responseMimeType"] = response_mime_type
+        return {
+            "contents": [{"parts": [{"text": msg} for msg in messages]}],
+            "generationConfig": config
+        }
+
+    def _settle_usage(self, body, reserved):
+        # Count the real usage once the server reports it, and settle the quota with it
+        usage = body.get("usageMetadata") or {}
+        used = usage.get("totalTokenCount")
+        self.usage["requests"] += 1
+        self.usage["prompt_tokens"] += usage.get("promptTokenCount", 0)
+        self.usage["output_tokens"] += usage.get("candidatesTokenCount", 0)
+        self.usage["total_tokens"] += used or 0
+        LLM_CALLS.inc()
+        LLM_TOKENS.inc(usage.get("promptTokenCount", 0), kind="prompt")
+        LLM_TOKENS.inc(usage.get("candidatesTokenCount", 0), kind="output")
+        if self._tpm and used:
+            self._tpm.debit(used - reserved)
+
+    async def generate(self, messages, temperature=0.2, response_mime_type=None):
+        """Calls generateContent and returns the generated text."""
+        url = f"{self.base_url}/models/{self.model}:generateContent"
+        data = self._payload(messages, temperature, response_mime_type)
+        reserved = sum(estimate_tokens(msg) for msg in messages)
+        if self._tpm:
+            await self._tpm.acquire(reserved)
+        for attempt in range(self.max_retries + 1):
+            if self._rpm:
+                await self._rpm.acquire()
+            try:
+                resp = await self._client().post(url, params={"key": self.api_key}, json=data)
+            except httpx.TransportError:
+                # Connection errors and timeouts are retried like 5xx
+                if attempt == self.max_retries:
+                    raise
+                LLM_RETRIES.inc()
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if resp.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                LLM_RETRIES.inc()
+                await asyncio.sleep(self._backoff(attempt, resp.headers.get("retry-after")))
+                continue
+            resp.raise_for_status()  # Raises exception for HTTP errors
+            body = resp.json()
+            self._settle_usage(body, reserved)
+            return body["candidates"][0]["content"]["parts"][0]["text"]
+
+    async def stream(self, messages, temperature=0.2):
+        """
+        Calls streamGenerateContent (server-sent events) and yields text deltas as they arrive.
+        Failures are retried only until the first delta has been yielded.
+        """
+        url = f"{self.base_url}/models/{self.model}:streamGenerateContent"
+        data = self._payload(messages, temperature)
+        reserved = sum(estimate_tokens(msg) for msg in messages)
+        if self._tpm:
+            await self._tpm.acquire(reserved)
+        started = False
+        last_body = None
+        for attempt in range(self.max_retries + 1):
+            if self._rpm:
+                await self._rpm.acquire()
+            retry_after = None
+            try:
+                async with self._client().stream(
+                    "POST", url, params={"key": self.api_key, "alt": "sse"}, json=data
+                ) as resp:
+                    if resp.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        retry_after = resp.headers.get("retry-after")
+                    else:
+                        if resp.is_error:
+                            await resp.aread()
+                            resp.raise_for_status()
+                        async for line in resp.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            body = last_body = json.loads(line[len("data:"):])
+                            parts = body.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+                            delta = "".join(part.get("text", "") for part in parts)
+                            if delta:
+                                started = True
+                                yield delta
+                        # Usage metadata is cumulative: settle once, with the last event's
+                        if last_body is not None:
+                            self._settle_usage(last_body, reserved)
+                        return
+            except httpx.TransportError:
+                if started or attempt == self.max_retries:
+                    raise
+            LLM_RETRIES.inc()
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+# The client and its pool live on one background event loop, so that sync callers
+# and every request handler's loop share the same connections and rate limits.
+_loop = None
+_client = None
+_init_lock = threading.Lock()
+
+def _get_loop_and_client():
+    global _loop, _client
+    with _init_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gemini-client", daemon=True).start()
+            _client = GeminiClient(
+                api_key=settings.GEMINI_API_KEY,
+                base_url=settings.GEMINI_API_BASE,
+                model=settings.GEMINI_MODEL,
+                timeout=settings.GEMINI_TIMEOUT,
+                max_retries=settings.GEMINI_MAX_RETRIES,
+                max_connections=settings.GEMINI_MAX_CONNECTIONS,
+                requests_per_minute=settings.GEMINI_RPM,
+                tokens_per_minute=settings.GEMINI_TPM
+            )
+    return _loop, _client
+
+async def gemini_chat_async(messages, temperature=0.2, response_mime_type=None):
+    """
+    Async variant of gemini_chat; awaitable from any event loop.
+    Cancelling the awaiting task cancels the underlying HTTP request.
+    """
+    loop, client = _get_loop_and_client()
+    future = asyncio.run_coroutine_threadsafe(client.generate(messages, temperature, response_mime_type), loop)
+    with span("llm_call"):
+        return await asyncio.wrap_future(future)
+
+async def gemini_stream_async(messages, temperature=0.2):
+    """
+    Streams a Gemini response as text deltas; usable from any event loop.
+    The stream runs on the client loop and is relayed through a queue.
+    """
+    loop, client = _get_loop_and_client()
+    caller_loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for delta in client.stream(messages, temperature):
+                caller_loop.call_soon_threadsafe(queue.put_nowait, delta)
+        except Exception as e:
+            caller_loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            caller_loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        with span("llm_stream"):
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        # Stop the upstream request if the consumer goes away early
+        future.cancel()
 
 def gemini_chat(messages, temperature=0.2):
     """
     Calls Gemini API for generating chat responses.
-    
+
     Args:
         messages (list[str]): Conversation history as a list of message strings.
         temperature (float): Sampling temperature for generation.
@@ -12,17 +269,17 @@ def gemini_chat(messages, temperature=0.2):
     Returns:
         str: Generated response text.
     """
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-    headers = {"Content-Type": "application/json"}
-    data = {
-        "contents": [{"parts": [{"text": msg} for msg in messages]}],
-        "generationConfig": {"temperature": temperature}
-    }
-    params = {"key": settings.GEMINI_API_KEY}
-    
-    # Make a POST request to the Gemini API
-    resp = requests.post(url, headers=headers, params=params, json=data)
-    resp.raise_for_status()  # Raises exception for HTTP errors
-    
-    # Return the generated text from response
-    return resp.json()["candidates"][0]["content"]["parts"][0]["text"]
+    loop, client = _get_loop_and_client()
+    with span("llm_call"):
+        return asyncio.run_coroutine_threadsafe(client.generate(messages, temperature), loop).result()
+
+def get_gemini_usage():
+    """Requests and tokens (prompt/output/total) reported by Gemini since startup."""
+    if _client is None:
+        return {"requests": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    return dict(_client.usage)
+
+def close_gemini_client():
+    """Closes the pooled connections (call on application shutdown)."""
+    if _loop is not None:
+        asyncio.run_coroutine_threadsafe(_client.aclose(), _loop).result()
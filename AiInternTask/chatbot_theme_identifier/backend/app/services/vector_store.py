@@ -0,0 +1,479 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import quote, unquote
+
+import numpy as np
+from ..config import settings, get_pinecone
+from ..core.kmeans import normalize_rows, spherical_kmeans
+
+class VectorStore(ABC):
+    """
+    Interface of a vector index backend.
+    Vectors are dicts {"id", "values", "metadata"}; query returns matches shaped
+    like Pinecone's: {"id", "score", "metadata"}, best first.
+    Each index is partitioned into namespaces; None is the default namespace.
+    """
+
+    @abstractmethod
+    def index_exists(self, index_name):
+        """True if the index exists."""
+
+    @abstractmethod
+    def create_index(self, index_name, dimension):
+        """Creates an empty index of vectors with `dimension` values (cosine similarity)."""
+
+    def ensure_index(self, index_name, dimension):
+        """Creates the index unless it already exists."""
+        if not self.index_exists(index_name):
+            self.create_index(index_name, dimension)
+
+    @abstractmethod
+    def delete_index(self, index_name):
+        """Deletes an index with all its namespaces."""
+
+    @abstractmethod
+    def list_indexes(self):
+        """Names of all indexes."""
+
+    @abstractmethod
+    def delete_namespace(self, index_name, namespace):
+        """Deletes every vector of a namespace; a missing namespace is not an error."""
+
+    @abstractmethod
+    def upsert(self, index_name, vectors, namespace=None):
+        """Inserts vectors, replacing those with the same ids."""
+
+    @abstractmethod
+    def delete(self, index_name, ids, namespace=None):
+        """Deletes vectors by id; unknown ids are ignored."""
+
+    @abstractmethod
+    def query(self, index_name, vector, top_k=10, namespace=None, include_values=False):
+        """Top matches for a vector; with include_values, each match also carries its "values"."""
+
+    @abstractmethod
+    def ping(self):
+        """Raises if the backend is unreachable or unusable (used by the readiness probe)."""
+
+def _serializable(values):
+    """Vector values as the plain list of floats the Pinecone client sends; arrays are converted only here."""
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+class PineconeVectorStore(VectorStore):
+    """
+    Vector store backed by Pinecone serverless indexes. The client is created on first use.
+    Indexes seen in list_indexes are remembered for `cache_ttl` seconds, so existence
+    checks don't re-list the account's indexes on every request.
+    """
+
+    def __init__(self, cache_ttl=300):
+        self._indexes = {}
+        self._cache_ttl = cache_ttl
+        self._known_indexes = {}  # index name -> time it was last confirmed to exist
+
+    @property
+    def _pc(self):
+        return get_pinecone()
+
+    def _index(self, index_name):
+        # Index handles are cheap but not free to build; reuse them per name
+        if index_name not in self._indexes:
+            self._indexes[index_name] = self._pc.Index(index_name)
+        return self._indexes[index_name]
+
+    def index_exists(self, index_name):
+        confirmed_at = self._known_indexes.get(index_name)
+        if confirmed_at is not None and time.time() - confirmed_at < self._cache_ttl:
+            return True
+        return index_name in self.list_indexes()
+
+    def create_index(self, index_name, dimension):
+        from pinecone import ServerlessSpec
+        self._pc.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud=settings.PINECONE_CLOUD,
+                region=settings.PINECONE_REGION
+            )
+        )
+        self._known_indexes[index_name] = time.time()
+
+    def delete_index(self, index_name):
+        self._indexes.pop(index_name, None)
+        self._known_indexes.pop(index_name, None)
+        self._pc.delete_index(index_name)
+
+    def list_indexes(self):
+        now = time.time()
+        self._known_indexes = {idx.name: now for idx in self._pc.list_indexes()}
+        return list(self._known_indexes)
+
+    def delete_namespace(self, index_name, namespace):
+        from pinecone.exceptions import NotFoundException
+        try:
+            self._index(index_name).delete(delete_all=True, namespace=namespace)
+        except NotFoundException:
+            # Nothing was ever upserted into this namespace
+            pass
+
+    def upsert(self, index_name, vectors, namespace=None):
+        vectors = [{**v, "values": _serializable(v["values"])} for v in vectors]
+        self._index(index_name).upsert(vectors=vectors, namespace=namespace or "")
+
+    def delete(self, index_name, ids, namespace=None):
+        ids = list(ids)
+        # Pinecone accepts at most 1000 ids per delete request
+        for start in range(0, len(ids), 1000):
+            self._index(index_name).delete(ids=ids[start:start + 1000], namespace=namespace or "")
+
+    def query(self, index_name, vector, top_k=10, namespace=None, include_values=False):
+        # A session that never ingested anything has no index yet: no matches, like the local store
+        if not self.index_exists(index_name):
+            return []
+        query_results = self._index(index_name).query(
+            vector=_serializable(vector),
+            top_k=top_k,
+            include_metadata=True,
+            include_values=include_values,
+            namespace=namespace or ""
+        )
+        return query_results.get("matches", [])
+
+    def ping(self):
+        self._pc.list_indexes()
+
+def _quantize_int8(values):
+    """Per-row symmetric int8 quantization: (codes, scales) with values ~= codes * scales."""
+    scales = np.abs(values).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    codes = np.round(values / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+class _LocalNamespace:
+    """
+    One on-disk namespace: a memory-mapped float32 matrix of unit vectors (vectors.f32),
+    ids and metadata in SQLite (records.sqlite3), and an optional IVF
+    (inverted file) index over the rows (ivf_centroids.npy, ivf_assign.npy).
+    With a compact dtype ("float16", or "int8" with per-row scales), queries scan a
+    compact copy of the matrix (vectors.f16, or vectors.i8 and scales.f32) and rescore
+    the best LOCAL_RESCORE_FACTOR * top_k candidates against the float32 rows.
+    Overwriting an id reuses its row; deleting one leaves a dead row.
+    """
+
+    def __init__(self, path, dimension=None, dtype="float32"):
+        self.path = path
+        self.lock = threading.RLock()
+        info_path = os.path.join(path, "namespace.json")
+        if dimension is not None:
+            os.makedirs(path, exist_ok=True)
+            self.info = {"dimension": dimension, "count": 0, "capacity": 0, "ivf_rows": 0, "dtype": dtype}
+            self._save_info()
+        else:
+            with open(info_path) as f:
+                self.info = json.load(f)
+        self.dimension = self.info["dimension"]
+        # Namespaces created before compact storage existed are float32 only
+        self.dtype = self.info.get("dtype", "float32")
+        self.db = sqlite3.connect(os.path.join(path, "records.sqlite3"), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS records (row INTEGER PRIMARY KEY, id TEXT UNIQUE, metadata TEXT)"
+        )
+        self.db.commit()
+        self.vectors = None
+        self.compact = None
+        self.scales = None
+        self._open_vectors()
+        # In-memory view of the id table: row -> id, id -> row, and a mask of live rows
+        self.row_ids = [None] * self.info["count"]
+        self.id_rows = {}
+        self.live = np.zeros(self.info["capacity"], dtype=bool)
+        for row, vid in self.db.execute("SELECT row, id FROM records"):
+            self.row_ids[row] = vid
+            self.id_rows[vid] = row
+            self.live[row] = True
+        self.centroids = None
+        self.assign = None
+        if self.info["ivf_rows"]:
+            self.centroids = np.load(os.path.join(path, "ivf_centroids.npy"), mmap_mode="r")
+            self.assign = np.load(os.path.join(path, "ivf_assign.npy"), mmap_mode="r")
+
+    def _save_info(self):
+        with open(os.path.join(self.path, "namespace.json"), "w") as f:
+            json.dump(self.info, f)
+
+    def _layout(self):
+        """Memory-mapped files of the namespace: (file name, dtype, row shape)."""
+        layout = [("vectors.f32", np.float32, (self.dimension,))]
+        if self.dtype == "float16":
+            layout.append(("vectors.f16", np.float16, (self.dimension,)))
+        elif self.dtype == "int8":
+            layout.append(("vectors.i8", np.int8, (self.dimension,)))
+            layout.append(("scales.f32", np.float32, ()))
+        return layout
+
+    def _open_vectors(self):
+        self.vectors = self.compact = self.scales = None
+        if self.info["capacity"]:
+            maps = [
+                np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r+",
+                          shape=(self.info["capacity"],) + row_shape)
+                for name, dtype, row_shape in self._layout()
+            ]
+            self.vectors = maps[0]
+            self.compact = maps[1] if len(maps) > 1 else None
+            self.scales = maps[2] if len(maps) > 2 else None
+
+    def _flush(self):
+        for matrix in (self.vectors, self.compact, self.scales):
+            if matrix is not None:
+                matrix.flush()
+
+    def _reserve(self, n_rows):
+        """Grow the memory-mapped matrices (geometrically) to fit n_rows more rows."""
+        needed = self.info["count"] + n_rows
+        if needed <= self.info["capacity"]:
+            return
+        capacity = max(needed, 2 * self.info["capacity"], 1024)
+        self._flush()
+        self.vectors = self.compact = self.scales = None
+        for name, dtype, row_shape in self._layout():
+            with open(os.path.join(self.path, name), "ab") as f:
+                f.truncate(capacity * int(np.prod(row_shape)) * np.dtype(dtype).itemsize)
+        self.info["capacity"] = capacity
+        self.live = np.concatenate([self.live, np.zeros(capacity - len(self.live), dtype=bool)])
+        self._open_vectors()
+
+    def upsert(self, vectors):
+        with self.lock:
+            values = normalize_rows(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+            ids = [v["id"] for v in vectors]
+            # Overwriting an id writes its row in place; new ids are appended
+            rows = []
+            new_rows = sum(1 for vid in set(ids) if vid not in self.id_rows)
+            self._reserve(new_rows)
+            for vid in ids:
+                if vid not in self.id_rows:
+                    self.id_rows[vid] = self.info["count"]
+                    self.row_ids.append(vid)
+                    self.info["count"] += 1
+                rows.append(self.id_rows[vid])
+            self.vectors[rows] = values
+            if self.dtype == "float16":
+                self.compact[rows] = values.astype(np.float16)
+            elif self.dtype == "int8":
+                self.compact[rows], self.scales[rows] = _quantize_int8(values)
+            self._flush()
+            self.live[rows] = True
+            self.db.executemany(
+                "INSERT OR REPLACE INTO records (row, id, metadata) VALUES (?, ?, ?)",
+                [(row, v["id"], json.dumps(v.get("metadata") or {})) for row, v in zip(rows, vectors)]
+            )
+            self.db.commit()
+            self._save_info()
+            self._maybe_build_ivf()
+
+    def delete(self, ids):
+        with self.lock:
+            ids = [vid for vid in ids if vid in self.id_rows]
+            if not ids:
+                return
+            # Rows are not reused: they stay as dead slots masked out of queries
+            for vid in ids:
+                row = self.id_rows.pop(vid)
+                self.row_ids[row] = None
+                self.live[row] = False
+            self.db.executemany("DELETE FROM records WHERE id = ?", [(vid,) for vid in ids])
+            self.db.commit()
+
+    def _maybe_build_ivf(self):
+        """(Re)build the IVF index once the index is large and has doubled since the last build."""
+        count = self.info["count"]
+        if count < settings.LOCAL_ANN_THRESHOLD or count < 2 * self.info["ivf_rows"]:
+            return
+        data = np.asarray(self.vectors[:count])
+        n_lists = int(min(4096, max(16, np.sqrt(count))))
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(count, min(count, 50 * n_lists), replace=False)]
+        centroids = spherical_kmeans(sample, n_lists)
+        assign = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            assign[start:start + 65536] = np.argmax(data[start:start + 65536] @ centroids.T, axis=1)
+        np.save(os.path.join(self.path, "ivf_centroids.npy"), centroids)
+        np.save(os.path.join(self.path, "ivf_assign.npy"), assign)
+        self.centroids = np.load(os.path.join(self.path, "ivf_centroids.npy"), mmap_mode="r")
+        self.assign = np.load(os.path.join(self.path, "ivf_assign.npy"), mmap_mode="r")
+        self.info["ivf_rows"] = count
+        self._save_info()
+
+    def _candidate_rows(self, query):
+        """Rows to score exactly: all rows, or the probed IVF lists plus rows added since the last build."""
+        count = self.info["count"]
+        if self.centroids is None:
+            return np.arange(count)
+        probes = np.argsort(-(self.centroids @ query))[:settings.LOCAL_ANN_NPROBE]
+        indexed = np.nonzero(np.isin(self.assign, probes))[0]
+        return np.concatenate([indexed, np.arange(self.info["ivf_rows"], count)])
+
+    def _approximate_scores(self, rows, query):
+        """Scores of rows from the compact copy, converted in blocks to bound temporary memory."""
+        scores = np.empty(len(rows), dtype=np.float32)
+        # Cache-sized blocks: converting large blocks is markedly slower
+        for start in range(0, len(rows), 8192):
+            block = rows[start:start + 8192]
+            scores[start:start + len(block)] = self.compact[block].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        return scores
+
+    def query(self, vector, top_k, include_values=False):
+        with self.lock:
+            if not self.id_rows:
+                return []
+            query = np.asarray(vector, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+            rows = self._candidate_rows(query)
+            # Skip dead slots left by deleted vectors
+            rows = rows[self.live[rows]]
+            if not len(rows):
+                return []
+            if self.compact is not None:
+                # Shortlist from the compact copy, then rescore at full precision
+                scores = self._approximate_scores(rows, query)
+                n = min(len(rows), top_k * settings.LOCAL_RESCORE_FACTOR)
+                rows = rows[np.argpartition(-scores, n - 1)[:n]]
+            scores = self.vectors[rows] @ query
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            top_rows = [int(rows[i]) for i in best]
+            metadata = dict(self.db.execute(
+                f"SELECT row, metadata FROM records WHERE row IN ({','.join('?' * len(top_rows))})",
+                top_rows
+            ).fetchall())
+            matches = [
+                {"id": self.row_ids[row], "score": float(scores[i]), "metadata": json.loads(metadata[row])}
+                for row, i in zip(top_rows, best)
+            ]
+            if include_values:
+                for match, row in zip(matches, top_rows):
+                    match["values"] = np.array(self.vectors[row])
+            return matches
+
+    def close(self):
+        with self.lock:
+            self.vectors = self.compact = self.scales = None
+            self.centroids = None
+            self.assign = None
+            self.db.close()
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store persisted under `root_dir`: one directory per index
+    (index.json) with one subdirectory per namespace.
+    Exact cosine search over a contiguous memory-mapped matrix; namespaces larger than
+    LOCAL_ANN_THRESHOLD vectors are searched through an IVF index instead.
+    New namespaces are created with `dtype` ("float32", "float16" or "int8") scan storage.
+    """
+
+    _DEFAULT_NAMESPACE = "__default__"
+
+    def __init__(self, root_dir, dtype="float32"):
+        self.root_dir = root_dir
+        self.dtype = dtype
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def _path(self, index_name):
+        # Names derive from client-supplied session ids; never let them escape root_dir
+        return os.path.join(self.root_dir, quote(index_name, safe=""))
+
+    def _namespace_path(self, index_name, namespace):
+        return os.path.join(self._path(index_name), "namespaces", "ns-" + quote(namespace, safe=""))
+
+    def _namespace(self, index_name, namespace, create=False):
+        """Open namespace of an index; None if it has no vectors yet and `create` is false."""
+        key = (index_name, namespace or self._DEFAULT_NAMESPACE)
+        with self._lock:
+            if key not in self._namespaces:
+                if not self.index_exists(index_name):
+                    raise KeyError(f"Index {index_name} does not exist.")
+                path = self._namespace_path(*key)
+                if os.path.exists(os.path.join(path, "namespace.json")):
+                    self._namespaces[key] = _LocalNamespace(path)
+                elif create:
+                    with open(os.path.join(self._path(index_name), "index.json")) as f:
+                        dimension = json.load(f)["dimension"]
+                    self._namespaces[key] = _LocalNamespace(path, dimension=dimension, dtype=self.dtype)
+                else:
+                    return None
+            return self._namespaces[key]
+
+    def _close_namespaces(self, index_name, namespace=None):
+        for key in list(self._namespaces):
+            if key[0] == index_name and namespace in (None, key[1]):
+                self._namespaces.pop(key).close()
+
+    def index_exists(self, index_name):
+        return os.path.exists(os.path.join(self._path(index_name), "index.json"))
+
+    def create_index(self, index_name, dimension):
+        with self._lock:
+            if not self.index_exists(index_name):
+                os.makedirs(self._path(index_name), exist_ok=True)
+                with open(os.path.join(self._path(index_name), "index.json"), "w") as f:
+                    json.dump({"dimension": dimension}, f)
+
+    def delete_index(self, index_name):
+        with self._lock:
+            self._close_namespaces(index_name)
+            shutil.rmtree(self._path(index_name), ignore_errors=True)
+
+    def list_indexes(self):
+        try:
+            names = os.listdir(self.root_dir)
+        except FileNotFoundError:
+            return []
+        return [unquote(name) for name in names if os.path.exists(os.path.join(self.root_dir, name, "index.json"))]
+
+    def delete_namespace(self, index_name, namespace):
+        namespace = namespace or self._DEFAULT_NAMESPACE
+        with self._lock:
+            self._close_namespaces(index_name, namespace)
+            shutil.rmtree(self._namespace_path(index_name, namespace), ignore_errors=True)
+
+    def upsert(self, index_name, vectors, namespace=None):
+        if vectors:
+            self._namespace(index_name, namespace, create=True).upsert(vectors)
+
+    def delete(self, index_name, ids, namespace=None):
+        store = self._namespace(index_name, namespace)
+        if store:
+            store.delete(ids)
+
+    def query(self, index_name, vector, top_k=10, namespace=None, include_values=False):
+        # A session that never ingested anything has no index yet: no matches, like an empty namespace
+        if not self.index_exists(index_name):
+            return []
+        store = self._namespace(index_name, namespace)
+        return store.query(vector, top_k, include_values) if store else []
+
+    def ping(self):
+        os.makedirs(self.root_dir, exist_ok=True)
+        if not os.access(self.root_dir, os.W_OK):
+            raise PermissionError(f"{self.root_dir} is not writable")
+
+def create_vector_store():
+    """Builds the vector store selected by VECTOR_BACKEND ("pinecone" or "local")."""
+    if settings.VECTOR_BACKEND == "local":
+        return LocalVectorStore(settings.LOCAL_VECTOR_DIR, dtype=settings.LOCAL_VECTOR_DTYPE)
+    return PineconeVectorStore(cache_ttl=settings.INDEX_CACHE_TTL)
+
+# Vector store shared by ingestion, querying and session deletion
+_vector_store = create_vector_store()
@@ -0,0 +1,177 @@
+"""
+Interactive query latency during bulk ingestion, with and without the scheduler.
+
+Serves the app (local vector store, fake Gemini) and, per mode, runs --bulk-users
+clients each sending --bulk-batches /upload/batch/ requests of --batch-files text
+files to their own session, while --query-clients closed-loop clients query a
+session ingested beforehand until the bulk load is done:
+    idle  no bulk load, queries only for --idle-seconds (the baseline)
+    off   SCHEDULER_ENABLED=false: no admission limits, model runs in arrival order
+    on    admission limits (INGEST_MAX_PENDING_FILES[_PER_SESSION] from the flags)
+          and query embeddings ahead of ingestion batches
+Every mode asks the same question sequence. Refused requests (429) are counted,
+not retried. Reports query latency, the mean time query embeddings waited for the
+model, 429s and bulk throughput per mode.
+
+The embedding model's cost is simulated (--simulate-ms FIXED,PER_TEXT, serialized
+like one ONNX session; see bench_query_embedding.py), since it is where queries and
+ingestion contend; the configured model is still used for the vectors.
+
+Run from the backend directory:
+    python -m benchmarks.bench_admission [--bulk-users 3 --bulk-batches 3 --batch-files 25 --query-clients 4]
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from .corpus import make_txt
+from .fake_gemini import FakeGemini
+from .harness import summarize
+from .bench_e2e import start_server, wait_ready, make_questions
+from .bench_query_embedding import SimulatedEmbedder
+
+async def bulk_user(client, session_id, paths_per_batch, result):
+    for paths in paths_per_batch:
+        files = [("files", (os.path.basename(p), open(p, "rb").read())) for p in paths]
+        response = await client.post("/upload/batch/", files=files, data={"session_id": session_id})
+        if response.status_code == 429:
+            result["rejected_batches"] += 1
+            result["retry_after"].append(int(response.headers["Retry-After"]))
+        elif response.status_code == 200 and response.json().get("success"):
+            result["ingested_files"] += len(paths)
+        else:
+            result["failed_batches"] += 1
+
+def embedder_wait(queue):
+    """(total seconds, count) of queue_wait_seconds for an embedder queue."""
+    from app.core.metrics import QUEUE_WAIT_SECONDS
+    label = f'queue="embedder_{queue}"'
+    values = {name: value for name, labels, value in QUEUE_WAIT_SECONDS.samples() if label in labels}
+    return values.get("queue_wait_seconds_sum", 0.0), values.get("queue_wait_seconds_count", 0)
+
+async def query_client(client, session_id, questions, done, latencies, result):
+    i = 0
+    while not done.is_set():
+        start = time.perf_counter()
+        # Numbered, so every query of a mode misses the embedding cache and runs the model
+        question = f"{questions[i % len(questions)]} (#{i})"
+        response = await client.post("/query/", data={"user_query": question, "session_id": session_id})
+        i += 1
+        if response.status_code == 429:
+            result["rejected_queries"] += 1
+        elif response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            result["failed_queries"] += 1
+
+async def run_mode(client, mode, args, corpus_dir):
+    from app.api import endpoints
+    from app.core import document_processor
+    endpoints.admission.enabled = document_processor._model_lock.prioritize = mode != "off"
+    # The modes ask the same questions: forget the previous mode's query embeddings
+    document_processor._embedding_cache._memory.clear()
+    wait_before = embedder_wait("interactive")
+
+    # Distinct documents per mode, so the second mode doesn't reuse cached embeddings
+    offset = {"idle": 0, "off": 1, "on": 2}[mode] * 10 ** 6
+    batches = {}
+    for u in range(args.bulk_users if mode != "idle" else 0):
+        batches[f"bulk-{mode}-{u}"] = [
+            [make_txt(os.path.join(corpus_dir, f"{mode}_{u}_{b}_{f}.txt"), n_paragraphs=args.doc_paragraphs,
+                      seed=offset + (u * args.bulk_batches + b) * args.batch_files + f)
+             for f in range(args.batch_files)]
+            for b in range(args.bulk_batches)
+        ]
+    result = {"ingested_files": 0, "rejected_batches": 0, "failed_batches": 0, "retry_after": [],
+              "rejected_queries": 0, "failed_queries": 0}
+    latencies, done = [], asyncio.Event()
+    queries = [
+        asyncio.create_task(query_client(client, "bench-queries", make_questions(20, seed=c), done, latencies,
+                                         result))
+        for c in range(args.query_clients)
+    ]
+    start = time.perf_counter()
+    if batches:
+        await asyncio.gather(*(bulk_user(client, s, b, result) for s, b in batches.items()))
+    else:
+        await asyncio.sleep(args.idle_seconds)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*queries)
+    for session_id in batches:
+        await client.request("DELETE", "/delete/", data={"session_id": session_id})
+    retry_after = result.pop("retry_after")
+    wait_total, wait_count = (a - b for a, b in zip(embedder_wait("interactive"), wait_before))
+    return {
+        "query": summarize(latencies, elapsed),
+        "query_embed_wait_mean_s": round(wait_total / wait_count, 4) if wait_count else None,
+        **result,
+        "bulk_elapsed_s": round(elapsed, 2),
+        "bulk_files_per_s": round(result["ingested_files"] / elapsed, 2),
+        "max_retry_after_s": max(retry_after, default=None),
+        "scheduler": (await client.get("/stats/")).json()["scheduler"]
+    }
+
+async def drive(base_url, args, corpus_dir):
+    import httpx
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        await wait_ready(client, 600)
+        # The session queried during the bulk load
+        paths = [make_txt(os.path.join(corpus_dir, f"query_{i}.txt"), n_paragraphs=30, seed=i) for i in range(3)]
+        files = [("files", (os.path.basename(p), open(p, "rb").read())) for p in paths]
+        response = await client.post("/upload/batch/", files=files, data={"session_id": "bench-queries"})
+        assert response.json()["success"], response.text
+        return {mode: await run_mode(client, mode, args, corpus_dir) for mode in ("idle", "off", "on")}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk-users", type=int, default=3)
+    parser.add_argument("--bulk-batches", type=int, default=3, help="batch uploads per bulk user, in sequence")
+    parser.add_argument("--batch-files", type=int, default=25)
+    parser.add_argument("--doc-paragraphs", type=int, default=100, help="paragraphs per bulk document")
+    parser.add_argument("--query-clients", type=int, default=4)
+    parser.add_argument("--max-pending-files", type=int, default=50, help="INGEST_MAX_PENDING_FILES in mode on")
+    parser.add_argument("--max-pending-files-per-session", type=int, default=25)
+    parser.add_argument("--idle-seconds", type=float, default=5)
+    parser.add_argument("--simulate-ms", default="30,2", help="FIXED,PER_TEXT model cost in milliseconds")
+    parser.add_argument("--gemini-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_admission_")
+    gemini = FakeGemini(base_latency=args.gemini_latency)
+    # Settings are read at import time: configure the app before importing it
+    os.environ.update({
+        "GEMINI_API_BASE": gemini.start(),
+        "GEMINI_API_KEY": "benchmark",
+        # The fake server has no quota; a client-side limit would throttle whichever mode runs last
+        "GEMINI_RPM": "0",
+        "GEMINI_TPM": "0",
+        "VECTOR_BACKEND": "local",
+        "LOCAL_VECTOR_DIR": os.path.join(work_dir, "vectors"),
+        "MANIFEST_DIR": os.path.join(work_dir, "manifests"),
+        "SESSION_DB_PATH": os.path.join(work_dir, "sessions.sqlite3"),
+        "EMBED_CACHE_PATH": "",
+        "QUERY_CACHE_TTL": "0",
+        "INGEST_MAX_PENDING_FILES": str(args.max_pending_files),
+        "INGEST_MAX_PENDING_FILES_PER_SESSION": str(args.max_pending_files_per_session)
+    })
+    from app import config
+    fixed_ms, per_text_ms = (float(v) for v in args.simulate_ms.split(","))
+    config._embedder = SimulatedEmbedder(config.get_embedder(), fixed_ms / 1000, per_text_ms / 1000)
+
+    corpus_dir = os.path.join(work_dir, "corpus")
+    os.makedirs(corpus_dir)
+    server, thread, base_url = start_server(0)
+    try:
+        modes = asyncio.run(drive(base_url, args, corpus_dir))
+    finally:
+        server.should_exit = True
+        thread.join()
+        gemini.stop()
+    print(json.dumps({"benchmark": "admission", "config": vars(args), **modes}, indent=2))
+
+if __name__ == "__main__":
+    main()
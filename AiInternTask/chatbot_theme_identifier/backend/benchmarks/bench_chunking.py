@@ -0,0 +1,123 @@
+"""
+Legacy blank-line paragraph splitting vs the token-aware chunker.
+
+Reports vectors per document, chunk token statistics and the share of tiny
+chunks (each a wasted LLM extraction when retrieved). With --recall, also embeds
+both chunk sets with the real model and measures recall@k of queries made from
+random phrases of the source text (a hit = a top-k chunk contains the phrase).
+
+The default corpus mimics PDF extraction output: every few lines of a paragraph
+end up separated by blank lines, plus a one-line header and footer per page.
+
+Run from the backend directory:
+    python -m benchmarks.bench_chunking [--pages 50] [--recall --queries 100 --top-k 5]
+    python -m benchmarks.bench_chunking --file path/to/document.pdf
+"""
+import re
+import json
+import random
+import argparse
+import statistics
+
+import numpy as np
+
+from app.config import settings
+from app.core.chunker import chunk_pages, count_tokens
+from app.core.document_processor import _extract_pages
+from .corpus import make_paragraphs, _wrap
+
+def make_fragmented_pages(n_pages, paragraphs_per_page=5, seed=0):
+    """Pages whose paragraphs are broken into 1-3 line fragments, as PyPDF2 often returns them."""
+    rng = random.Random(seed)
+    paragraphs = make_paragraphs(n_pages * paragraphs_per_page, seed=seed)
+    pages = []
+    for p in range(n_pages):
+        fragments = ["Quarterly compliance report - confidential"]
+        for para in paragraphs[p * paragraphs_per_page:(p + 1) * paragraphs_per_page]:
+            lines = _wrap(para)
+            while lines:
+                n = rng.randint(1, 3)
+                fragments.append("\n".join(lines[:n]))
+                lines = lines[n:]
+        fragments.append(f"Page {p + 1}")
+        pages.append({"page": p + 1, "text": "\n\n".join(fragments)})
+    return pages
+
+def legacy_split(pages):
+    """The previous splitting: one chunk per non-empty blank-line separated paragraph."""
+    return [
+        {"page": item["page"], "para": i + 1, "text": para.strip()}
+        for item in pages
+        for i, para in enumerate(item["text"].split('\n\n'))
+        if para.strip()
+    ]
+
+def chunk_stats(chunks, min_tokens):
+    tokens = [count_tokens(c["text"]) for c in chunks]
+    return {
+        "vectors": len(chunks),
+        "mean_tokens": round(statistics.mean(tokens), 1),
+        "median_tokens": statistics.median(tokens),
+        "max_tokens": max(tokens),
+        "tiny_chunk_share": round(sum(t < min_tokens for t in tokens) / len(tokens), 3)
+    }
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def make_queries(pages, n, seed=0, words=12):
+    """Random contiguous phrases of the source text (never crossing a paragraph)."""
+    rng = random.Random(seed)
+    paragraphs = [c["text"].split() for c in legacy_split(pages)]
+    paragraphs = [p for p in paragraphs if len(p) >= words]
+    queries = []
+    for _ in range(n):
+        para = rng.choice(paragraphs)
+        start = rng.randrange(len(para) - words + 1)
+        queries.append(" ".join(para[start:start + words]))
+    return queries
+
+def recall_at_k(chunks, queries, top_k):
+    from app.core.document_processor import get_embeddings
+    matrix = np.asarray(get_embeddings([c["text"] for c in chunks]), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    texts = [_normalize(c["text"]) for c in chunks]
+    hits = 0
+    for query, emb in zip(queries, get_embeddings(queries)):
+        emb = np.asarray(emb, dtype=np.float32)
+        top = np.argsort(-(matrix @ (emb / np.linalg.norm(emb))))[:top_k]
+        hits += any(_normalize(query) in texts[i] for i in top)
+    return round(hits / len(queries), 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="document to chunk (default: a generated fragmented corpus)")
+    parser.add_argument("--pages", type=int, default=50, help="pages of the generated corpus")
+    parser.add_argument("--target-tokens", type=int, default=settings.CHUNK_TARGET_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--min-tokens", type=int, default=settings.CHUNK_MIN_TOKENS)
+    parser.add_argument("--recall", action="store_true", help="also measure recall@k (loads the embedding model)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = _extract_pages(args.file) if args.file else make_fragmented_pages(args.pages)
+    legacy = legacy_split(pages)
+    chunked = chunk_pages(pages, args.target_tokens, args.overlap_tokens, args.min_tokens)
+    result = {
+        "benchmark": "chunking",
+        "pages": len(pages),
+        "target_tokens": args.target_tokens,
+        "overlap_tokens": args.overlap_tokens,
+        "legacy": chunk_stats(legacy, args.min_tokens),
+        "chunker": chunk_stats(chunked, args.min_tokens)
+    }
+    result["vector_reduction"] = round(len(legacy) / len(chunked), 2)
+    if args.recall:
+        queries = make_queries(pages, args.queries)
+        result["legacy"][f"recall@{args.top_k}"] = recall_at_k(legacy, queries, args.top_k)
+        result["chunker"][f"recall@{args.top_k}"] = recall_at_k(chunked, queries, args.top_k)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
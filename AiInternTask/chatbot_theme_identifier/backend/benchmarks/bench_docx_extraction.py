@@ -0,0 +1,90 @@
+"""
+python-docx extraction (per-run XML serialization) vs the streaming DOCX extractor.
+
+Reports time and peak Python memory of both, and checks that every paragraph the
+previous implementation found is also found by the new one (which additionally
+extracts tables and headers).
+
+Run from the backend directory:
+    python -m benchmarks.bench_docx_extraction --pages 300 --words-per-run 2
+    python -m benchmarks.bench_docx_extraction --docx path/to/file.docx
+"""
+import os
+import re
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from docx import Document
+from app.core.docx_extraction import extract_docx_pages
+from .corpus import make_docx
+
+def legacy_extract(docx_path):
+    """The previous python-docx implementation, as the baseline."""
+    doc = Document(docx_path)
+    text = []
+    current_page_text = []
+    page_number = 1
+    for para in doc.paragraphs:
+        has_page_break = any('pageBreak' in run._element.xml for run in para.runs)
+        if has_page_break and current_page_text:
+            text.append({"page": page_number, "text": "\n".join(current_page_text)})
+            page_number += 1
+            current_page_text = []
+        if para.text.strip():
+            current_page_text.append(para.text.strip())
+    if current_page_text:
+        text.append({"page": page_number, "text": "\n".join(current_page_text)})
+    return text
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docx", help="document to extract (default: a generated one)")
+    parser.add_argument("--pages", type=int, default=300, help="pages of the generated document")
+    parser.add_argument("--words-per-run", type=int, default=2, help="run granularity of the generated document")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = args.docx or make_docx(
+        os.path.join(tempfile.mkdtemp(), "bench.docx"), args.pages, words_per_run=args.words_per_run
+    )
+    legacy_s, legacy_peak, legacy_pages = measure(lambda: legacy_extract(path), args.repeat)
+    stream_s, stream_peak, stream_pages = measure(lambda: extract_docx_pages(path), args.repeat)
+
+    found = _normalize(" ".join(p["text"] for p in stream_pages))
+    missing = [
+        line for page in legacy_pages for line in page["text"].split("\n")
+        if _normalize(line) not in found
+    ]
+    assert not missing, f"{len(missing)} paragraphs missing, e.g. {missing[0][:80]!r}"
+    print(json.dumps({
+        "benchmark": "docx_extraction",
+        "file_mb": round(os.path.getsize(path) / 2 ** 20, 2),
+        "legacy_pages": len(legacy_pages),
+        "streaming_pages": len(stream_pages),
+        "legacy_s": round(legacy_s, 3),
+        "streaming_s": round(stream_s, 3),
+        "speedup": round(legacy_s / stream_s, 2),
+        "legacy_peak_mb": round(legacy_peak / 2 ** 20, 1),
+        "streaming_peak_mb": round(stream_peak / 2 ** 20, 1)
+    }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Offline end-to-end benchmark: ingestion and queries through the FastAPI app.
+
+Serves the real app with uvicorn on a local port and drives it over HTTP at a
+given concurrency, with Gemini replaced by a local fake server (fake_gemini.py)
+and Pinecone by an in-process fake client (fake_pinecone.py), both with
+configurable latency and error injection. Embeddings use the configured local
+model. The corpus is generated (see corpus.py); images need the tesseract binary.
+
+Stages, each with throughput, p50/p95/p99 latency, errors and peak RSS of this
+process (app and driver; PDF worker processes are not included):
+    startup       until /readyz returns 200 (model loaded)
+    upload        POST /upload/ request latency
+    ingest        upload response until the job is done (polling /jobs/)
+    query         POST /query/
+    query_stream  POST /query/stream/ total; time to the first event is reported separately
+
+Prints one JSON object (also written to --output) so runs can be diffed across commits.
+
+Run from the backend directory:
+    python -m benchmarks.bench_e2e [--sessions 4 --docs 4 --queries 5 --concurrency 4 --mix pdf=2,docx=1,txt=1]
+"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+
+from .corpus import WORDS, make_pdf, make_docx, make_txt, make_image
+from .fake_gemini import FakeGemini
+from .fake_pinecone import FakePinecone, install
+from .harness import RssSampler, Timer, summarize
+
+MAKERS = {
+    "pdf": lambda path, seed: make_pdf(path, n_pages=6, seed=seed),
+    "docx": lambda path, seed: make_docx(path, n_pages=4, seed=seed),
+    "txt": lambda path, seed: make_txt(path, n_paragraphs=30, seed=seed),
+    "png": lambda path, seed: make_image(path, n_paragraphs=3, seed=seed)
+}
+
+def parse_mix(mix):
+    """ "pdf=2,docx=1" -> ["pdf", "pdf", "docx"] (the cycle of document types)."""
+    kinds = []
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in MAKERS:
+            raise SystemExit(f"Unknown document type {kind!r} in --mix (use {', '.join(MAKERS)})")
+        kinds.extend([kind] * int(weight or 1))
+    return kinds
+
+def make_corpus(directory, n_docs, kinds):
+    """n_docs generated documents, cycling through kinds; distinct content per seed."""
+    paths = []
+    for i in range(n_docs):
+        kind = kinds[i % len(kinds)]
+        path = os.path.join(directory, f"doc_{i:03d}.{kind}")
+        MAKERS[kind](path, seed=i)
+        paths.append(path)
+    return paths
+
+def make_questions(n, seed):
+    """Distinct questions, so the semantic query cache does not answer them."""
+    return [
+        f"What does the report say about {WORDS[(seed * 7 + i * 3) % len(WORDS)]} "
+        f"and {WORDS[(seed * 5 + i * 11 + 1) % len(WORDS)]}?"
+        for i in range(n)
+    ]
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_server(port):
+    """Runs the app with uvicorn on a background thread; returns (server, thread, base URL)."""
+    import uvicorn
+    from app.main import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("uvicorn failed to start")
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+class Stage:
+    """Latencies and errors of one stage, and its wall time."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.error_samples = []
+        self.elapsed = 0.0
+
+    def error(self, message):
+        self.errors += 1
+        if len(self.error_samples) < 5:
+            self.error_samples.append(str(message)[:200])
+
+    def summary(self):
+        summary = summarize(self.latencies, self.elapsed, self.errors)
+        if self.error_samples:
+            summary["error_samples"] = self.error_samples
+        return summary
+
+async def run_bounded(jobs, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            await job()
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+async def wait_ready(client, timeout):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        response = await client.get("/readyz")
+        if response.status_code == 200:
+            return time.perf_counter() - start
+        await asyncio.sleep(0.1)
+    raise SystemExit(f"App not ready after {timeout}s: {response.text}")
+
+async def upload_and_ingest(client, path, session_id, upload, ingest, poll_interval):
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            response = await client.post(
+                "/upload/", files={"file": (os.path.basename(path), f.read())}, data={"session_id": session_id}
+            )
+        body = response.json()
+    except Exception as e:
+        upload.error(e)
+        return
+    uploaded = time.perf_counter()
+    if response.status_code != 200 or not body.get("success"):
+        upload.error(body)
+        return
+    upload.latencies.append(uploaded - start)
+    while True:
+        await asyncio.sleep(poll_interval)
+        job = (await client.get(f"/jobs/{body['job_id']}")).json()
+        if job["status"] in ("done", "failed"):
+            break
+    if job["status"] == "failed":
+        ingest.error(job["error"])
+    else:
+        ingest.latencies.append(time.perf_counter() - uploaded)
+
+async def query(client, question, session_id, stage):
+    start = time.perf_counter()
+    try:
+        response = await client.post("/query/", data={"user_query": question, "session_id": session_id})
+    except Exception as e:
+        stage.error(e)
+        return
+    if response.status_code != 200 or "error" in response.json():
+        stage.error(response.text)
+    else:
+        stage.latencies.append(time.perf_counter() - start)
+
+async def query_stream(client, question, session_id, stage, first_event):
+    start = time.perf_counter()
+    first, done = None, False
+    try:
+        async with client.stream(
+            "POST", "/query/stream/", data={"user_query": question, "session_id": session_id}
+        ) as response:
+            async for line in response.aiter_lines():
+                if first is None and line.startswith("event:"):
+                    first = time.perf_counter() - start
+                if line == "event: done":
+                    done = True
+    except Exception as e:
+        stage.error(e)
+        return
+    if response.status_code != 200 or not done:
+        stage.error(f"HTTP {response.status_code}, done event received: {done}")
+        return
+    stage.latencies.append(time.perf_counter() - start)
+    first_event.append(first)
+
+async def drive(base_url, sessions, questions, args, sampler):
+    import httpx
+    stages = {name: Stage() for name in ("startup", "upload", "ingest", "query", "query_stream")}
+    first_event = []
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        sampler.stage("startup")
+        stages["startup"].latencies.append(await wait_ready(client, args.timeout))
+        stages["startup"].elapsed = stages["startup"].latencies[0]
+
+        # Upload and ingestion overlap, as they do for users: a stage's wall time is the whole phase
+        sampler.stage("ingest")
+        with Timer() as t:
+            await run_bounded([
+                (lambda p=path, s=session_id: upload_and_ingest(
+                    client, p, s, stages["upload"], stages["ingest"], args.poll_interval
+                ))
+                for session_id, paths in sessions.items() for path in paths
+            ], args.concurrency)
+        stages["upload"].elapsed = stages["ingest"].elapsed = t.elapsed
+
+        sampler.stage("query")
+        with Timer() as t:
+            await run_bounded([
+                (lambda q=question, s=session_id: query(client, q, s, stages["query"]))
+                for session_id in sessions for question in questions[session_id]
+            ], args.concurrency)
+        stages["query"].elapsed = t.elapsed
+
+        sampler.stage("query_stream")
+        with Timer() as t:
+            await run_bounded([
+                (lambda q=question, s=session_id: query_stream(client, "Stream: " + q, s, stages["query_stream"], first_event))
+                for session_id in sessions for question in questions[session_id]
+            ], args.concurrency)
+        stages["query_stream"].elapsed = t.elapsed
+        sampler.stage(None)
+
+        app_stats = (await client.get("/stats/")).json()
+        for session_id in sessions:
+            await client.request("DELETE", "/delete/", data={"session_id": session_id})
+
+    result = {name: stage.summary() for name, stage in stages.items()}
+    if first_event:
+        result["query_stream"]["first_event"] = summarize(first_event, stages["query_stream"].elapsed)
+    return result, app_stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--docs", type=int, default=4, help="documents per session")
+    parser.add_argument("--queries", type=int, default=5, help="queries per session (each run plain and streamed)")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    parser.add_argument("--mix", default="pdf=2,docx=1,txt=1", help="document type weights (pdf, docx, txt, png)")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default="pinecone",
+                        help="fake Pinecone client, or the local vector store")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="fake Gemini seconds per call")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--pinecone-latency", type=float, default=0.02, help="fake Pinecone seconds per call")
+    parser.add_argument("--pinecone-error-rate", type=float, default=0.0)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=300.0, help="per request and for readiness")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_e2e_")
+    gemini = FakeGemini(base_latency=args.gemini_latency, error_rate=args.gemini_error_rate)
+    # Settings are read at import time: configure the app before importing it
+    os.environ.update({
+        "GEMINI_API_BASE": gemini.start(),
+        "GEMINI_API_KEY": "benchmark",
+        "PINECONE_API_KEY": "benchmark",
+        "VECTOR_BACKEND": args.backend,
+        "LOCAL_VECTOR_DIR": os.path.join(work_dir, "vectors"),
+        "MANIFEST_DIR": os.path.join(work_dir, "manifests"),
+        "SESSION_DB_PATH": os.path.join(work_dir, "sessions.sqlite3"),
+        "OCR_CACHE_PATH": os.path.join(work_dir, "ocr.sqlite3"),
+        "EMBED_CACHE_PATH": ""
+    })
+    pinecone = FakePinecone(latency=args.pinecone_latency, error_rate=args.pinecone_error_rate)
+    if args.backend == "pinecone":
+        install(pinecone)
+
+    kinds = parse_mix(args.mix)
+    corpus_dir = os.path.join(work_dir, "corpus")
+    os.makedirs(corpus_dir)
+    paths = make_corpus(corpus_dir, args.sessions * args.docs, kinds)
+    sessions = {f"bench-{s}": paths[s * args.docs:(s + 1) * args.docs] for s in range(args.sessions)}
+    questions = {session_id: make_questions(args.queries, seed=s) for s, session_id in enumerate(sessions)}
+
+    sampler = RssSampler().start()
+    server, thread, base_url = start_server(port=0)
+    try:
+        stages, app_stats = asyncio.run(drive(base_url, sessions, questions, args, sampler))
+    finally:
+        server.should_exit = True
+        thread.join()
+        sampler.stop()
+        gemini.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, peak in sampler.peaks().items():
+        if name in stages:
+            stages[name]["peak_rss_mib"] = peak
+    # Upload and ingest run as one phase
+    stages["upload"]["peak_rss_mib"] = stages["ingest"].get("peak_rss_mib")
+
+    result = {
+        "benchmark": "e2e",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "documents": len(paths),
+        "stages": stages,
+        "fake_gemini": {"requests": gemini.requests, "errors": gemini.errors,
+                        "max_prompt_tokens": gemini.max_prompt_tokens},
+        "fake_pinecone": {"calls": pinecone.calls, "errors": pinecone.errors} if args.backend == "pinecone" else None,
+        "app_stats": app_stats
+    }
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Per-chunk vs packed answer extraction: LLM calls, tokens, cost and latency per query.
+
+Runs the real extract_answers against a local fake Gemini server whose latency
+grows with prompt and output tokens (see fake_gemini.py). Token counts are the
+server-reported usage (~4 characters per token). Costs use --price-in/--price-out
+in USD per million tokens (defaults: gemini-2.0-flash list prices).
+A full query adds one theme synthesis call to either mode.
+
+Run from the backend directory:
+    python -m benchmarks.bench_extraction [--queries 20 --top-k 10 --budget 6000 --malformed-rate 0.1]
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+from .corpus import make_paragraphs
+from .fake_gemini import FakeGemini
+from .harness import percentile
+
+def make_chunks(n, words, seed):
+    return [
+        {"doc_id": f"doc{i}", "doc_name": f"report_{i}.pdf", "page": 1, "para": 1, "text": text}
+        for i, text in enumerate(make_paragraphs(n, seed=seed, min_words=words, max_words=words))
+    ]
+
+def run_mode(mode, args):
+    from app.core.query_pipeline import extract_answers
+    from app.services.gemini_service import get_gemini_usage
+    before = get_gemini_usage()
+    latencies, n_answers = [], 0
+    for q in range(args.queries):
+        chunks = make_chunks(args.top_k, args.chunk_words, seed=q)
+        start = time.perf_counter()
+        answers = asyncio.run(extract_answers("What was reported to the board?", chunks, mode=mode))
+        latencies.append(time.perf_counter() - start)
+        n_answers += len(answers)
+    after = get_gemini_usage()
+    used = {key: after[key] - before[key] for key in after}
+    cost = (used["prompt_tokens"] * args.price_in + used["output_tokens"] * args.price_out) / 1e6
+    return {
+        "llm_calls_per_query": round(used["requests"] / args.queries, 2),
+        "prompt_tokens_per_query": round(used["prompt_tokens"] / args.queries),
+        "output_tokens_per_query": round(used["output_tokens"] / args.queries),
+        "cost_per_1k_queries_usd": round(1000 * cost / args.queries, 4),
+        "latency_p50_s": round(statistics.median(latencies), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "answers_per_query": round(n_answers / args.queries, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--chunk-words", type=int, default=180, help="words per retrieved chunk")
+    parser.add_argument("--budget", type=int, default=6000, help="PACKED_TOKEN_BUDGET")
+    parser.add_argument("--concurrency", type=int, default=5, help="EXTRACT_CONCURRENCY")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of unparseable packed replies")
+    parser.add_argument("--base-latency", type=float, default=0.3, help="fake server seconds per call")
+    parser.add_argument("--price-in", type=float, default=0.10)
+    parser.add_argument("--price-out", type=float, default=0.40)
+    args = parser.parse_args()
+
+    fake = FakeGemini(base_latency=args.base_latency, malformed_json_rate=args.malformed_rate)
+    # Settings are read at import time: point the app at the fake server first
+    os.environ.update({
+        "GEMINI_API_BASE": fake.start(),
+        "GEMINI_API_KEY": "benchmark",
+        "GEMINI_RPM": "0",
+        "GEMINI_TPM": "0",
+        "PACKED_TOKEN_BUDGET": str(args.budget),
+        "EXTRACT_CONCURRENCY": str(args.concurrency),
+        "VECTOR_BACKEND": "local"
+    })
+    result = {
+        "benchmark": "extraction",
+        "queries": args.queries,
+        "top_k": args.top_k,
+        "packed_token_budget": args.budget,
+        "per_chunk": run_mode("per_chunk", args),
+        "packed": run_mode("packed", args)
+    }
+    fake.stop()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+OCR throughput and accuracy: raw images vs. preprocessed ones, and the OCR cache.
+
+The sample set has --images pages of random text of each kind:
+    scan300  PNG page scanned at 300 dpi
+    scan600  the same page size scanned at 600 dpi (4x the pixels)
+    photo    12 MP JPEG phone photo of a page: noisy, RGB, stored sideways with an
+             EXIF orientation, 72 dpi recorded
+Each configuration OCRs every image on --workers threads:
+    raw              the previous path: the decoded image straight to tesseract
+    dpi300           prepare_image at 300 dpi / 9 MP (the defaults)
+    dpi300_binarize  the same, thresholded to black and white
+    dpi200           200 dpi / 4 MP
+Reports preprocessing time per image (measured serially), images/sec, and accuracy
+as the similarity of recognized and true word sequences (difflib ratio, 1.0 = exact).
+Then extract_text_from_image runs twice over the set: cold (misses) and warm (hits).
+
+Without a tesseract binary only the preprocessing numbers are reported.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ocr [--images 4 --workers 4]
+"""
+import os
+import json
+import time
+import difflib
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from .corpus import make_paragraphs, render_text_image, _wrap
+
+CONFIGS = {
+    "raw": None,
+    "dpi300": {"target_dpi": 300, "max_pixels": 9_000_000, "binarize": False},
+    "dpi300_binarize": {"target_dpi": 300, "max_pixels": 9_000_000, "binarize": True},
+    "dpi200": {"target_dpi": 200, "max_pixels": 4_000_000, "binarize": False},
+}
+
+def page_lines(seed):
+    lines = []
+    for para in make_paragraphs(4, seed=seed):
+        lines.extend(_wrap(para, width=60))
+        lines.append("")
+    return lines
+
+def render_page(lines, scale):
+    """An A4 page at 300 * scale dpi, 10 pt text."""
+    page = render_text_image(
+        lines, width=round(2480 * scale), line_height=round(60 * scale),
+        font_size=round(42 * scale), margin=round(200 * scale)
+    )
+    canvas = Image.new("L", (page.width, round(3508 * scale)), 255)
+    canvas.paste(page.crop((0, 0, page.width, min(page.height, canvas.height))), (0, 0))
+    return canvas
+
+def make_photo(lines, seed):
+    """A noisy RGB photo of a page, stored rotated with EXIF orientation 6 (display rotates it back)."""
+    page = render_page(lines, 3024 / 2480).resize((3024, 4032))
+    rng = np.random.default_rng(seed)
+    pixels = np.asarray(page, dtype=np.float32) * 0.85 + 20 + rng.normal(0, 12, (page.height, page.width))
+    rgb = np.stack([pixels, pixels * 0.97, pixels * 0.92], axis=-1).clip(0, 255).astype(np.uint8)
+    photo = Image.fromarray(rgb, "RGB").transpose(Image.Transpose.ROTATE_90)
+    exif = photo.getexif()
+    exif[0x0112] = 6
+    return photo, exif
+
+def make_samples(directory, n):
+    samples = []
+    for i in range(n):
+        lines = page_lines(seed=i)
+        truth = " ".join(lines)
+        path = os.path.join(directory, f"scan300_{i}.png")
+        render_page(lines, 1).save(path, dpi=(300, 300))
+        samples.append(("scan300", path, truth))
+        path = os.path.join(directory, f"scan600_{i}.png")
+        render_page(lines, 2).save(path, dpi=(600, 600))
+        samples.append(("scan600", path, truth))
+        path = os.path.join(directory, f"photo_{i}.jpg")
+        photo, exif = make_photo(lines, seed=i)
+        photo.save(path, quality=90, dpi=(72, 72), exif=exif)
+        samples.append(("photo", path, truth))
+    return samples
+
+def accuracy(text, truth):
+    return difflib.SequenceMatcher(None, truth.lower().split(), text.lower().split()).ratio()
+
+def prepare_ms(samples, options):
+    from app.core.ocr import prepare_image
+    timings = {}
+    for kind, path, _ in samples:
+        start = time.perf_counter()
+        with Image.open(path) as image:
+            if options is None:
+                image.load()
+                pixels = image.width * image.height
+            else:
+                prepared = prepare_image(image, **options)
+                pixels = prepared.width * prepared.height
+        timings.setdefault(kind, []).append((1000 * (time.perf_counter() - start), pixels))
+    return {
+        kind: {"prepare_ms": round(float(np.mean([t for t, _ in v])), 1),
+               "megapixels": round(float(np.mean([p for _, p in v])) / 1e6, 2)}
+        for kind, v in timings.items()
+    }
+
+def run_ocr(samples, options, workers):
+    from app.core.ocr import ocr_image_file
+
+    def ocr(sample):
+        kind, path, truth = sample
+        start = time.perf_counter()
+        if options is None:
+            with Image.open(path) as image:
+                text = pytesseract.image_to_string(image)
+        else:
+            text = ocr_image_file(path, **options)
+        return kind, time.perf_counter() - start, accuracy(text, truth)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(ocr, samples))
+    elapsed = time.perf_counter() - start
+    per_kind = {}
+    for kind, seconds, acc in results:
+        per_kind.setdefault(kind, []).append((seconds, acc))
+    return {
+        "images_per_sec": round(len(samples) / elapsed, 3),
+        "kinds": {
+            kind: {"ocr_s": round(float(np.mean([s for s, _ in v])), 2),
+                   "accuracy": round(float(np.mean([a for _, a in v])), 4)}
+            for kind, v in per_kind.items()
+        }
+    }
+
+def run_cache(samples):
+    from app.core.document_processor import extract_text_from_image, get_ocr_cache_stats
+    passes = {}
+    for name in ("cold", "warm"):
+        start = time.perf_counter()
+        for _, path, _ in samples:
+            extract_text_from_image(path)
+        passes[f"{name}_ms_per_image"] = round(1000 * (time.perf_counter() - start) / len(samples), 2)
+    return {**passes, "stats": get_ocr_cache_stats()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=4, help="pages per kind")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    args = parser.parse_args()
+    os.environ["OCR_CACHE_PATH"] = ""
+    os.environ["OCR_WORKERS"] = str(args.workers)
+
+    try:
+        tesseract = str(pytesseract.get_tesseract_version())
+    except pytesseract.TesseractNotFoundError:
+        tesseract = None
+    samples = make_samples(tempfile.mkdtemp(prefix="bench_ocr_"), args.images)
+    result = {"benchmark": "ocr", "images": len(samples), "workers": args.workers, "tesseract": tesseract,
+              "configs": {}}
+    for name in args.configs.split(","):
+        config = {"preprocessing": prepare_ms(samples, CONFIGS[name])}
+        if tesseract:
+            config.update(run_ocr(samples, CONFIGS[name], args.workers))
+        result["configs"][name] = config
+    if tesseract:
+        result["cache"] = run_cache(samples)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
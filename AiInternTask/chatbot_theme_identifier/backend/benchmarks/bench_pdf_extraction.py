@@ -0,0 +1,68 @@
+"""
+Serial vs page-parallel PDF text extraction, in pages/sec.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pdf_extraction --pages 200 --workers 8
+    python -m benchmarks.bench_pdf_extraction --pdf path/to/file.pdf
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from PyPDF2 import PdfReader
+from app.core.pdf_extraction import extract_pdf_pages, shutdown_pool
+from .corpus import make_pdf
+
+def serial_extract(file_path):
+    """The previous single-threaded implementation, as the baseline."""
+    reader = PdfReader(file_path)
+    text = []
+    for i, page in enumerate(reader.pages):
+        page_text = page.extract_text()
+        if page_text:
+            text.append({"page": i + 1, "text": page_text})
+    return text
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to extract (default: a generated text PDF)")
+    parser.add_argument("--pages", type=int, default=200, help="pages of the generated PDF")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = args.pdf or make_pdf(os.path.join(tempfile.mkdtemp(), "bench.pdf"), args.pages)
+    n_pages = len(PdfReader(path).pages)
+
+    serial_s, serial_pages = best_of(lambda: serial_extract(path), args.repeat)
+    parallel = lambda: extract_pdf_pages(
+        path, max_workers=args.workers, pages_per_task=args.pages_per_task,
+        min_parallel_pages=1, ocr_fallback=False
+    )
+    parallel()  # warm up: spawn the worker processes
+    parallel_s, parallel_pages = best_of(parallel, args.repeat)
+    shutdown_pool()
+
+    assert [p["text"] for p in serial_pages] == [p["text"] for p in parallel_pages], "output differs"
+    print(json.dumps({
+        "benchmark": "pdf_extraction",
+        "pages": n_pages,
+        "workers": args.workers,
+        "serial_pages_per_sec": round(n_pages / serial_s, 1),
+        "parallel_pages_per_sec": round(n_pages / parallel_s, 1),
+        "speedup": round(serial_s / parallel_s, 2)
+    }))
+
+if __name__ == "__main__":
+    main()
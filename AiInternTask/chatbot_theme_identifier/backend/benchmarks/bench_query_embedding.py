@@ -0,0 +1,109 @@
+"""
+Query-embedding latency under concurrency: one model run per request vs. micro-batches.
+
+At each concurrency level, that many closed-loop clients embed distinct questions
+(no cache hits) from one event loop, as concurrent /query/ handlers do:
+    per_request  each request runs its own one-text inference on a worker thread
+                 (run_in_threadpool(get_embeddings, [text]), the previous query path)
+    batched      get_embedding_async: requests are coalesced by the embedding batcher
+Reports p50/p99 latency and throughput per level, and the batcher's mean batch size.
+
+--simulate-ms FIXED,PER_TEXT replaces the model's cost with a sleep of FIXED + PER_TEXT * n
+milliseconds per run, serialized like one CPU-bound ONNX session; use it where the
+model is unavailable. Without it the configured model is used.
+
+Run from the backend directory:
+    python -m benchmarks.bench_query_embedding [--levels 1,4,16,64 --requests 256 --simulate-ms 8,0.5]
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+from .corpus import WORDS
+from .harness import summarize
+
+class SimulatedEmbedder:
+    """Wraps the embedder, adding a fixed plus per-text cost; one run at a time."""
+
+    def __init__(self, embedder, fixed_s, per_text_s):
+        self.embedder = embedder
+        self.fixed_s = fixed_s
+        self.per_text_s = per_text_s
+        self._lock = threading.Lock()
+
+    def embed(self, texts, batch_size=256):
+        texts = list(texts)
+        with self._lock:
+            time.sleep(self.fixed_s + self.per_text_s * len(texts))
+        return self.embedder.embed(texts, batch_size=batch_size)
+
+def questions(level, n, run):
+    return [
+        f"Question {run}-{level}-{i}: what does the report say about "
+        f"{WORDS[i % len(WORDS)]} and {WORDS[(i * 7 + level) % len(WORDS)]}?"
+        for i in range(n)
+    ]
+
+async def run_level(embed, texts, concurrency):
+    pending = list(texts)
+    latencies = []
+
+    async def client():
+        while pending:
+            text = pending.pop()
+            start = time.perf_counter()
+            await embed(text)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,4,16,64", help="concurrency levels")
+    parser.add_argument("--requests", type=int, default=256, help="requests per level and mode")
+    parser.add_argument("--simulate-ms", help="FIXED,PER_TEXT model cost in milliseconds")
+    args = parser.parse_args()
+
+    # Distinct texts make every request a cache miss; no disk cache tier
+    os.environ["EMBED_CACHE_PATH"] = ""
+    from fastapi.concurrency import run_in_threadpool
+    from app import config
+    from app.core.document_processor import get_embeddings, get_embedding_async, get_embedding_batcher_stats
+
+    embedder = config.get_embedder()
+    if args.simulate_ms:
+        fixed_ms, per_text_ms = (float(v) for v in args.simulate_ms.split(","))
+        config._embedder = SimulatedEmbedder(embedder, fixed_ms / 1000, per_text_ms / 1000)
+    get_embeddings(["warm-up"])
+
+    async def per_request(text):
+        return (await run_in_threadpool(get_embeddings, [text]))[0]
+
+    result = {
+        "benchmark": "query_embedding",
+        "model": config.EMBEDDING_MODEL,
+        "simulated_ms": args.simulate_ms,
+        "microbatch_size": config.settings.EMBED_MICROBATCH_SIZE,
+        "microbatch_wait_ms": config.settings.EMBED_MICROBATCH_WAIT_MS,
+        "levels": []
+    }
+    for level in (int(v) for v in args.levels.split(",")):
+        before = get_embedding_batcher_stats()
+        batched = asyncio.run(run_level(get_embedding_async, questions(level, args.requests, "b"), level))
+        after = get_embedding_batcher_stats()
+        batches = after["batches"] - before["batches"]
+        batched["mean_batch_size"] = round((after["texts"] - before["texts"]) / batches, 2) if batches else 0.0
+        result["levels"].append({
+            "concurrency": level,
+            "per_request": asyncio.run(run_level(per_request, questions(level, args.requests, "p"), level)),
+            "batched": batched
+        })
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Import and startup time breakdown of the backend.
+
+Measures, in a fresh interpreter, the wall time of `import app.main`, the slowest
+imports (from `python -X importtime`), and the warm-up steps (model import/load,
+first embedding, vector store check).
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup [--top 15] [--no-warmup]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app.main
+import_s = time.perf_counter() - start
+timings = {}
+if %(warmup)r:
+    from app.core.readiness import warm_up, readiness
+    warm_up()
+    timings = readiness()[1]["startup_timings"]
+print(json.dumps({"import_app_s": round(import_s, 3), **timings}))
+"""
+
+def parse_importtime(stderr, top):
+    """Slowest imports by cumulative time, from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    # Cumulative times of nested modules are also included in their importer's
+    rows.sort(reverse=True)
+    return [
+        {"module": name, "cumulative_ms": round(cum / 1000, 1), "self_ms": round(own / 1000, 1)}
+        for cum, own, name in rows[:top]
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--no-warmup", action="store_true", help="only measure imports")
+    args = parser.parse_args()
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE % {"warmup": not args.no_warmup}],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    print(json.dumps({
+        "benchmark": "startup",
+        **result,
+        "slowest_imports": parse_importtime(proc.stderr, args.top)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Single-prompt vs hierarchical map-reduce theme synthesis as the answer set grows.
+
+For each answer count, runs the previous approach (every answer in one prompt)
+and synthesize_themes against a local fake Gemini server whose latency grows
+with prompt and output tokens, reporting latency, LLM calls, total and largest
+prompt tokens. Answers are paraphrases of a fixed set of findings, as retrieved
+from many similar documents. Needs the embedding model (answers are embedded
+for merging and clustering).
+
+Run from the backend directory:
+    python -m benchmarks.bench_themes [--sizes 10 50 200 800]
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from .corpus import WORDS
+from .fake_gemini import FakeGemini
+
+PHRASINGS = [
+    "The document states that {}.",
+    "According to the report, {}.",
+    "It notes that {}.",
+    "The text mentions that {}."
+]
+
+def make_answers(n, n_findings=40, seed=0):
+    rng = random.Random(seed)
+    findings = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(n_findings)]
+    return [
+        {
+            "doc_id": f"doc{i}",
+            "doc_name": f"report_{i}.pdf",
+            "citation": f"Page {rng.randint(1, 40)}, Para {rng.randint(1, 9)}",
+            "answer": rng.choice(PHRASINGS).format(rng.choice(findings))
+        }
+        for i in range(n)
+    ]
+
+def measure(fake, coro_fn):
+    from app.services.gemini_service import get_gemini_usage
+    before = get_gemini_usage()
+    fake.max_prompt_tokens = 0
+    start = time.perf_counter()
+    asyncio.run(coro_fn())
+    elapsed = time.perf_counter() - start
+    after = get_gemini_usage()
+    return {
+        "latency_s": round(elapsed, 3),
+        "llm_calls": after["requests"] - before["requests"],
+        "prompt_tokens": after["prompt_tokens"] - before["prompt_tokens"],
+        "max_prompt_tokens": fake.max_prompt_tokens
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 800])
+    parser.add_argument("--base-latency", type=float, default=0.3, help="fake server seconds per call")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0002, help="fake server seconds per prompt token")
+    args = parser.parse_args()
+
+    fake = FakeGemini(base_latency=args.base_latency, prompt_token_latency=args.prompt_token_latency)
+    # Settings are read at import time: point the app at the fake server first
+    os.environ.update({
+        "GEMINI_API_BASE": fake.start(),
+        "GEMINI_API_KEY": "benchmark",
+        "GEMINI_RPM": "0",
+        "GEMINI_TPM": "0",
+        "VECTOR_BACKEND": "local"
+    })
+    from app.services.gemini_service import gemini_chat_async
+    from app.core.theme_synthesis import build_theme_prompt, synthesize_themes
+    from app.core.document_processor import get_embeddings
+    get_embeddings(["warm-up"])
+
+    rows = []
+    query = "What did the audits find?"
+    for n in args.sizes:
+        answers = make_answers(n)
+        rows.append({
+            "answers": n,
+            "single_prompt": measure(fake, lambda: gemini_chat_async([build_theme_prompt(query, answers)])),
+            "map_reduce": measure(fake, lambda: synthesize_themes(query, answers))
+        })
+    fake.stop()
+    print(json.dumps({"benchmark": "theme_synthesis", "results": rows}, indent=2))
+
+if __name__ == "__main__":
+    main()
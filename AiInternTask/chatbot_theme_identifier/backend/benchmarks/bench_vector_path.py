@@ -0,0 +1,150 @@
+"""
+Embedding path memory and time: Python lists vs NumPy arrays, and compact local storage.
+
+ingest: --chunks synthetic embeddings (the model is left out) go through record
+building and the upsert boundary, in embedding batches as upsert_to_pinecone sends them:
+    lists   the previous path: each vector converted with tolist() when embedded
+    arrays  rows stay views of the batch array until the vector store serializes them
+for the local store (written to a temporary directory) and for the Pinecone request
+boundary (each upsert request converted to lists, as PineconeVectorStore does).
+Reports wall time and peak traced allocation (tracemalloc).
+
+query: --vectors clustered unit vectors in a local namespace stored as float32,
+float16 or int8, queried with noisy copies of stored vectors. Reports the bytes
+scanned per query, p50 latency and recall@10 against exact float32 search, for each
+rescoring factor (1 = the compact scores decide alone).
+
+Run from the backend directory:
+    python -m benchmarks.bench_vector_path [--chunks 20000 --vectors 100000 --queries 200]
+"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from .harness import percentile
+
+DIM = 384
+
+def make_chunks(n):
+    return [{"id": f"doc{i // 500}", "doc_name": f"doc{i // 500}.pdf", "page": i % 50, "para": i % 7,
+             "text": f"chunk {i} " + "lorem ipsum " * 20} for i in range(n)]
+
+def clustered_unit_vectors(n, seed, n_clusters=200, noise=0.6):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, DIM)).astype(np.float32)
+    data = centers[rng.integers(n_clusters, size=n)] + noise * rng.standard_normal((n, DIM)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+def measure(fn):
+    """Wall time of one run, and peak traced allocation of a second (tracing slows it down)."""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_traced_mib": round(peak / 2 ** 20, 1)}
+
+def run_ingest(args):
+    from app.config import settings
+    from app.core.document_processor import _build_vector, _iter_upsert_batches
+    from app.services.vector_store import LocalVectorStore, _serializable
+
+    chunks = make_chunks(args.chunks)
+    batch_size = settings.EMBED_BATCH_SIZE
+    rng = np.random.default_rng(0)
+    # One float32 array per embedding batch, as the model (and get_embeddings) returns them
+    batches = [rng.standard_normal((len(chunks[i:i + batch_size]), DIM)).astype(np.float32)
+               for i in range(0, len(chunks), batch_size)]
+
+    def records(as_lists):
+        for b, matrix in enumerate(batches):
+            rows = [row.tolist() for row in matrix] if as_lists else matrix
+            yield [_build_vector(c, e) for c, e in zip(chunks[b * batch_size:], rows)]
+
+    def local(as_lists):
+        root = tempfile.mkdtemp(prefix="bench_vectors_")
+        store = LocalVectorStore(root)
+        store.create_index("bench", DIM)
+        try:
+            for vectors in records(as_lists):
+                store.upsert("bench", vectors)
+        finally:
+            store.delete_index("bench")
+            shutil.rmtree(root, ignore_errors=True)
+
+    def pinecone_boundary(as_lists):
+        for vectors in records(as_lists):
+            for request in _iter_upsert_batches(vectors, settings.UPSERT_BATCH_SIZE, settings.UPSERT_MAX_BYTES):
+                [{**v, "values": _serializable(v["values"])} for v in request]
+
+    return {
+        "chunks": args.chunks,
+        "local_store": {"lists": measure(lambda: local(True)), "arrays": measure(lambda: local(False))},
+        "pinecone_boundary": {"lists": measure(lambda: pinecone_boundary(True)),
+                              "arrays": measure(lambda: pinecone_boundary(False))}
+    }
+
+def run_query(args):
+    from app.config import settings
+    from app.services.vector_store import LocalVectorStore
+
+    data = clustered_unit_vectors(args.vectors, seed=1)
+    rng = np.random.default_rng(2)
+    picks = rng.choice(args.vectors, args.queries, replace=False)
+    queries = data[picks] + 0.5 * rng.standard_normal((args.queries, DIM)).astype(np.float32) / np.sqrt(DIM)
+    truth = [set(np.argsort(-(data @ q))[:10].tolist()) for q in queries]
+
+    results = {}
+    root = tempfile.mkdtemp(prefix="bench_vectors_")
+    try:
+        for dtype in ("float32", "float16", "int8"):
+            store = LocalVectorStore(os.path.join(root, dtype), dtype=dtype)
+            store.create_index("bench", DIM)
+            for start in range(0, args.vectors, 5000):
+                store.upsert("bench", [{"id": str(i), "values": data[i], "metadata": {}}
+                                       for i in range(start, min(start + 5000, args.vectors))])
+            namespace = store._namespace("bench", None)
+            scanned = namespace.compact if namespace.compact is not None else namespace.vectors
+            scan_bytes = args.vectors * scanned.shape[1] * scanned.dtype.itemsize
+            if namespace.scales is not None:
+                scan_bytes += args.vectors * 4
+            for factor in ((1,) if dtype == "float32" else (1, 4)):
+                settings.LOCAL_RESCORE_FACTOR = factor
+                latencies, hits = [], 0
+                for q, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    matches = store.query("bench", q, top_k=10)
+                    latencies.append(time.perf_counter() - start)
+                    hits += len(expected & {int(m["id"]) for m in matches})
+                name = dtype if dtype == "float32" else f"{dtype}_rescore{factor}"
+                results[name] = {
+                    "scan_mib": round(scan_bytes / 2 ** 20, 1),
+                    "p50_ms": round(1000 * percentile(latencies, 50), 2),
+                    "recall_at_10": round(hits / (10 * args.queries), 4)
+                }
+            store.delete_index("bench")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {"vectors": args.vectors, "queries": args.queries, **results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    # Exact search only: the IVF index would blur the storage comparison
+    os.environ["LOCAL_ANN_THRESHOLD"] = str(10 * args.vectors)
+    os.environ["EMBED_CACHE_PATH"] = ""
+    print(json.dumps({"benchmark": "vector_path", "ingest": run_ingest(args), "query": run_query(args)}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Synthetic documents for benchmarks. Deterministic for a given seed.
+"""
+import io
+import random
+import zipfile
+
+from PIL import Image, ImageDraw, ImageFont
+
+WORDS = (
+    "regulatory compliance audit finding policy risk control report board committee "
+    "disclosure penalty contract clause obligation liability vendor payment schedule "
+    "revenue forecast quarter budget variance employee training incident security "
+    "breach notification customer data privacy retention review approval deadline"
+).split()
+
+def make_paragraphs(n, seed=0, min_words=25, max_words=80):
+    """Random paragraphs of domain-flavoured words."""
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(n):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+        paragraphs.append(" ".join(words).capitalize() + ".")
+    return paragraphs
+
+def _wrap(text, width=90):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def render_text_image(lines, width=1700, line_height=40, font_size=None, margin=60):
+    """
+    Renders lines of text to a white grayscale image (a stand-in for a scan),
+    in Pillow's default font (at `font_size` pixels if given).
+    """
+    image = Image.new("L", (width, line_height * (len(lines) + 2)), 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=font_size) if font_size else None
+    for i, line in enumerate(lines):
+        draw.text((margin, line_height * (i + 1)), line, fill=0, font=font)
+    return image
+
+def make_pdf(path, n_pages, paragraphs_per_page=5, scanned_every=0, seed=0):
+    """
+    Writes an n_pages PDF with a text layer on each page.
+    With scanned_every=k, every k-th page instead holds only a JPEG image of its text.
+    """
+    paragraphs = make_paragraphs(n_pages * paragraphs_per_page, seed=seed)
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for p in range(n_pages):
+        lines = []
+        for para in paragraphs[p * paragraphs_per_page:(p + 1) * paragraphs_per_page]:
+            lines.extend(_wrap(para))
+            lines.append("")
+        resources = "/Font << /F1 3 0 R >>"
+        if scanned_every and (p + 1) % scanned_every == 0:
+            buf = io.BytesIO()
+            image = render_text_image(lines)
+            image.save(buf, format="JPEG", quality=80)
+            objects.append(
+                f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+                f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /DCTDecode "
+                f"/Length {len(buf.getvalue())} >>\nstream\n".encode() + buf.getvalue() + b"\nendstream"
+            )
+            resources = f"/XObject << /Im1 {len(objects)} 0 R >>"
+            content = b"q 595 0 0 842 0 0 cm /Im1 Do Q"
+        else:
+            ops = ["BT /F1 9 Tf 11 TL 40 800 Td"]
+            ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+            ops.append("ET")
+            content = "\n".join(ops).encode("latin-1")
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << {resources} >> /Contents {content_ref} 0 R >>".encode()
+        )
+        page_refs.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {n_pages} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(out.tell())
+        out.write(f"{i + 1} 0 obj\n".encode() + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    with open(path, "wb") as f:
+        f.write(out.getvalue())
+    return path
+
+_DOCX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/>
+</Types>"""
+
+_DOCX_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+_DOCX_DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/header" Target="header1.xml"/>
+</Relationships>"""
+
+_W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+def _docx_paragraph(text, words_per_run, prefix=""):
+    words = text.split()
+    runs = [
+        f'<w:r><w:rPr><w:sz w:val="22"/></w:rPr><w:t xml:space="preserve">{" ".join(words[i:i + words_per_run])} </w:t></w:r>'
+        for i in range(0, len(words), words_per_run)
+    ]
+    return f"<w:p>{prefix}{''.join(runs)}</w:p>"
+
+def make_docx(path, n_pages, paragraphs_per_page=8, words_per_run=2, table_every=3, seed=0):
+    """
+    Writes an n_pages .docx with many small runs per paragraph (as in heavily edited
+    contracts). Pages end with explicit page breaks; every table_every-th page also
+    holds a 3x4 table, and pages start with a lastRenderedPageBreak marker as Word writes it.
+    """
+    paragraphs = make_paragraphs(n_pages * paragraphs_per_page, seed=seed)
+    body = []
+    for p in range(n_pages):
+        for i, para in enumerate(paragraphs[p * paragraphs_per_page:(p + 1) * paragraphs_per_page]):
+            prefix = "<w:r><w:lastRenderedPageBreak/></w:r>" if p and i == 0 else ""
+            body.append(_docx_paragraph(para, words_per_run, prefix))
+        if table_every and (p + 1) % table_every == 0:
+            rows = []
+            for r in range(4):
+                cells = "".join(
+                    f"<w:tc>{_docx_paragraph(f'Row {r + 1} item {c + 1} of table {p + 1}', words_per_run)}</w:tc>"
+                    for c in range(3)
+                )
+                rows.append(f"<w:tr>{cells}</w:tr>")
+            body.append(f"<w:tbl>{''.join(rows)}</w:tbl>")
+        if p < n_pages - 1:
+            body.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+    document = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:document {_W_NS}><w:body>{"".join(body)}</w:body></w:document>'
+    header = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:hdr {_W_NS}>{_docx_paragraph("Master services agreement - confidential", words_per_run)}</w:hdr>'
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _DOCX_RELS)
+        archive.writestr("word/_rels/document.xml.rels", _DOCX_DOCUMENT_RELS)
+        archive.writestr("word/document.xml", document)
+        archive.writestr("word/header1.xml", header)
+    return path
+
+def make_txt(path, n_paragraphs, seed=0):
+    """Writes a plain-text document of blank-line separated paragraphs."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(make_paragraphs(n_paragraphs, seed=seed)))
+    return path
+
+def make_image(path, n_paragraphs=3, seed=0):
+    """Writes a PNG "scan" of a few paragraphs of text."""
+    lines = []
+    for para in make_paragraphs(n_paragraphs, seed=seed):
+        lines.extend(_wrap(para))
+        lines.append("")
+    render_text_image(lines).save(path, format="PNG")
+    return path
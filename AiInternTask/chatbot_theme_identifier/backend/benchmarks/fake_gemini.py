@@ -0,0 +1,126 @@
+"""
+Local stand-in for the Gemini REST API, for offline benchmarks.
+
+Serves generateContent and streamGenerateContent (?alt=sse) with a latency model
+(fixed overhead plus per prompt/output token time), usageMetadata token counts
+(~4 characters per token), and optional error injection (429/503 responses).
+Prompts asking for JSON (responseMimeType) get one answer per numbered passage;
+`malformed_json_rate` makes a share of them unparseable.
+"""
+import re
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+_PASSAGE_RE = re.compile(r"^\[(\d+)\] Document ", re.MULTILINE)
+
+def _tokens(text):
+    return max(1, len(text) // 4)
+
+class FakeGemini:
+    def __init__(self, base_latency=0.3, prompt_token_latency=0.00002, output_token_latency=0.004,
+                 error_rate=0.0, malformed_json_rate=0.0, seed=0):
+        self.base_latency = base_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.output_token_latency = output_token_latency
+        self.error_rate = error_rate
+        self.malformed_json_rate = malformed_json_rate
+        self.requests = 0
+        self.errors = 0
+        self.max_prompt_tokens = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def reply(self, prompt, json_output):
+        """Generated text for a prompt."""
+        if json_output:
+            passages = [int(n) for n in _PASSAGE_RE.findall(prompt)]
+            with self._lock:
+                malformed = self._rng.random() < self.malformed_json_rate
+            if malformed:
+                return "Here are the answers: " + ", ".join(f"passage {n}" for n in passages)
+            return json.dumps([
+                {"chunk": n, "answer": f"Passage {n} states that the audit finding was reported to the board."}
+                for n in passages
+            ])
+        if "Identify the main themes" in prompt:
+            return "Theme 1 - Audit findings: the documents report audit findings to the board."
+        return "The document states that the audit finding was reported to the board."
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="application/json", headers=()):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = "".join(part["text"] for part in body["contents"][0]["parts"])
+                json_output = body.get("generationConfig", {}).get("responseMimeType") == "application/json"
+                with fake._lock:
+                    fake.requests += 1
+                    fail = fake._rng.random() < fake.error_rate
+                    if fail:
+                        fake.errors += 1
+                if fail:
+                    time.sleep(fake.base_latency / 3)
+                    status = 429 if fake._rng.random() < 0.5 else 503
+                    return self._send(status, b'{"error": "injected"}', headers=[("Retry-After", "0.1")])
+                text = fake.reply(prompt, json_output)
+                prompt_tokens, output_tokens = _tokens(prompt), _tokens(text)
+                with fake._lock:
+                    fake.max_prompt_tokens = max(fake.max_prompt_tokens, prompt_tokens)
+                usage = {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": output_tokens,
+                    "totalTokenCount": prompt_tokens + output_tokens
+                }
+                time.sleep(fake.base_latency + prompt_tokens * fake.prompt_token_latency)
+                if "streamGenerateContent" not in self.path:
+                    time.sleep(output_tokens * fake.output_token_latency)
+                    payload = {"candidates": [{"content": {"parts": [{"text": text}]}}], "usageMetadata": usage}
+                    return self._send(200, json.dumps(payload).encode())
+                # Stream word by word as server-sent events; usage is cumulative per event
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                words = text.split(" ")
+                for i, word in enumerate(words):
+                    time.sleep(_tokens(word) * fake.output_token_latency)
+                    event = {
+                        "candidates": [{"content": {"parts": [{"text": word + (" " if i < len(words) - 1 else "")}]}}],
+                        "usageMetadata": usage
+                    }
+                    self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode())
+                    self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+    def start(self, port=0):
+        """Starts serving on a background thread; returns the base URL for GEMINI_API_BASE."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
@@ -0,0 +1,107 @@
+"""
+In-process stand-in for the Pinecone client, for offline benchmarks.
+
+Implements the subset of the client the app uses (list/create/delete indexes,
+Index.upsert/query/delete) over exact NumPy search, with a configurable latency
+per call (plus per upserted vector) and error injection.
+Install it with `install(FakePinecone(...))` before the app first uses Pinecone.
+"""
+import time
+import random
+import threading
+
+import numpy as np
+
+class FakePineconeError(Exception):
+    """Injected failure, standing in for a Pinecone 5xx/timeout."""
+
+class _IndexInfo:
+    def __init__(self, name):
+        self.name = name
+
+class _FakeIndex:
+    def __init__(self, client, dimension):
+        self._client = client
+        self.dimension = dimension
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=""):
+        self._client._call(len(vectors))
+        with self._lock:
+            ns = self._namespaces.setdefault(namespace, {})
+            for v in vectors:
+                values = np.asarray(v["values"], dtype=np.float32)
+                ns[v["id"]] = (values / (np.linalg.norm(values) or 1.0), v.get("metadata") or {})
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k=10, include_metadata=False, include_values=False, namespace=""):
+        self._client._call()
+        with self._lock:
+            items = list(self._namespaces.get(namespace, {}).items())
+        if not items:
+            return {"matches": []}
+        query = np.asarray(vector, dtype=np.float32)
+        scores = np.stack([values for _, (values, _) in items]) @ (query / (np.linalg.norm(query) or 1.0))
+        matches = []
+        for i in np.argsort(-scores)[:top_k]:
+            vid, (values, metadata) = items[i]
+            match = {"id": vid, "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = metadata
+            if include_values:
+                match["values"] = values.tolist()
+            matches.append(match)
+        return {"matches": matches}
+
+    def delete(self, ids=None, delete_all=False, namespace=""):
+        self._client._call()
+        with self._lock:
+            if delete_all:
+                self._namespaces.pop(namespace, None)
+            else:
+                ns = self._namespaces.get(namespace, {})
+                for vid in ids or []:
+                    ns.pop(vid, None)
+
+class FakePinecone:
+    def __init__(self, latency=0.02, latency_per_vector=0.0002, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.latency_per_vector = latency_per_vector
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._indexes = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, n_vectors=0):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(self.latency + n_vectors * self.latency_per_vector)
+        if fail:
+            raise FakePineconeError("injected Pinecone failure")
+
+    def list_indexes(self):
+        self._call()
+        return [_IndexInfo(name) for name in list(self._indexes)]
+
+    def create_index(self, name, dimension, metric="cosine", spec=None):
+        self._call()
+        self._indexes.setdefault(name, _FakeIndex(self, dimension))
+
+    def delete_index(self, name):
+        self._call()
+        self._indexes.pop(name, None)
+
+    def Index(self, name):
+        return self._indexes[name]
+
+def install(fake):
+    """Makes the app's get_pinecone() return `fake`."""
+    from app import config
+    config._pc = fake
+    return fake
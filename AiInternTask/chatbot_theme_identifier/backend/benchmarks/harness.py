@@ -0,0 +1,84 @@
+"""
+Shared measurement helpers for the benchmarks: latency percentiles and peak RSS sampling.
+"""
+import time
+import resource
+import threading
+import statistics
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0-100) of a non-empty list."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles of one stage, in seconds."""
+    summary = {"count": len(latencies), "errors": errors, "elapsed_s": round(elapsed, 3)}
+    if latencies:
+        summary.update({
+            "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+            "mean_s": round(statistics.mean(latencies), 4),
+            "p50_s": round(percentile(latencies, 50), 4),
+            "p95_s": round(percentile(latencies, 95), 4),
+            "p99_s": round(percentile(latencies, 99), 4),
+            "max_s": round(max(latencies), 4)
+        })
+    return summary
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc; falls back to the lifetime peak)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # ru_maxrss is in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class RssSampler:
+    """
+    Samples this process's RSS on a background thread and tracks the peak per stage.
+    Call stage(name) when a stage starts; peaks() returns {stage: peak MiB}.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self._peaks = {}
+        self._stage = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        stage = self._stage
+        if stage is not None:
+            self._peaks[stage] = max(self._peaks.get(stage, 0), current_rss_bytes())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stage(self, name):
+        self._sample()
+        self._stage = name
+        self._sample()
+
+    def stop(self):
+        self._sample()
+        self._stop.set()
+        self._thread.join()
+
+    def peaks(self):
+        return {stage: round(peak / 2 ** 20, 1) for stage, peak in self._peaks.items()}
+
+class Timer:
+    """Context manager measuring wall time in seconds (`.elapsed`)."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
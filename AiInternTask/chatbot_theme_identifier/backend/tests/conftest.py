@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Settings are read at import time: keep tests offline and out of the working tree
+_data_dir = tempfile.mkdtemp(prefix="backend_tests_")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("LOCAL_VECTOR_DIR", os.path.join(_data_dir, "vectors"))
+os.environ.setdefault("MANIFEST_DIR", os.path.join(_data_dir, "manifests"))
+os.environ.setdefault("EMBED_CACHE_PATH", "")
+os.environ.setdefault("OCR_CACHE_PATH", "")
+os.environ.setdefault("SESSION_DB_PATH", os.path.join(_data_dir, "sessions.sqlite3"))
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
@@ -0,0 +1,73 @@
+import random
+
+from app.core.chunker import count_tokens, chunk_pages, _split_oversized
+
+WORDS = "audit board finding report revenue risk control policy review compliance".split()
+
+def paragraph(rng, n_sentences):
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 15))).capitalize() + "."
+        for _ in range(n_sentences)
+    )
+
+def make_pages(n_pages=3, n_paragraphs=6, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"page": p + 1, "text": "\n\n".join(paragraph(rng, rng.randint(1, 6)) for _ in range(n_paragraphs))}
+        for p in range(n_pages)
+    ]
+
+def test_count_tokens_counts_words_and_punctuation():
+    assert count_tokens("Hello, world!") == 4
+    assert count_tokens("") == 0
+
+def test_chunks_respect_budget_and_keep_all_text():
+    pages = make_pages()
+    chunks = chunk_pages(pages, target_tokens=64, overlap_tokens=8, min_tokens=16)
+    assert len(chunks) > 3
+    assert [c["chunk"] for c in chunks] == list(range(1, len(chunks) + 1))
+    # Only the last chunk may exceed the budget, by the merged remainder
+    assert all(c["n_tokens"] <= 64 for c in chunks[:-1])
+    assert chunks[-1]["n_tokens"] < 64 + 16
+    text = " ".join(c["text"] for c in chunks).split()
+    for page in pages:
+        for word in page["text"].split():
+            assert word in text
+
+def test_chunks_overlap_their_predecessor():
+    chunks = chunk_pages(make_pages(seed=1), target_tokens=64, overlap_tokens=8, min_tokens=16)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        first_words = chunk["text"].split()[:3]
+        assert " ".join(first_words) in previous["text"]
+
+def test_chunks_carry_provenance_across_pages():
+    pages = [{"page": 1, "text": "Alpha one.\n\nAlpha two."}, {"page": 2, "text": "Beta one."}]
+    [chunk] = chunk_pages(pages, target_tokens=64, overlap_tokens=0, min_tokens=0)
+    assert (chunk["page"], chunk["para"], chunk["page_end"], chunk["para_end"]) == (1, 1, 2, 1)
+    assert chunk["text"] == "Alpha one.\n\nAlpha two.\n\nBeta one."
+
+def test_oversized_paragraph_is_split_at_sentences_then_words():
+    sentence = "word " * 30
+    text = f"Short one. {sentence.strip()}. Short two."
+    pieces = _split_oversized(text, max_tokens=12)
+    assert all(count_tokens(piece) <= 12 for piece in pieces)
+    assert pieces[0] == "Short one."
+    assert " ".join(pieces).split() == text.split()
+
+def test_small_remainder_merges_into_previous_chunk():
+    pages = [{"page": 1, "text": "\n\n".join(["one two three four five six seven eight."] * 3 + ["Tail."])}]
+    chunks = chunk_pages(pages, target_tokens=18, overlap_tokens=0, min_tokens=5)
+    assert len(chunks) == 2
+    assert chunks[-1]["text"].endswith("eight.\n\nTail.")
+    assert chunks[-1]["n_tokens"] == 9 + 2
+
+def test_dense_numbers_and_punctuation_stay_within_budget():
+    rng = random.Random(1)
+    # No sentence breaks; words cost 1 to 7 tokens each
+    words = [rng.choice(["revenue", "3.5%", "(Q4)", "$1,200,000", "EBITDA:", "-0.25", "a/b/c/d"]) for _ in range(2000)]
+    text = " ".join(words)
+    pieces = _split_oversized(text, 256)
+    assert all(count_tokens(piece) <= 256 for piece in pieces)
+    assert " ".join(pieces).split() == words
+    chunks = chunk_pages([{"page": 1, "text": text}], target_tokens=256, overlap_tokens=32, min_tokens=48)
+    assert all(c["n_tokens"] <= 256 for c in chunks[:-1])
@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.core.embedding_cache import EmbeddingCache
+from app.services.vector_store import LocalVectorStore, _quantize_int8
+
+def random_vectors(n, dimension=64, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dimension)).astype(np.float32)
+
+def build_store(root, dtype, vectors):
+    store = LocalVectorStore(str(root), dtype=dtype)
+    store.create_index("session", dimension=vectors.shape[1])
+    store.upsert("session", [
+        {"id": f"v{i}", "values": values, "metadata": {"row": i}} for i, values in enumerate(vectors)
+    ])
+    return store
+
+def top_ids(store, queries, top_k=10):
+    return [[m["id"] for m in store.query("session", q, top_k=top_k)] for q in queries]
+
+def test_int8_quantization_round_trip_uses_per_row_scales():
+    values = random_vectors(50)
+    values[7] *= 100  # rows of very different magnitude keep their own precision
+    values[8] = 0
+    codes, scales = _quantize_int8(values)
+    assert codes.dtype == np.int8 and scales.dtype == np.float32 and scales.shape == (50,)
+    assert np.abs(codes).max() == 127
+    assert scales[7] > 50 * scales[0]
+    assert scales[8] == 1.0 and not codes[8].any()
+    error = np.abs(codes * scales[:, None] - values)
+    assert (error <= scales[:, None] / 2 + 1e-6).all()
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compact_top_k_agrees_with_float32(tmp_path, dtype):
+    vectors = random_vectors(2000)
+    queries = random_vectors(20, seed=1)
+    expected = top_ids(build_store(tmp_path / "f32", "float32", vectors), queries)
+    compact = build_store(tmp_path / dtype, dtype, vectors)
+    assert top_ids(compact, queries) == expected
+    # Scores are rescored against the float32 rows
+    reference = build_store(tmp_path / "ref", "float32", vectors)
+    for match, exact in zip(compact.query("session", queries[0]), reference.query("session", queries[0])):
+        assert match["score"] == pytest.approx(exact["score"], abs=1e-6)
+
+def test_rescore_factor_bounds_the_shortlist(tmp_path, monkeypatch):
+    vectors = random_vectors(500)
+    store = build_store(tmp_path, "int8", vectors)
+    namespace = store._namespace("session", None)
+    rescored = []
+    real_vectors = namespace.vectors
+
+    class Recording:
+        def __getitem__(self, rows):
+            rescored.append(len(rows))
+            return real_vectors[rows]
+
+    monkeypatch.setattr(settings, "LOCAL_RESCORE_FACTOR", 3)
+    monkeypatch.setattr(namespace, "vectors", Recording())
+    assert len(store.query("session", vectors[0], top_k=5)) == 5
+    assert rescored == [15]
+
+def test_namespace_from_before_compact_storage_still_loads(tmp_path):
+    vectors = random_vectors(20)
+    build_store(tmp_path, "float32", vectors)
+    # Older namespaces have no dtype in namespace.json and only vectors.f32
+    [info_path] = tmp_path.glob("*/namespaces/*/namespace.json")
+    info = json.loads(info_path.read_text())
+    del info["dtype"]
+    info_path.write_text(json.dumps(info))
+    store = LocalVectorStore(str(tmp_path), dtype="int8")
+    assert store.query("session", vectors[3], top_k=1)[0]["id"] == "v3"
+    store.upsert("session", [{"id": "new", "values": vectors[4] + 1, "metadata": {}}])
+    assert store.query("session", vectors[4] + 1, top_k=1)[0]["id"] == "new"
+    assert not list(info_path.parent.glob("vectors.i8"))
+
+def test_float16_embedding_cache_returns_float32():
+    cache = EmbeddingCache("model", memory_dtype="float16")
+    vector = random_vectors(1)[0]
+    cache.put_many(["text"], [vector])
+    [cached] = cache.get_many(["text"])
+    assert cached.dtype == np.float32
+    np.testing.assert_allclose(cached, vector, rtol=1e-3, atol=1e-3)
+    assert next(iter(cache._memory.values())).dtype == np.float16
@@ -0,0 +1,68 @@
+import zipfile
+
+from app.core.docx_extraction import extract_docx_pages
+
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+def p(*runs, props=""):
+    return f"<w:p>{props}" + "".join(f"<w:r>{run}</w:r>" for run in runs) + "</w:p>"
+
+def t(text):
+    return f"<w:t>{text}</w:t>"
+
+def table(*rows):
+    return "<w:tbl>" + "".join(
+        "<w:tr>" + "".join(f"<w:tc>{cell}</w:tc>" for cell in row) + "</w:tr>" for row in rows
+    ) + "</w:tbl>"
+
+def make_docx(path, body, headers=()):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {NS}><w:body>{body}</w:body></w:document>")
+        for i, header in enumerate(headers):
+            archive.writestr(f"word/header{i + 1}.xml", f"<w:hdr {NS}>{header}</w:hdr>")
+    return str(path)
+
+def test_runs_are_joined_and_special_characters_kept(tmp_path):
+    body = p(t("Reve"), t("nue grew"), "<w:tab/>", t("by 5%"), "<w:noBreakHyphen/>", t("ish"), "<w:cr/>", t("in Q4."))
+    assert extract_docx_pages(make_docx(tmp_path / "a.docx", body)) == [
+        {"page": 1, "text": "Revenue grew\tby 5%-ish\nin Q4."}
+    ]
+
+def test_page_breaks_from_markup(tmp_path):
+    body = (
+        p(t("One."))
+        + p(t("Two."), '<w:br w:type="page"/>', t("Three."))
+        + p(t("Four."), props='<w:pPr><w:pageBreakBefore/></w:pPr>')
+        + p(t("Still four."), props='<w:pPr><w:pageBreakBefore w:val="0"/></w:pPr>')
+        + p("<w:lastRenderedPageBreak/>", t("Five."))
+        # A break with nothing written since the previous one adds no empty page
+        + p('<w:br w:type="page"/>') + p('<w:br w:type="page"/>') + p(t("Six."))
+    )
+    pages = extract_docx_pages(make_docx(tmp_path / "a.docx", body))
+    assert [page["text"] for page in pages] == [
+        "One.\n\nTwo.", "Three.", "Four.\n\nStill four.", "Five.", "Six."
+    ]
+    assert [page["page"] for page in pages] == [1, 2, 3, 4, 5]
+
+def test_tables_rows_and_nested_tables(tmp_path):
+    nested = table([p(t("x")), p(t("y"))])
+    body = p(t("Intro.")) + table(
+        [p(t("Item")), p(t("Amount"))],
+        [p(t("Rent")) + p(t("(monthly)")), p(t("1,200"))],
+        [nested, p(t("z"))]
+    )
+    pages = extract_docx_pages(make_docx(tmp_path / "a.docx", body))
+    assert pages[0]["text"] == "Intro.\n\nItem | Amount\n\nRent (monthly) | 1,200\n\nx | y | z"
+
+def test_page_break_inside_a_table_applies_after_the_row(tmp_path):
+    body = table([p(t("a"), '<w:br w:type="page"/>', t("b")), p(t("c"))], [p(t("d"))]) + p(t("After."))
+    pages = extract_docx_pages(make_docx(tmp_path / "a.docx", body))
+    assert [page["text"] for page in pages] == ["ab | c", "d\n\nAfter."]
+
+def test_headers_and_footers_are_added_once_to_the_first_page(tmp_path):
+    header = p(t("ACME Corp confidential"))
+    body = p(t("One.")) + p('<w:br w:type="page"/>', t("Two."))
+    path = make_docx(tmp_path / "a.docx", body, headers=[header, header])
+    pages = extract_docx_pages(path)
+    assert [page["text"] for page in pages] == ["ACME Corp confidential\n\nOne.", "Two."]
+    assert extract_docx_pages(path, include_headers=False)[0]["text"] == "One."
@@ -0,0 +1,88 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.embedding_batcher import EmbeddingBatcher
+
+class SlowModel:
+    """Tags each text with its batch number; the first batch blocks until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if len(self.batches) == 1:
+            self.release.wait(5)
+        return [f"{len(self.batches)}:{text}" for text in texts]
+
+@pytest.fixture
+def model():
+    return SlowModel()
+
+def test_requests_queued_during_a_batch_form_the_next_one(model):
+    batcher = EmbeddingBatcher(model, max_batch_size=32, max_wait=0.001)
+    first = batcher.submit(["a"])
+    while not model.batches:
+        time.sleep(0.001)
+    futures = [batcher.submit([f"q{i}", f"r{i}"]) for i in range(5)]
+    model.release.set()
+    assert first.result(5) == ["1:a"]
+    # Each caller gets its own vectors, in order, from the shared second batch
+    assert [f.result(5) for f in futures] == [[f"2:q{i}", f"2:r{i}"] for i in range(5)]
+    stats = batcher.stats()
+    assert (stats["requests"], stats["batches"], stats["texts"], stats["largest_batch"]) == (6, 2, 11, 10)
+    batcher.close()
+
+def test_batches_close_at_max_batch_size(model):
+    model.release.set()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait=0.2)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: batcher.embed([f"t{i}"]), range(8)))
+    assert sorted(r[0].split(":")[1] for r in results) == [f"t{i}" for i in range(8)]
+    assert all(len(batch) <= 4 for batch in model.batches)
+    batcher.close()
+
+def test_errors_reach_every_caller_of_the_batch():
+    def fail(texts):
+        raise RuntimeError("model crashed")
+    batcher = EmbeddingBatcher(fail, max_wait=0.05)
+    futures = [batcher.submit([str(i)]) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            future.result(5)
+    # The worker survives a failed batch
+    batcher.embed_fn = lambda texts: list(texts)
+    assert batcher.embed(["ok"]) == ["ok"]
+    batcher.close()
+
+def test_cancelled_requests_are_skipped(model):
+    batcher = EmbeddingBatcher(model, max_wait=0.001)
+    first = batcher.submit(["a"])
+    while not model.batches:
+        time.sleep(0.001)
+    cancelled = batcher.submit(["gone"])
+    kept = batcher.submit(["kept"])
+    assert cancelled.cancel()
+    model.release.set()
+    assert kept.result(5) == ["2:kept"]
+    assert first.result(5) == ["1:a"]
+    assert model.batches[1] == ["kept"]
+    batcher.close()
+
+def test_embed_async_and_close(model):
+    model.release.set()
+    batcher = EmbeddingBatcher(model)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed_async([f"t{i}"]) for i in range(4)))
+    assert [r[0].split(":")[1] for r in asyncio.run(run())] == ["t0", "t1", "t2", "t3"]
+    batcher.close()
+    assert batcher._thread is None
+    # A closed batcher restarts its worker on demand
+    assert batcher.embed(["again"])[0].endswith(":again")
+    batcher.close()
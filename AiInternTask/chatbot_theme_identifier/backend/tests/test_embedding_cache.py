@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.config import EMBEDDING_DIM
+from app.core import document_processor
+from app.core.embedding_cache import EmbeddingCache
+
+def vec(*values):
+    return np.asarray(values, dtype=np.float32)
+
+def test_memory_tier_is_lru():
+    cache = EmbeddingCache("model", max_items=2)
+    cache.put_many(["a", "b"], [vec(1, 0), vec(0, 1)])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [vec(1, 1)])
+    a, b, c = cache.get_many(["a", "b", "c"])
+    assert b is None
+    np.testing.assert_array_equal(a, vec(1, 0))
+    np.testing.assert_array_equal(c, vec(1, 1))
+    assert cache.stats()["evictions"] == 1
+
+def test_keys_ignore_whitespace_and_depend_on_the_model():
+    cache = EmbeddingCache("model")
+    assert cache.key("revenue  grew\n") == cache.key("revenue grew")
+    assert cache.key("revenue grew") != EmbeddingCache("other-model").key("revenue grew")
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.sqlite3")
+    EmbeddingCache("model", db_path=path).put_many(["a"], [vec(1, 2)])
+    cache = EmbeddingCache("model", max_items=10, db_path=path)
+    [a, missing] = cache.get_many(["a", "b"])
+    np.testing.assert_array_equal(a, vec(1, 2))
+    assert missing is None
+    cache.get_many(["a"])
+    stats = cache.stats()
+    assert (stats["hits_disk"], stats["hits_memory"], stats["misses"], stats["disk_items"]) == (1, 1, 1, 1)
+
+class CountingEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, texts, batch_size=None):
+        self.texts.extend(texts)
+        return [np.full(EMBEDDING_DIM, len(t), dtype=np.float32) for t in texts]
+
+@pytest.fixture
+def embedder(monkeypatch):
+    embedder = CountingEmbedder()
+    monkeypatch.setattr(document_processor, "get_embedder", lambda: embedder)
+    monkeypatch.setattr(document_processor, "_embedding_cache", EmbeddingCache("model"))
+    return embedder
+
+def test_get_embeddings_embeds_only_distinct_misses(embedder):
+    first = document_processor.get_embeddings(["a", "bb", "a"])
+    assert embedder.texts == ["a", "bb"]
+    assert first.shape == (3, EMBEDDING_DIM) and first.dtype == np.float32
+    second = document_processor.get_embeddings(["bb", "ccc"])
+    assert embedder.texts == ["a", "bb", "ccc"]
+    np.testing.assert_array_equal(second[0], first[1])
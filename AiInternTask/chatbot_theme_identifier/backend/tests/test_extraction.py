@@ -0,0 +1,104 @@
+import json
+import asyncio
+
+import pytest
+
+from app.core import query_pipeline
+from app.core.query_pipeline import extract_answers, iter_answers
+
+def chunks(n):
+    return [
+        {"doc_id": f"d{i}", "doc_name": f"doc{i}.txt", "page": 1, "para": i + 1, "text": f"passage {i}"}
+        for i in range(n)
+    ]
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fake Gemini: replies after a per-passage delay; tracks calls in flight."""
+    state = {"in_flight": 0, "max_in_flight": 0, "delays": {}, "replies": {}}
+
+    async def chat(prompts, **kwargs):
+        passage = prompts[0].split("passage ")[1].split("\n")[0]
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(state["delays"].get(passage, 0.01))
+            reply = state["replies"].get(passage, f"Answer {passage}.")
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+        finally:
+            state["in_flight"] -= 1
+
+    monkeypatch.setattr(query_pipeline, "gemini_chat_async", chat)
+    return state
+
+def test_answers_keep_chunk_order_despite_completion_order(llm):
+    llm["delays"] = {"0": 0.05, "1": 0.03, "2": 0.01}
+    answers = asyncio.run(extract_answers("q", chunks(3), mode="per_chunk"))
+    assert [a["answer"] for a in answers] == ["Answer 0.", "Answer 1.", "Answer 2."]
+    assert answers[1] == {"doc_id": "d1", "doc_name": "doc1.txt", "answer": "Answer 1.", "citation": "Page 1, Para 2"}
+
+def test_concurrency_is_bounded(llm):
+    asyncio.run(extract_answers("q", chunks(12), concurrency=3, mode="per_chunk"))
+    assert llm["max_in_flight"] == 3
+
+def test_failed_slow_and_vague_answers_are_skipped(llm):
+    llm["delays"] = {"1": 1.0}
+    llm["replies"] = {"2": RuntimeError("500"), "3": "The passage does not specify."}
+    answers = asyncio.run(extract_answers("q", chunks(5), timeout=0.2, mode="per_chunk"))
+    assert [a["doc_id"] for a in answers] == ["d0", "d4"]
+
+def test_iter_answers_yields_as_calls_finish(llm):
+    llm["delays"] = {"0": 0.05, "1": 0.01}
+
+    async def collect():
+        return [position async for position, _ in iter_answers("q", chunks(2), mode="per_chunk")]
+
+    assert asyncio.run(collect()) == [1, 0]
+
+def test_pack_chunks_fills_the_token_budget():
+    sized = [{"text": "word " * n} for n in (300, 300, 300, 2000, 100)]
+    # estimate_tokens counts ~4 characters per token: "word " costs ~1.25 tokens
+    groups = query_pipeline.pack_chunks(sized, token_budget=800)
+    assert groups == [[0, 1], [2], [3], [4]]
+
+def test_parse_packed_answers():
+    reply = '```json\n[{"chunk": 2, "answer": " Rent rose. "}, {"chunk": 1, "answer": null}]\n```'
+    assert query_pipeline.parse_packed_answers(reply, 2) == {1: "Rent rose.", 0: ""}
+    for bad in ("not json", '[{"chunk": 3, "answer": "x"}]', '[{"answer": "x"}]', '{"chunk": 1}'):
+        with pytest.raises(ValueError):
+            query_pipeline.parse_packed_answers(bad, 2)
+
+@pytest.fixture
+def packed_llm(monkeypatch):
+    """Fake Gemini answering packed prompts as JSON (or garbage while `broken`)."""
+    calls, state = [], {"broken": False}
+
+    async def chat(prompts, response_mime_type=None, **kwargs):
+        calls.append(response_mime_type)
+        if response_mime_type != "application/json":
+            return "Single " + prompts[0].split("passage ")[1].split("\n")[0] + "."
+        if calls.count("application/json") == 1 and state["broken"]:
+            return "Sorry, here you go: [1]"
+        n = prompts[0].count("] Document ")
+        return json.dumps([{"chunk": i + 1, "answer": f"Packed {i}." if i != 1 else ""} for i in range(n)])
+
+    monkeypatch.setattr(query_pipeline, "gemini_chat_async", chat)
+    return calls, state
+
+def test_packed_mode_answers_all_chunks_in_one_call(packed_llm):
+    calls, _ = packed_llm
+    answers = asyncio.run(extract_answers("q", chunks(4), mode="packed"))
+    assert calls == ["application/json"]
+    # The empty answer for passage 2 is dropped; citations come from chunk metadata
+    assert [(a["doc_id"], a["answer"], a["citation"]) for a in answers] == [
+        ("d0", "Packed 0.", "Page 1, Para 1"), ("d2", "Packed 2.", "Page 1, Para 3"), ("d3", "Packed 3.", "Page 1, Para 4")
+    ]
+
+def test_unparsable_packed_reply_falls_back_to_per_chunk_calls(packed_llm):
+    calls, state = packed_llm
+    state["broken"] = True
+    answers = asyncio.run(extract_answers("q", chunks(3), mode="packed"))
+    assert calls == ["application/json", None, None, None]
+    assert [a["answer"] for a in answers] == ["Single 0.", "Single 1.", "Single 2."]
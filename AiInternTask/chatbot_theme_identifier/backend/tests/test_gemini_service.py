@@ -0,0 +1,124 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.fake_gemini import FakeGemini
+from app.config import settings
+from app.services import gemini_service
+from app.services.gemini_service import GeminiClient, TokenBucket
+
+@pytest.fixture
+def fake():
+    server = FakeGemini(base_latency=0.0, output_token_latency=0.0)
+    server.base_url = server.start()
+    yield server
+    server.stop()
+
+def make_client(fake, **kwargs):
+    return GeminiClient(api_key="test", base_url=fake.base_url, model="fake", **kwargs)
+
+def generate(client, n=1):
+    async def run():
+        try:
+            return await asyncio.gather(*(client.generate([f"prompt {i}"]) for i in range(n)))
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+def test_generate_returns_text_and_tracks_usage(fake):
+    client = make_client(fake)
+    assert generate(client) == ["The document states that the audit finding was reported to the board."]
+    assert client.usage["requests"] == 1
+    assert client.usage["total_tokens"] == client.usage["prompt_tokens"] + client.usage["output_tokens"] > 0
+
+def test_generate_retries_429_and_503(fake):
+    fake.error_rate = 0.5
+    texts = generate(make_client(fake, max_retries=20), n=8)
+    assert len(texts) == 8 and all(texts)
+    assert fake.errors > 0
+    assert fake.requests == fake.errors + 8
+
+def test_generate_gives_up_after_max_retries(fake):
+    fake.error_rate = 1.0
+    with pytest.raises(httpx.HTTPStatusError) as e:
+        generate(make_client(fake, max_retries=2))
+    assert e.value.response.status_code in (429, 503)
+    assert fake.requests == 3
+
+def test_stream_yields_deltas_and_retries(fake):
+    fake.error_rate = 0.5
+    client = make_client(fake, max_retries=20)
+
+    async def run():
+        try:
+            return [delta async for delta in client.stream(["prompt"])]
+        finally:
+            await client.aclose()
+    deltas = asyncio.run(run())
+    assert len(deltas) > 1
+    assert "".join(deltas) == "The document states that the audit finding was reported to the board."
+    assert client.usage["requests"] == 1
+
+def test_backoff_is_full_jitter_within_cap():
+    for attempt in range(10):
+        cap = min(30.0, 0.5 * 2 ** attempt)
+        delays = [GeminiClient._backoff(attempt) for _ in range(200)]
+        assert all(0 <= d <= cap for d in delays)
+        # Full jitter spreads over the whole range, not just near the cap
+        assert min(delays) < cap / 4 and max(delays) > 3 * cap / 4
+
+def test_backoff_honours_retry_after():
+    assert GeminiClient._backoff(0, "5") >= 5
+    assert GeminiClient._backoff(0, "2.5") >= 2.5
+    assert GeminiClient._backoff(0, "not-a-number") <= 0.5
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(6000)  # 100 tokens per second
+        start = time.monotonic()
+        await bucket.acquire(6000)
+        assert time.monotonic() - start < 0.05
+        await bucket.acquire(10)
+        return time.monotonic() - start
+    assert 0.08 <= asyncio.run(run()) < 0.5
+
+def test_token_bucket_caps_requests_and_refunds():
+    async def run():
+        bucket = TokenBucket(60)
+        # More than the capacity is capped instead of waiting forever
+        await asyncio.wait_for(bucket.acquire(1000), 1)
+        assert bucket.tokens < 1
+        bucket.debit(-1000)
+        return bucket.tokens
+    assert asyncio.run(run()) == 60
+
+def test_token_bucket_serves_waiters_in_order():
+    async def run():
+        bucket = TokenBucket(600)  # 10 tokens per second
+        await bucket.acquire(600)
+        order = []
+
+        async def take(i):
+            await bucket.acquire(1)
+            order.append(i)
+        await asyncio.gather(*(take(i) for i in range(3)))
+        return order
+    assert asyncio.run(run()) == [0, 1, 2]
+
+def test_sync_gemini_chat_uses_shared_client(fake, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_API_BASE", fake.base_url)
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(settings, "GEMINI_RPM", 0)
+    monkeypatch.setattr(settings, "GEMINI_TPM", 0)
+    monkeypatch.setattr(gemini_service, "_loop", None)
+    monkeypatch.setattr(gemini_service, "_client", None)
+    try:
+        assert gemini_service.gemini_chat(["hello"]) == gemini_service.gemini_chat(["again"])
+        assert gemini_service.get_gemini_usage()["requests"] == 2
+        assert fake.requests == 2
+    finally:
+        loop = gemini_service._loop
+        gemini_service.close_gemini_client()
+        loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from app.core.kmeans import normalize_rows, spherical_kmeans
+from app.core.theme_synthesis import cluster_rows
+
+def blobs(n_per_blob=20, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.standard_normal((3, dim)))
+    data = np.concatenate([c + 0.05 * rng.standard_normal((n_per_blob, dim)) for c in centers])
+    return normalize_rows(data).astype(np.float32), centers
+
+def test_normalize_rows_leaves_zero_rows():
+    rows = normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    assert np.allclose(rows, [[0.6, 0.8], [0.0, 0.0]])
+
+def test_spherical_kmeans_finds_blobs():
+    data, centers = blobs()
+    centroids = spherical_kmeans(data, 3)
+    assert centroids.dtype == np.float32
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+    # Every true center has a centroid close to it
+    assert (centers @ centroids.T).max(axis=1).min() > 0.99
+
+def test_cluster_rows_groups_related_rows_within_size():
+    data, _ = blobs(n_per_blob=6)
+    clusters = cluster_rows(data, max_size=8)
+    assert sorted(r for rows in clusters for r in rows) == list(range(len(data)))
+    assert all(len(rows) <= 8 for rows in clusters)
+    assert all(len({r // 6 for r in rows}) == 1 for rows in clusters)
@@ -0,0 +1,83 @@
+import time
+import threading
+
+import pytest
+
+from app.api import endpoints
+from app.core.manifest import ManifestStore
+from app.core.ocr_cache import file_sha256
+
+PARAGRAPHS = [
+    f"Paragraph {i} reports that the audit committee reviewed finding number {i} with the board. " * 12
+    for i in range(6)
+]
+
+@pytest.fixture
+def manifests(tmp_path, monkeypatch):
+    store = ManifestStore(str(tmp_path / "manifests"))
+    monkeypatch.setattr(endpoints, "manifests", store)
+    return store
+
+def plan(tmp_path, name, paragraphs, session_id="s1"):
+    path = tmp_path / name
+    path.write_text("\n\n".join(paragraphs))
+    return endpoints._plan_document(session_id, name, str(path), file_sha256(path), path.stat().st_size)
+
+def test_store_round_trip(manifests):
+    assert manifests.get("a/../b") == {}
+    entry = {"doc_name": "x.txt", "content_hash": "h1", "vector_ids": ["v1"]}
+    manifests.put("a/../b", entry)
+    manifests.put("a/../b", {**entry, "doc_name": "y.txt", "content_hash": "h2"})
+    assert set(manifests.get("a/../b")) == {"x.txt", "y.txt"}
+    assert manifests.find_by_hash("a/../b", "h2")["doc_name"] == "y.txt"
+    assert manifests.find_by_hash("a/../b", "h3") is None
+    assert list(manifests.sessions()) == ["a/../b"]
+    manifests.delete("a/../b")
+    assert manifests.get("a/../b") == {} and manifests.sessions() == {}
+
+def test_new_document_upserts_every_chunk(manifests, tmp_path):
+    result = plan(tmp_path, "doc.txt", PARAGRAPHS)
+    assert not result["skipped"]
+    assert len(result["new_chunks"]) == result["entry"]["n_chunks"] > 1
+    assert result["stale_ids"] == set()
+
+def test_identical_content_is_skipped(manifests, tmp_path):
+    manifests.put("s1", plan(tmp_path, "doc.txt", PARAGRAPHS)["entry"])
+    result = plan(tmp_path, "copy.txt", PARAGRAPHS)
+    assert result["skipped"]
+    assert result["result"]["duplicate_of"] == "doc.txt"
+    # Other sessions don't share manifests
+    assert not plan(tmp_path, "copy.txt", PARAGRAPHS, session_id="s2")["skipped"]
+
+def test_changed_document_diffs_vector_ids(manifests, tmp_path):
+    first = plan(tmp_path, "doc.txt", PARAGRAPHS)["entry"]
+    manifests.put("s1", first)
+    edited = PARAGRAPHS[:-1] + ["A rewritten closing paragraph about revenue recognition. " * 10]
+    result = plan(tmp_path, "doc.txt", edited)
+    new_ids = result["entry"]["vector_ids"]
+    kept = set(first["vector_ids"]) & set(new_ids)
+    assert kept, "unchanged leading chunks keep their ids"
+    assert result["stale_ids"] == set(first["vector_ids"]) - set(new_ids) != set()
+    assert {endpoints.chunk_vector_id(c) for c in result["new_chunks"]} == set(new_ids) - kept
+
+def test_document_locks_serialize_and_are_dropped_when_unused(manifests):
+    order, entered = [], threading.Event()
+
+    def ingest(name):
+        with manifests.document_lock("s1", "doc.txt"):
+            entered.set()
+            order.append(f"{name} start")
+            time.sleep(0.05)
+            order.append(f"{name} end")
+
+    first = threading.Thread(target=ingest, args=("first",))
+    first.start()
+    entered.wait(5)
+    second = threading.Thread(target=ingest, args=("second",))
+    second.start()
+    first.join(5)
+    second.join(5)
+    assert order == ["first start", "first end", "second start", "second end"]
+    with manifests.document_lock("s1", "other.txt"):
+        assert list(manifests._document_locks) == [("s1", "other.txt")]
+    assert manifests._document_locks == {}
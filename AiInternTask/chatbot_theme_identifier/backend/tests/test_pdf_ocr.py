@@ -0,0 +1,52 @@
+import threading
+
+from PIL import Image
+
+from app.core import document_processor
+from app.core.ocr_cache import OcrCache
+
+
+def _scanned_pdf(path, pages=2):
+    # Distinct images, so pages never share a cache entry
+    images = [Image.new("RGB", (850, 1100), (255, 255, 255 - i)) for i in range(pages)]
+    images[0].save(path, resolution=100, save_all=True, append_images=images[1:])
+    return str(path)
+
+
+def _fake_ocr(calls):
+    def ocr(data, **options):
+        calls.append((threading.current_thread().name, options))
+        return "scanned text"
+    return ocr
+
+
+def test_scanned_pages_are_ocred_on_the_ocr_pool(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(document_processor, "ocr_image_bytes", _fake_ocr(calls))
+    monkeypatch.setattr(document_processor, "_ocr_cache", OcrCache(max_items=16))
+    pages = document_processor.extract_text_from_pdf(_scanned_pdf(tmp_path / "scan.pdf"))
+    assert pages == [{"page": 1, "text": "scanned text"}, {"page": 2, "text": "scanned text"}]
+    assert len(calls) == 2
+    assert all(name.startswith("ocr") for name, _ in calls)
+    # Resolution from the image width over the page width (8.5in)
+    assert calls[0][1]["dpi"] == 100
+
+
+def test_identical_page_images_hit_the_ocr_cache(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(document_processor, "ocr_image_bytes", _fake_ocr(calls))
+    monkeypatch.setattr(document_processor, "_ocr_cache", OcrCache(max_items=16))
+    path = _scanned_pdf(tmp_path / "scan.pdf", pages=1)
+    document_processor.extract_text_from_pdf(path)
+    pages = document_processor.extract_text_from_pdf(path)
+    assert pages == [{"page": 1, "text": "scanned text"}]
+    assert len(calls) == 1
+
+
+def test_failed_ocr_is_not_cached(tmp_path, monkeypatch):
+    def failing(data, **options):
+        raise RuntimeError("tesseract missing")
+    monkeypatch.setattr(document_processor, "ocr_image_bytes", failing)
+    monkeypatch.setattr(document_processor, "_ocr_cache", OcrCache(max_items=16))
+    assert document_processor.extract_text_from_pdf(_scanned_pdf(tmp_path / "scan.pdf", pages=1)) == []
+    assert document_processor._ocr_cache.stats()["memory_items"] == 0
@@ -0,0 +1,48 @@
+import time
+
+from app.core.query_cache import QueryCache
+
+RESULT = {"citations": [], "answers": [], "themes": "Theme 1 - Growth"}
+
+def test_similar_query_of_the_same_session_hits():
+    cache = QueryCache(threshold=0.95)
+    cache.put("s1", [1.0, 0.0], RESULT, cache.generation("s1"))
+    assert cache.get("s1", [2.0, 0.1]) is RESULT
+    assert cache.get("s1", [0.0, 1.0]) is None
+    assert cache.get("s2", [1.0, 0.0]) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+def test_invalidation_drops_results_and_rejects_stale_puts():
+    cache = QueryCache()
+    generation = cache.generation("s1")
+    cache.put("s1", [1.0, 0.0], RESULT, generation)
+    cache.invalidate("s1")
+    assert cache.get("s1", [1.0, 0.0]) is None
+    # Computed against the document set from before the invalidation
+    cache.put("s1", [1.0, 0.0], RESULT, generation)
+    assert cache.get("s1", [1.0, 0.0]) is None
+    cache.put("s1", [1.0, 0.0], RESULT, cache.generation("s1"))
+    assert cache.get("s1", [1.0, 0.0]) is RESULT
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = QueryCache(ttl=60)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.put("s1", [1.0, 0.0], RESULT, cache.generation("s1"))
+    monkeypatch.setattr(time, "time", lambda: now + 30)
+    assert cache.get("s1", [1.0, 0.0]) is RESULT
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("s1", [1.0, 0.0]) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_entry_and_session_limits():
+    cache = QueryCache(max_entries=2, max_sessions=2)
+    for i, embedding in enumerate(([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0])):
+        cache.put("s1", embedding, {**RESULT, "themes": str(i)}, cache.generation("s1"))
+    assert cache.get("s1", [1.0, 0.0, 0.0]) is None
+    assert cache.get("s1", [0.0, 0.0, 1.0])["themes"] == "2"
+    cache.generation("s2")
+    cache.generation("s3")
+    assert cache.stats()["sessions"] == 2
+    assert cache.get("s1", [0.0, 0.0, 1.0]) is None
@@ -0,0 +1,137 @@
+import json
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api import endpoints
+from app.core.query_cache import QueryCache
+
+TABLE = [{"doc_name": "a.txt", "para": 1, "page": 1, "text": "Revenue grew.", "score": 0.9, "doc_id": "a-1"}]
+ANSWER = {"doc_id": "a-1", "doc_name": "a.txt", "answer": "Revenue grew.", "citation": "Page 1, Para 1"}
+
+@pytest.fixture
+def client(monkeypatch):
+    async def embed(text):
+        return [1.0, 0.0]
+
+    async def answers(user_query, table, outcome=None):
+        outcome.chunks += 1
+        yield 0, ANSWER
+
+    monkeypatch.setattr(endpoints, "get_embedding_async", embed)
+    monkeypatch.setattr(endpoints, "retrieve_candidates", lambda *args, **kwargs: [])
+    monkeypatch.setattr(endpoints, "build_citation_table", lambda matches: TABLE)
+    monkeypatch.setattr(endpoints, "iter_answers", answers)
+    monkeypatch.setattr(endpoints, "query_cache", QueryCache())
+    return TestClient(app)
+
+def stream_events(client, user_query="What happened?"):
+    resp = client.post("/query/stream/", data={"user_query": user_query, "session_id": "s1"})
+    assert resp.status_code == 200
+    events = []
+    for block in resp.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_stream_sends_themes_then_done(client, monkeypatch):
+    async def themes(user_query, per_doc_answers):
+        yield "Theme 1 - "
+        yield "Growth"
+
+    monkeypatch.setattr(endpoints, "stream_themes", themes)
+    events = stream_events(client)
+    assert [event for event, _ in events] == ["citations", "answer", "theme", "theme", "done"]
+    assert events[-1][1] == {"answers": [ANSWER], "themes": "Theme 1 - Growth"}
+
+def test_theme_failure_midway_is_an_error_event_and_not_cached(client, monkeypatch):
+    async def themes(user_query, per_doc_answers):
+        yield "Theme 1 - Par"
+        raise RuntimeError("stream dropped")
+
+    monkeypatch.setattr(endpoints, "stream_themes", themes)
+    events = stream_events(client)
+    assert [event for event, _ in events] == ["citations", "answer", "theme", "error"]
+    assert events[-1][1] == {"detail": "Theme synthesis failed: stream dropped"}
+    assert endpoints.query_cache.stats()["entries"] == 0
+
+def query(client, user_query="What happened?"):
+    resp = client.post("/query/", data={"user_query": user_query, "session_id": "s1"})
+    assert resp.status_code == 200
+    return resp.json()
+
+@pytest.fixture
+def extraction(monkeypatch):
+    """Extraction whose calls all fail while `state["failing"]` is set; counts calls."""
+    state = {"failing": False, "calls": 0}
+
+    async def extract(user_query, table, outcome=None):
+        state["calls"] += 1
+        outcome.chunks += len(table)
+        if state["failing"]:
+            outcome.failed += len(table)
+            return []
+        return [ANSWER]
+
+    async def themes(user_query, per_doc_answers):
+        return "Theme 1 - Growth" if per_doc_answers else "Not enough context"
+
+    monkeypatch.setattr(endpoints, "extract_answers", extract)
+    monkeypatch.setattr(endpoints, "synthesize_themes", themes)
+    return state
+
+def test_complete_result_is_cached(client, extraction):
+    assert query(client) == {"answers": [ANSWER], "themes": "Theme 1 - Growth"}
+    assert query(client) == {"answers": [ANSWER], "themes": "Theme 1 - Growth"}
+    assert extraction["calls"] == 1
+    # The stream replays the cached result
+    events = stream_events(client)
+    assert [event for event, _ in events] == ["citations", "answer", "theme", "done"]
+    assert extraction["calls"] == 1
+
+def test_failed_extraction_is_not_cached(client, extraction):
+    extraction["failing"] = True
+    assert query(client) == {"answers": [], "themes": "Not enough context"}
+    extraction["failing"] = False
+    assert query(client) == {"answers": [ANSWER], "themes": "Theme 1 - Growth"}
+    assert extraction["calls"] == 2
+
+def test_failed_theme_synthesis_is_not_cached(client, extraction, monkeypatch):
+    async def failing(user_query, per_doc_answers):
+        raise RuntimeError("429 Too Many Requests")
+
+    monkeypatch.setattr(endpoints, "synthesize_themes", failing)
+    result = query(client)
+    assert result == {"answers": [ANSWER], "themes": "Theme synthesis failed: 429 Too Many Requests"}
+    assert endpoints.query_cache.stats()["entries"] == 0
+
+def test_stream_with_failed_extraction_is_not_cached(client, monkeypatch):
+    async def answers(user_query, table, outcome=None):
+        outcome.chunks += 2
+        outcome.failed += 1
+        yield 0, ANSWER
+
+    async def themes(user_query, per_doc_answers):
+        yield "Theme 1 - Growth"
+
+    monkeypatch.setattr(endpoints, "iter_answers", answers)
+    monkeypatch.setattr(endpoints, "stream_themes", themes)
+    assert stream_events(client)[-1][0] == "done"
+    assert endpoints.query_cache.stats()["entries"] == 0
+
+def test_extract_answers_counts_failed_calls(monkeypatch):
+    from app.core import query_pipeline
+
+    async def chat(prompts, **kwargs):
+        if "broken" in prompts[0]:
+            raise RuntimeError("429 Too Many Requests")
+        return "Revenue grew."
+
+    monkeypatch.setattr(query_pipeline, "gemini_chat_async", chat)
+    chunks = [dict(TABLE[0]), {**TABLE[0], "doc_id": "b-1", "text": "broken"}]
+    outcome = query_pipeline.ExtractionOutcome()
+    answers = asyncio.run(query_pipeline.extract_answers("q", chunks, mode="per_chunk", outcome=outcome))
+    assert [a["doc_id"] for a in answers] == ["a-1"]
+    assert (outcome.chunks, outcome.failed, outcome.complete) == (2, 1, False)
@@ -0,0 +1,33 @@
+import pytest
+
+from app import config
+from app.config import settings
+from app.core import readiness
+
+@pytest.fixture
+def backend_ok(monkeypatch):
+    monkeypatch.setattr(readiness, "check_vector_store", lambda force=False: {"ok": True, "error": None})
+    monkeypatch.setattr(readiness, "_model", {"state": "not_loaded", "error": None})
+
+def test_lazy_load_without_warm_up_is_ready(backend_ok, monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_ON_STARTUP", False)
+    monkeypatch.setattr(config, "_embedder", None)
+    ready, details = readiness.readiness()
+    assert ready and details["model"]["state"] == "not_loaded"
+    # A request loaded the model through get_embedder()
+    monkeypatch.setattr(config, "_embedder", object())
+    ready, details = readiness.readiness()
+    assert ready and details["model"]["state"] == "ready"
+
+def test_warm_up_gates_readiness(backend_ok, monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_ON_STARTUP", True)
+    monkeypatch.setattr(config, "_embedder", None)
+    assert not readiness.readiness()[0]
+    monkeypatch.setattr(config, "_embedder", object())
+    assert readiness.readiness()[0]
+
+def test_failed_warm_up_is_not_ready(backend_ok, monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_ON_STARTUP", False)
+    monkeypatch.setattr(readiness, "_model", {"state": "error", "error": "download failed"})
+    ready, details = readiness.readiness()
+    assert not ready and details["model"]["error"] == "download failed"
@@ -0,0 +1,177 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from app.core.scheduler import AdmissionController, PriorityLock, Overloaded, INTERACTIVE, BULK
+
+def _controller(max_in_flight=1, max_per_session=1, max_queue=4, max_wait=5.0, **kwargs):
+    limits = {"query": {
+        "max_in_flight": max_in_flight,
+        "max_per_session": max_per_session,
+        "max_queue": max_queue,
+        "max_wait": max_wait
+    }}
+    return AdmissionController(limits, **kwargs)
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def main():
+        controller = _controller(max_per_session=2)
+        first = await controller.acquire("query", "s1")
+        order = []
+
+        async def wait(name):
+            ticket = await controller.acquire("query", "s1")
+            order.append(name)
+            ticket.release()
+
+        tasks = [asyncio.create_task(wait(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0.01)
+        assert controller.stats()["query_queued"] == 3
+        first.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+
+def test_waiter_blocked_by_its_session_does_not_block_others():
+    async def main():
+        controller = _controller(max_in_flight=3, max_per_session=1)
+        busy = await controller.acquire("query", "s1")
+        other = await controller.acquire("query", "s2")
+        same_session = asyncio.create_task(controller.acquire("query", "s1"))
+        third = asyncio.create_task(controller.acquire("query", "s3"))
+        await asyncio.sleep(0.01)
+        # s3 fits already but queued behind s1's waiter; the next release wakes it
+        other.release()
+        ticket = await asyncio.wait_for(third, 1)
+        assert not same_session.done()
+        busy.release()
+        (await asyncio.wait_for(same_session, 1)).release()
+        ticket.release()
+
+    asyncio.run(main())
+
+def test_full_queue_is_refused():
+    async def main():
+        controller = _controller(max_queue=1)
+        held = await controller.acquire("query", "s1")
+        waiting = asyncio.create_task(controller.acquire("query", "s2"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as refused:
+            await controller.acquire("query", "s3")
+        assert refused.value.reason == "queue_full"
+        assert refused.value.retry_after >= 1
+        held.release()
+        (await waiting).release()
+        assert controller.stats()["query_rejected"] == 1
+
+    asyncio.run(main())
+
+def test_wait_times_out():
+    async def main():
+        controller = _controller(max_wait=0.05)
+        held = await controller.acquire("query", "s1")
+        with pytest.raises(Overloaded) as refused:
+            await controller.acquire("query", "s2")
+        assert refused.value.reason == "timeout"
+        assert controller.stats()["query_queued"] == 0
+        held.release()
+        assert controller.stats()["query_in_flight"] == 0
+
+    asyncio.run(main())
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        controller = _controller()
+        held = await controller.acquire("query", "s1")
+        waiting = asyncio.create_task(controller.acquire("query", "s2"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        held.release()
+        await asyncio.sleep(0.01)
+        stats = controller.stats()
+        assert stats["query_queued"] == 0
+        assert stats["query_in_flight"] == 0
+
+    asyncio.run(main())
+
+def test_try_acquire_respects_capacity():
+    controller = _controller(max_in_flight=2, max_per_session=2)
+    tickets = [controller.try_acquire("query", "s1"), controller.try_acquire("query", "s2")]
+    with pytest.raises(Overloaded) as refused:
+        controller.try_acquire("query", "s3")
+    assert refused.value.reason == "capacity"
+    tickets[0].release()
+    tickets[0].release()  # idempotent
+    assert controller.stats()["query_in_flight"] == 1
+    controller.try_acquire("query", "s3").release()
+    tickets[1].release()
+
+def test_work_heavier_than_the_limit_is_admitted_alone():
+    controller = _controller(max_in_flight=2, max_per_session=2)
+    ticket = controller.try_acquire("query", "s1", weight=5)
+    with pytest.raises(Overloaded):
+        controller.try_acquire("query", "s2")
+    ticket.release()
+
+def test_retry_after_follows_hold_time_and_is_capped():
+    controller = _controller(max_retry_after=10)
+    controller._hold_time["query"] = 4.0
+    controller.try_acquire("query", "s1")
+    with pytest.raises(Overloaded) as refused:
+        controller.try_acquire("query", "s2")
+    # Held 4s on average, one queue slot per in-flight request: 4 * (1 + 1)
+    assert refused.value.retry_after == 8
+    controller._hold_time["query"] = 100.0
+    with pytest.raises(Overloaded) as refused:
+        controller.try_acquire("query", "s2")
+    assert refused.value.retry_after == 10
+
+def test_disabled_controller_admits_everything():
+    controller = _controller(enabled=False)
+    tickets = [controller.try_acquire("query", "s1") for _ in range(5)]
+    assert controller.stats()["query_in_flight"] == 5
+    for ticket in tickets:
+        ticket.release()
+
+def _run_waiters(lock, priorities):
+    """Holds the lock, queues one thread per priority, and returns the order they ran in."""
+    order = []
+    release = threading.Event()
+
+    def holder():
+        with lock.hold(BULK):
+            release.wait()
+
+    def waiter(name, priority):
+        with lock.hold(priority):
+            order.append(name)
+
+    threads = [threading.Thread(target=holder)]
+    threads[0].start()
+    time.sleep(0.02)
+    for name, priority in priorities:
+        thread = threading.Thread(target=waiter, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        # Let each waiter queue before the next arrives
+        time.sleep(0.02)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return order
+
+def test_priority_lock_serves_interactive_before_bulk():
+    lock = PriorityLock("test")
+    order = _run_waiters(lock, [("bulk1", BULK), ("query1", INTERACTIVE), ("bulk2", BULK), ("query2", INTERACTIVE)])
+    assert order == ["query1", "query2", "bulk1", "bulk2"]
+    assert lock.stats() == {"test_waiting_interactive": 0, "test_waiting_bulk": 0}
+
+def test_priority_lock_without_priority_is_fifo():
+    lock = PriorityLock("test", prioritize=False)
+    order = _run_waiters(lock, [("bulk1", BULK), ("query1", INTERACTIVE), ("bulk2", BULK)])
+    assert order == ["bulk1", "query1", "bulk2"]
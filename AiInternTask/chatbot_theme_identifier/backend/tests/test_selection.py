@@ -0,0 +1,22 @@
+from app.core.selection import select_matches
+
+def match(i, score):
+    return {"id": str(i), "score": score, "metadata": {"text": f"passage {i}"}}
+
+def test_floor_disabled_by_default_keeps_low_scores():
+    matches = [match(0, 0.2), match(1, -0.1)]
+    selected, counts = select_matches(matches, max_k=10)
+    assert [m["id"] for m in selected] == ["0", "1"]
+    assert counts["below_floor"] == 0
+
+def test_floor_and_margin():
+    matches = [match(0, 0.9), match(1, 0.75), match(2, 0.6), match(3, 0.3)]
+    selected, counts = select_matches(matches, max_k=10, min_score=0.5, score_margin=0.2)
+    assert [m["id"] for m in selected] == ["0", "1"]
+    assert (counts["below_floor"], counts["below_margin"]) == (1, 1)
+
+def test_exact_duplicates_collapse_and_max_k_applies():
+    matches = [match(0, 0.9), {**match(1, 0.8), "metadata": {"text": "Passage  0"}}, match(2, 0.7), match(3, 0.6)]
+    selected, counts = select_matches(matches, max_k=2)
+    assert [m["id"] for m in selected] == ["0", "2"]
+    assert (counts["duplicates"], counts["not_selected"]) == (1, 1)
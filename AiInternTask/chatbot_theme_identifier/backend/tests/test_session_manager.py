@@ -0,0 +1,98 @@
+import time
+
+from app.core.session_manager import SessionManager
+
+TTL = 0.3
+
+class Evictions(list):
+    def __call__(self, session_id):
+        self.append(session_id)
+
+def manager(db_path=None, **kwargs):
+    evicted = Evictions()
+    options = {"ttl": TTL, "max_sessions": 0, "write_interval": 0, **kwargs}
+    return SessionManager(evicted, db_path=db_path, **options), evicted
+
+def test_idle_sessions_expire(tmp_path):
+    sessions, evicted = manager(str(tmp_path / "s.db"))
+    sessions.touch("idle")
+    sessions.touch("busy")
+    time.sleep(TTL + 0.1)
+    sessions.touch("busy")
+    assert sessions.sweep() == 1
+    assert evicted == ["idle"]
+    assert sessions.stats()["tracked"] == 1
+
+def test_sessions_in_use_are_kept():
+    sessions, evicted = manager()
+    sessions.touch("s1")
+    time.sleep(TTL + 0.1)
+    with sessions.in_use("s1"):
+        assert sessions.sweep() == 0
+    # Released just now, so not idle
+    assert sessions.sweep() == 0 and evicted == []
+
+def test_least_recently_used_beyond_capacity():
+    sessions, evicted = manager(ttl=0, max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        sessions.touch(session_id)
+        time.sleep(0.01)
+    sessions.touch("a")
+    assert sessions.sweep() == 1
+    assert evicted == ["b"]
+
+def test_access_times_survive_restart(tmp_path):
+    sessions, _ = manager(str(tmp_path / "s.db"), write_interval=3600)
+    sessions.touch("s1")
+    sessions.stop()
+    restarted, _ = manager(str(tmp_path / "s.db"))
+    assert restarted.stats()["tracked"] == 1
+
+def test_no_eviction_of_a_session_another_process_serves(tmp_path):
+    a, evicted_a = manager(str(tmp_path / "s.db"))
+    b, _ = manager(str(tmp_path / "s.db"))
+    a.touch("s1")
+    time.sleep(TTL + 0.1)
+    b.touch("s1")
+    assert a.sweep() == 0
+    assert evicted_a == []
+
+def test_access_recorded_elsewhere_after_sync_stops_eviction(tmp_path, monkeypatch):
+    a, evicted_a = manager(str(tmp_path / "s.db"))
+    b, _ = manager(str(tmp_path / "s.db"))
+    a.touch("s1")
+    time.sleep(TTL + 0.1)
+    sync = a._sync
+
+    def sync_then_access_elsewhere():
+        sync()
+        b.touch("s1")
+    monkeypatch.setattr(a, "_sync", sync_then_access_elsewhere)
+    assert a.sweep() == 0
+    assert evicted_a == []
+
+def test_eviction_is_seen_by_other_processes(tmp_path):
+    a, evicted_a = manager(str(tmp_path / "s.db"))
+    b, evicted_b = manager(str(tmp_path / "s.db"))
+    b.touch("s1")
+    time.sleep(TTL + 0.1)
+    assert a.sweep() == 1 and evicted_a == ["s1"]
+    # b drops the session without evicting it a second time
+    assert b.sweep() == 0 and evicted_b == []
+    assert b.stats()["tracked"] == 0
+
+def test_stored_access_times_never_move_back(tmp_path):
+    a, _ = manager(str(tmp_path / "s.db"), discover_fn=lambda: {"s1": time.time() - 3600})
+    b, _ = manager(str(tmp_path / "s.db"))
+    b.touch("s1")
+    # a adopts s1 from an old manifest timestamp; the newer shared time wins
+    a._adopt()
+    a.sweep()
+    assert a._read_shared("s1") > time.time() - 5
+
+def test_forget_removes_the_shared_row(tmp_path):
+    sessions, evicted = manager(str(tmp_path / "s.db"))
+    sessions.touch("s1")
+    sessions.forget("s1")
+    sessions.sweep()
+    assert sessions._read_shared("s1") is None and evicted == []
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from app import config
+from app.services.vector_store import VectorStore, LocalVectorStore, PineconeVectorStore
+from benchmarks.fake_pinecone import FakePinecone
+
+def test_query_missing_index_or_namespace_is_empty(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    vector = np.ones(4, dtype=np.float32)
+    assert store.query("never-ingested", vector) == []
+    store.create_index("session", dimension=4)
+    assert store.query("session", vector) == []
+    assert store.query("session", vector, namespace="other") == []
+
+def test_query_returns_nearest_first(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    store.create_index("session", dimension=2)
+    store.upsert("session", [
+        {"id": "a", "values": [1.0, 0.0], "metadata": {"doc_name": "a.txt"}},
+        {"id": "b", "values": [0.0, 1.0], "metadata": {"doc_name": "b.txt"}}
+    ])
+    matches = store.query("session", [0.9, 0.1], top_k=2)
+    assert [m["id"] for m in matches] == ["a", "b"]
+    assert matches[0]["metadata"]["doc_name"] == "a.txt"
+
+def test_pinecone_query_missing_index_is_empty(monkeypatch):
+    fake = FakePinecone(latency=0.0, latency_per_vector=0.0)
+    monkeypatch.setattr(config, "_pc", fake)
+    store = PineconeVectorStore()
+    vector = np.ones(4, dtype=np.float32)
+    assert store.query("never-ingested", vector) == []
+    fake.create_index("session", dimension=4)
+    store.upsert("session", [{"id": "a", "values": vector, "metadata": {"doc_name": "a.txt"}}])
+    assert [m["id"] for m in store.query("session", vector)] == ["a"]
+    assert store.query("session", vector, namespace="other") == []
+
+def test_backend_missing_a_method_cannot_be_created():
+    class Incomplete(VectorStore):
+        def index_exists(self, index_name):
+            return False
+
+    with pytest.raises(TypeError):
+        Incomplete()
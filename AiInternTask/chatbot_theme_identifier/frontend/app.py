@@ -2,6 +2,10 @@ import streamlit as st
 import requests
 import uuid
 import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))) 
@@ -9,6 +13,8 @@ load_dotenv(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..',
 # ====== Backend API endpoint and upload limits ======
 BACKEND = os.getenv("BACKEND_URL")
 MAX_DOCS = 75
+UPLOAD_BATCH_SIZE = 10  # files per /upload/batch/ request
+UPLOAD_PARALLELISM = 4  # batch requests in flight at once
 
 # ====== Streamlit UI Config ======
 st.set_page_config("GenAI Doc QA", layout="centered")
@@ -35,6 +41,50 @@ if 'chat_input' not in st.session_state:
     # Stores user input in chat box
     st.session_state['chat_input'] = ""
 
+@st.cache_resource
+def http_session():
+    """Pooled HTTP session shared by all backend calls, sized for parallel uploads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=UPLOAD_PARALLELISM, pool_maxsize=UPLOAD_PARALLELISM)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def response_error(resp):
+    """Error message for a non-200 backend response (None if it succeeded), with the wait for a 429."""
+    if resp.status_code == 200:
+        return None
+    try:
+        detail = resp.json().get("detail")
+    except ValueError:
+        detail = None
+    message = f"{detail or resp.reason} (HTTP {resp.status_code})"
+    if resp.status_code == 429 and resp.headers.get("Retry-After"):
+        message += f"; retry in {resp.headers['Retry-After']} s"
+    return message
+
+def upload_batch(files, session_id):
+    """Upload files in one /upload/batch/ request; returns per-file results."""
+    payload = [("files", (f.name, f.getvalue(), f.type)) for f in files]
+    try:
+        resp = http_session().post(f"{BACKEND}/upload/batch/", files=payload, data={"session_id": session_id})
+        error = response_error(resp)
+        res = {"error": error} if error else resp.json()
+    except Exception as e:
+        res = {"success": False, "error": str(e)}
+    if "files" not in res:
+        # The whole request failed: report the error for each of its files
+        return [{"file_name": f.name, "success": False, "error": res.get("error") or res.get("detail")} for f in files]
+    return res["files"]
+
+def ingested_hashes():
+    """Content hashes of the documents the backend already ingested for this session."""
+    try:
+        resp = http_session().get(f"{BACKEND}/manifest/{st.session_state['session_id']}")
+        return {doc["content_hash"]: doc["doc_name"] for doc in resp.json()["documents"]}
+    except Exception:
+        return {}
+
 # ====== Document Upload Section (Sidebar) ======
 st.sidebar.header("1. Upload Documents (one-time)")
 if not st.session_state['uploaded_any']:
@@ -51,21 +101,31 @@ if not st.session_state['uploaded_any']:
         else:
             if st.sidebar.button("Confirm Upload", key="confirm_upload"):
                 all_uploaded = True
+                known_hashes = ingested_hashes()
+                pending = []
                 for f in uploaded_files:
-                    if f.name not in st.session_state['uploaded_files']:
-                        # Prepare file for upload to backend
-                        files = {"file": (f.name, f, f.type)}
-                        data = {"session_id": st.session_state["session_id"]}
-                        with st.spinner(f"Uploading {f.name}..."):
-                            resp = requests.post(f"{BACKEND}/upload/", files=files, data=data)
-                            res = resp.json()
+                    content_hash = hashlib.sha256(f.getvalue()).hexdigest()
+                    if content_hash in known_hashes:
+                        # Identical content was already ingested (possibly under another name)
+                        st.sidebar.info(f"{f.name} already uploaded as {known_hashes[content_hash]}.")
+                        st.session_state['uploaded_files'].add(f.name)
+                    elif f.name in st.session_state['uploaded_files']:
+                        st.sidebar.info(f"{f.name} already uploaded.")
+                    else:
+                        pending.append(f)
+                if pending:
+                    # Batches of files are sent in parallel; the backend shares embedding work across them
+                    batches = [pending[i:i + UPLOAD_BATCH_SIZE] for i in range(0, len(pending), UPLOAD_BATCH_SIZE)]
+                    session_id = st.session_state["session_id"]
+                    with st.spinner(f"Uploading {len(pending)} file(s)..."):
+                        with ThreadPoolExecutor(max_workers=UPLOAD_PARALLELISM) as pool:
+                            results = [r for batch in pool.map(lambda b: upload_batch(b, session_id), batches) for r in batch]
+                    for res in results:
                         if res.get("success"):
-                            st.session_state['uploaded_files'].add(f.name)
+                            st.session_state['uploaded_files'].add(res["file_name"])
                         else:
-                            st.sidebar.error(f"Failed: {res.get('error')}")
+                            st.sidebar.error(f"Failed: {res['file_name']}: {res.get('error')}")
                             all_uploaded = False
-                    else:
-                        st.sidebar.info(f"{f.name} already uploaded.")
                 if all_uploaded:
                     st.sidebar.success(f"Uploaded {len(uploaded_files)} document(s).")
                     st.session_state['uploaded_any'] = True
@@ -78,6 +138,80 @@ if not st.session_state['uploaded_any']:
 
 st.sidebar.markdown("---")
 
+# ====== Answer Rendering Helpers ======
+def answer_table_rows(answers):
+    """Rows of the per-document answers table."""
+    return [
+        {
+            "Index": idx + 1,
+            "Document Name": a.get("file_name", a.get("doc_id")),
+            "Answer": a["answer"],
+            "Citation": a["citation"]
+        }
+        for idx, a in enumerate(answers)
+    ]
+
+def iter_sse(resp):
+    """Parse a server-sent events response into (event, data) pairs."""
+    resp.encoding = "utf-8"
+    event, data = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+def stream_answer(user_query):
+    """
+    Query the backend's streaming endpoint and render results as they arrive:
+    retrieved passages, then each document answer, then the themes token by token.
+    Returns the finished chat history item; a refused or failed query is shown as an
+    error and left out of the history (None).
+    """
+    st.markdown(
+        f"<span style='color:#41c9ff'><b>You:</b> {user_query}</span>",
+        unsafe_allow_html=True
+    )
+    status = st.empty()
+    answers_box = st.empty()
+    themes_box = st.empty()
+    status.caption("Searching documents...")
+    answers, themes = [], ""
+    data = {
+        "user_query": user_query,
+        "session_id": st.session_state["session_id"]
+    }
+    with http_session().post(f"{BACKEND}/query/stream/", data=data, stream=True) as resp:
+        error = response_error(resp)
+        if error:
+            status.empty()
+            st.error(f"Query failed: {error}")
+            return None
+        for event, payload in iter_sse(resp):
+            if event == "citations":
+                status.caption(f"Found {len(payload)} relevant passages. Extracting answers...")
+            elif event == "answer":
+                answers.append(payload)
+                answers_box.table(answer_table_rows(answers))
+            elif event == "theme":
+                if not themes:
+                    status.caption("Synthesizing themes...")
+                themes += payload["delta"]
+                themes_box.markdown(f"**AI:** {themes}")
+            elif event == "done":
+                # Final, de-duplicated answers in retrieval order
+                answers, themes = payload["answers"], payload["themes"]
+            elif event == "error":
+                # The backend failed mid-stream: keep what arrived and report the failure
+                st.error(f"Query failed: {payload.get('detail')}")
+    status.empty()
+    st.markdown("---")
+    return {"question": user_query, "answers": answers, "themes": themes}
+
 # ====== Conversation Display (Main Panel) ======
 st.markdown("### Conversation")
 for item in st.session_state['history']:
@@ -96,16 +230,7 @@ for item in st.session_state['history']:
             unsafe_allow_html=True
         )
         if item['answers']:
-            table_data = [
-                {
-                    "Index": idx + 1,
-                    "Document Name": a.get("file_name", a.get("doc_id")),
-                    "Answer": a["answer"],
-                    "Citation": a["citation"]
-                }
-                for idx, a in enumerate(item["answers"])
-            ]
-            st.table(table_data)
+            st.table(answer_table_rows(item["answers"]))
         if item['themes']:
             st.markdown(
                 f"<div style='color:#fff; margin-top:0.4em;'><b>AI:</b> {item['themes']}</div>",
@@ -114,27 +239,21 @@ for item in st.session_state['history']:
         st.markdown("</div>", unsafe_allow_html=True)
     st.markdown("---")
 
+# Stream the answer to a just-submitted question below the conversation
+if st.session_state.get('pending_query'):
+    item = stream_answer(st.session_state.pop('pending_query'))
+    if item:
+        st.session_state['history'].append(item)
+
 if not st.session_state['uploaded_any']:
     st.info("Upload and confirm documents to start chatting.")
 
 # ====== Chat Input (Main Panel) ======
 def send_message():
-    """Handle user query, call backend, and update chat history."""
+    """Queue the user query; it is answered (streamed) on the next script run."""
     user_query = st.session_state['chat_input'].strip()
     if user_query:
-        with st.spinner("Getting answer..."):
-            data = {
-                "user_query": user_query,
-                "session_id": st.session_state["session_id"]
-            }
-            resp = requests.post(f"{BACKEND}/query/", data=data)
-            result = resp.json()
-        chat_item = {
-            "question": user_query,
-            "answers": result.get("answers", []),
-            "themes": result.get("themes", "")
-        }
-        st.session_state['history'].append(chat_item)
+        st.session_state['pending_query'] = user_query
         st.session_state['chat_input'] = ""  # Clear chat input after send
 
 if st.session_state['uploaded_any']: